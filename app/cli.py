@@ -0,0 +1,54 @@
+"""
+Командная строка приложения.
+
+	python -m app import-articles articles.ndjson [--format ndjson|csv] [--batch-size N]
+	python -m app export-articles articles.csv --format csv [--login LOGIN]
+
+Вместо пути к файлу можно указать "-": импорт читает stdin, экспорт пишет в stdout.
+"""
+import argparse
+import json
+import sys
+
+from .database.bulk import BULK_FORMATS, import_articles, export_articles
+from .static import BULK_BATCH_SIZE
+
+
+def _import(args: argparse.Namespace) -> None:
+	if args.path == "-":
+		stream = open(sys.stdin.fileno(), "r", encoding="utf-8", newline="", closefd=False)
+	else:
+		stream = open(args.path, "r", encoding="utf-8", newline="")
+	with stream:
+		stats = import_articles(stream, args.format, args.batch_size)
+	print(json.dumps(stats, ensure_ascii=False), file=sys.stderr)
+
+
+def _export(args: argparse.Namespace) -> None:
+	if args.path == "-":
+		export_articles(sys.stdout.buffer, args.format, args.login)
+		sys.stdout.flush()
+		return
+	with open(args.path, "wb") as out:
+		export_articles(out, args.format, args.login)
+
+
+def main(argv: list[str] | None = None) -> None:
+	parser = argparse.ArgumentParser(prog="python -m app", description="Командная строка art_hub")
+	commands = parser.add_subparsers(dest="command", required=True)
+
+	import_parser = commands.add_parser("import-articles", help="Массовый импорт статей через COPY")
+	import_parser.add_argument("path", help="Файл NDJSON или CSV; - для stdin")
+	import_parser.add_argument("--format", choices=sorted(BULK_FORMATS), default="ndjson")
+	import_parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE,
+							   help="Сколько статей загружать одной транзакцией")
+	import_parser.set_defaults(handler=_import)
+
+	export_parser = commands.add_parser("export-articles", help="Потоковый экспорт статей через COPY")
+	export_parser.add_argument("path", help="Файл для записи; - для stdout")
+	export_parser.add_argument("--format", choices=sorted(BULK_FORMATS), default="ndjson")
+	export_parser.add_argument("--login", default=None, help="Экспортировать только статьи этого автора")
+	export_parser.set_defaults(handler=_export)
+
+	args = parser.parse_args(argv)
+	args.handler(args)
@@ -0,0 +1,176 @@
+"""
+Сжатие ответов: gzip, а также brotli и zstd, если установлены пакеты brotli и zstandard.
+
+CompressionMiddleware выбирает кодирование по Accept-Encoding и сжимает текстовые ответы не меньше
+COMPRESSION_MIN_SIZE байт. Ответы, у которых уже есть Content-Encoding (например, заранее сжатые статьи
+из кэша, см. aio.article_cache.cached_encoded_article), и изображения передаются без изменений.
+Потоковые ответы сжимаются по фрагментам со сбросом буфера кодировщика, поэтому клиент получает каждую
+пачку NDJSON сразу, а не в конце ответа.
+"""
+from logging import Logger
+from typing import Optional
+import zlib
+
+try:
+	import brotli
+except ImportError:  # pragma: no cover - brotli не установлен
+	brotli = None
+
+try:
+	import zstandard
+except ImportError:  # pragma: no cover - zstandard не установлен
+	zstandard = None
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logger import configure_logs
+from .static import COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY, COMPRESSION_ZSTD_LEVEL
+
+__all__: list[str] = ["ENCODINGS", "negotiate_encoding", "compress", "CompressionMiddleware"]
+logger: Logger = configure_logs(__name__)
+
+# Доступные кодирования в порядке предпочтения сервера
+ENCODINGS: tuple[str, ...] = tuple(encoding for encoding, available in (("zstd", zstandard is not None),
+																		  ("br", brotli is not None),
+																		  ("gzip", True)) if available)
+# Типы содержимого, которые имеет смысл сжимать; изображения уже сжаты своими форматами
+COMPRESSIBLE_TYPES: tuple[str, ...] = ("text/", "application/json", "application/x-ndjson", "application/javascript",
+									   "application/xml", "image/svg+xml")
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+	"""Лучшее из доступных кодирований, которое принимает клиент, или None, если сжимать нельзя."""
+	if not accept_encoding:
+		return None
+	weights: dict[str, float] = {}
+	for part in accept_encoding.lower().split(","):
+		name, _, params = part.strip().partition(";")
+		weight = 1.0
+		params = params.strip()
+		if params.startswith("q="):
+			try:
+				weight = float(params[2:])
+			except ValueError:
+				weight = 0.0
+		weights[name.strip()] = weight
+	default = weights.get("*", 0.0)
+	for encoding in ENCODINGS:
+		if weights.get(encoding, default) > 0:
+			return encoding
+	return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+	"""Сжимает тело ответа целиком."""
+	if encoding == "gzip":
+		compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+		return compressor.compress(data) + compressor.flush()
+	if encoding == "br":
+		return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+	if encoding == "zstd":
+		return zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compress(data)
+	raise ValueError(f"Неизвестное кодирование {encoding!r}")
+
+
+class _StreamCompressor:
+	"""Сжатие потокового ответа: каждый фрагмент сжимается и сбрасывается, finish() закрывает поток."""
+
+	def __init__(self, encoding: str) -> None:
+		self.encoding = encoding
+		if encoding == "gzip":
+			self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+		elif encoding == "br":
+			self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+		else:
+			self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+	def chunk(self, data: bytes) -> bytes:
+		if self.encoding == "gzip":
+			return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+		if self.encoding == "br":
+			return self._compressor.process(data) + self._compressor.flush()
+		return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+	def finish(self) -> bytes:
+		if self.encoding == "br":
+			return self._compressor.finish()
+		return self._compressor.flush()
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+	vary = headers.get("vary")
+	if not vary:
+		headers["vary"] = "Accept-Encoding"
+	elif "accept-encoding" not in vary.lower():
+		headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+	"""ASGI-middleware сжатия ответов (см. описание модуля)."""
+
+	def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE) -> None:
+		self.app = app
+		self.minimum_size = minimum_size
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+		encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding")) if scope["type"] == "http" else None
+		if encoding is None:
+			await self.app(scope, receive, send)
+			return
+
+		start: Optional[Message] = None
+		stream: Optional[_StreamCompressor] = None
+		passthrough = False
+
+		async def send_compressed(message: Message) -> None:
+			nonlocal start, stream, passthrough
+			if passthrough:
+				await send(message)
+				return
+			if message["type"] == "http.response.start":
+				headers = Headers(raw=message["headers"])
+				content_type = headers.get("content-type", "")
+				if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+					passthrough = True
+					await send(message)
+				else:
+					# Заголовки отправляются вместе с первым фрагментом тела, когда известно, сжимать ли его
+					start = message
+				return
+			if message["type"] != "http.response.body":
+				passthrough = True
+				if start is not None:
+					await send(start)
+				await send(message)
+				return
+
+			body = message.get("body", b"")
+			more_body = message.get("more_body", False)
+			if start is not None:
+				headers = MutableHeaders(raw=start["headers"])
+				_add_vary(headers)
+				if not more_body and len(body) < self.minimum_size:
+					passthrough = True
+					await send(start)
+					await send(message)
+					return
+				headers["content-encoding"] = encoding
+				if more_body:
+					del headers["content-length"]
+					stream = _StreamCompressor(encoding)
+				else:
+					body = compress(body, encoding)
+					headers["content-length"] = str(len(body))
+				await send(start)
+				start = None
+				if stream is None:
+					await send({"type": "http.response.body", "body": body, "more_body": False})
+					return
+			body = stream.chunk(body) if body else b""
+			if not more_body:
+				body += stream.finish()
+			if body or not more_body:
+				await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+		await self.app(scope, receive, send_compressed)
@@ -1,4 +1,4 @@
-from . import articles, users, images, exceptions
+from . import articles, users, images, exceptions, aio
 
 __all__: list[str] = articles.__all__
 __all__.extend(users.__all__)
@@ -0,0 +1,8 @@
+from . import connect, articles, users, images
+
+__all__: list[str] = articles.__all__.copy()
+__all__.extend(users.__all__)
+__all__.extend(images.__all__)
+__version__: str = "0.1.0"
+__author__: str = "honfi555"
+__email__: str = "kasanindaniil@gmail.com"
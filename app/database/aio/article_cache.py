@@ -0,0 +1,142 @@
+"""
+Асинхронная часть кэша статей: чтение через кэш, инвалидация и подписка на изменения статей из других воркеров.
+"""
+from collections.abc import Awaitable, Callable
+from functools import wraps
+from logging import Logger
+from typing import Any
+import asyncio
+
+from .connect import connect_redis
+from .pubsub import listen_channel, stop_listener
+from ..article_cache import article_cache, article_keys
+from ...compression import compress
+from ...logger import configure_logs
+from ...static import ARTICLE_CACHE_ENABLED, ARTICLE_CACHE_CHANNEL, COMPRESSION_MIN_SIZE
+
+__all__: list[str] = ["cached_article", "cached_article_batch", "cached_encoded_article", "invalidate_article", "start_article_cache_listener",
+					  "stop_article_cache_listener", "article_cache_stats"]
+logger: Logger = configure_logs(__name__)
+
+_listener_task: asyncio.Task | None = None
+
+
+def cached_article(kind: str) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+	"""
+	Кэширует результат функции выборки статьи по article_id в кэше процесса.
+	:param kind: Вид статьи в ключе кэша: "data" или "full".
+	"""
+	def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+		@wraps(func)
+		async def wrapper(article_id: int) -> Any:
+			if not ARTICLE_CACHE_ENABLED:
+				return await func(article_id)
+			key = (kind, article_id)
+			result = article_cache.get(key)
+			if result is not None:
+				return result
+			epoch = article_cache.epoch()
+			result = await func(article_id)
+			if result is not None:
+				article_cache.set(key, result, epoch)
+			return result
+		return wrapper
+	return decorator
+
+
+def cached_article_batch(kind: str) -> Callable[[Callable[..., Awaitable[dict]]], Callable[..., Awaitable[dict]]]:
+	"""
+	Кэширует результат пакетной выборки статей (article_ids -> {article_id: строка}) в кэше процесса
+	по тем же ключам, что и cached_article: из базы запрашиваются только статьи, которых нет в кэше.
+	"""
+	def decorator(func: Callable[..., Awaitable[dict]]) -> Callable[..., Awaitable[dict]]:
+		@wraps(func)
+		async def wrapper(article_ids: list[int]) -> dict:
+			if not ARTICLE_CACHE_ENABLED:
+				return await func(article_ids)
+			found = {}
+			missing = []
+			for article_id in article_ids:
+				row = article_cache.get((kind, article_id))
+				if row is None:
+					missing.append(article_id)
+				else:
+					found[article_id] = row
+			if missing:
+				epoch = article_cache.epoch()
+				loaded = await func(missing)
+				for article_id, row in loaded.items():
+					article_cache.set((kind, article_id), row, epoch)
+				found.update(loaded)
+			return found
+		return wrapper
+	return decorator
+
+
+async def cached_encoded_article(kind: str, article_id: int, encoding: str,
+								 load: Callable[[int], Awaitable[Any]],
+								 render: Callable[[Any], bytes]) -> tuple[bytes, str | None]:
+	"""
+	Тело ответа со статьёй, сжатое один раз на версию статьи: результат хранится в кэше процесса рядом
+	со строкой статьи и удаляется вместе с ней при изменении статьи.
+	:param load: Выборка статьи по article_id (select_article или select_article_full).
+	:param render: Тело ответа в JSON для строки статьи.
+	:return: Тело и применённое кодирование; None, если тело меньше COMPRESSION_MIN_SIZE и не сжато.
+	"""
+	key = (kind, article_id, encoding)
+	if ARTICLE_CACHE_ENABLED:
+		cached = article_cache.get(key)
+		if cached is not None:
+			return cached
+	epoch = article_cache.epoch()
+	row = await load(article_id)
+	body = render(row)
+	if len(body) < COMPRESSION_MIN_SIZE:
+		result = (body, None)
+	else:
+		# zlib, brotli и zstandard отпускают GIL, поэтому длинная статья сжимается вне цикла событий
+		result = (await asyncio.to_thread(compress, body, encoding), encoding)
+	if ARTICLE_CACHE_ENABLED and row is not None:
+		article_cache.set(key, result, epoch)
+	return result
+
+
+async def invalidate_article(article_id: int) -> None:
+	"""
+	Удаляет статью из кэша этого процесса и оповещает остальные воркеры через Redis pub/sub.
+	"""
+	if not ARTICLE_CACHE_ENABLED:
+		return
+	article_cache.invalidate(article_keys(article_id))
+	try:
+		await connect_redis().publish(ARTICLE_CACHE_CHANNEL, str(article_id))
+	except Exception as e:
+		logger.error("Redis: не удалось оповестить воркеры об изменении статьи %s: %s", article_id, e)
+
+
+async def _on_message(data: bytes) -> None:
+	article_cache.invalidate(article_keys(int(data)))
+
+
+async def _on_subscribe() -> None:
+	# Пока подписки не было, сообщения об изменениях могли быть пропущены
+	article_cache.clear()
+
+
+def start_article_cache_listener() -> None:
+	"""Запускает фоновую подписку воркера на изменения статей."""
+	global _listener_task
+	if ARTICLE_CACHE_ENABLED and _listener_task is None:
+		_listener_task = asyncio.create_task(listen_channel(ARTICLE_CACHE_CHANNEL, _on_message, _on_subscribe))
+
+
+async def stop_article_cache_listener() -> None:
+	"""Останавливает фоновую подписку на изменения статей."""
+	global _listener_task
+	await stop_listener(_listener_task)
+	_listener_task = None
+
+
+def article_cache_stats() -> dict[str, int | float]:
+	"""Размер, вытеснения и доля попаданий кэша статей этого воркера."""
+	return article_cache.stats()
@@ -0,0 +1,366 @@
+"""Асинхронные аналоги функций app.database.articles на asyncpg."""
+from collections.abc import AsyncIterator
+from typing import Optional
+from logging import Logger
+
+from .connect import apg_connection, sync_fallback, sync_stream_fallback, CONNECTION_ERRORS
+from .feed_cache import invalidate_feed_pages
+from .search_cache import invalidate_search_snapshots
+from .article_cache import cached_article, cached_article_batch, invalidate_article
+from .suggest import publish_article_suggestion, publish_article_removal
+from .. import articles
+from ..search import search_window, merge_hits, TRIGRAM_WEIGHT
+from ...logger import configure_logs
+from ...models.articles import ArticleFull, ArticleAnnouncementRow, ArticleDataRow, ArticleFullRow
+from ...static import STREAM_BATCH_SIZE, SEARCH_TOP_K
+
+__all__: list[str] = ["select_articles_announcement", "select_article", "select_articles_batch", "select_article_full",
+					  "insert_article", "update_article", "delete_article", "select_articles_by_search",
+					  "iter_articles_announcement", "iter_articles_by_search"]
+logger: Logger = configure_logs(__name__)
+
+# Шаги поиска (см. app.database.search). {login_filter} - пусто или SEARCH_LOGIN_FILTER,
+# {exclude} - номер параметра со списком уже найденных статей
+FTS_SEARCH_SQL: str = """
+    SELECT a.article_id,
+           a.title,
+           us.login,
+           ts_rank_cd(a.search_vector, q.tsq) AS score
+    FROM articles.articles a
+             JOIN users.users us ON a.user_id = us.id
+             CROSS JOIN plainto_tsquery('russian', $1) AS q(tsq)
+    WHERE a.search_vector @@ q.tsq{login_filter}
+    ORDER BY score DESC, a.article_id DESC
+    LIMIT $2
+"""
+TRGM_SEARCH_SQL: str = """
+    SELECT a.article_id,
+           a.title,
+           us.login,
+           word_similarity($1, a.search_document) AS score
+    FROM articles.articles a
+             JOIN users.users us ON a.user_id = us.id
+    WHERE $1 <% a.search_document
+      AND NOT a.article_id = ANY ({exclude}::bigint[]){login_filter}
+    ORDER BY score DESC, a.article_id DESC
+    LIMIT $2
+"""
+SEARCH_LOGIN_FILTER: str = "\n      AND us.login = $3"
+
+
+@sync_fallback(articles.select_articles_announcement)
+async def select_articles_announcement(amount: Optional[int] = None,
+									   chunk: Optional[int] = None,
+									   login: Optional[str] = None,
+									   after_id: Optional[int] = None) -> list[ArticleAnnouncementRow]:
+	logger.info("Начало получения статей из базы данных.")
+	try:
+		async with apg_connection() as conn:
+			query = """
+                    SELECT art.article_id,
+                           art.title,
+                           us.login,
+                           art.announcement
+                    FROM articles.articles art
+                             JOIN users.users us ON art.user_id = us.id
+					"""
+			params = []
+			conditions = []
+			if login:
+				params.append(login)
+				conditions.append(f"us.login = ${len(params)}")
+			if after_id is not None:
+				params.append(after_id)
+				conditions.append(f"art.article_id < ${len(params)}")
+			if conditions:
+				query += "\nWHERE " + " AND ".join(conditions)
+			query += "\nORDER BY art.article_id DESC"
+			if amount and after_id is not None:
+				params.append(amount)
+				query += f"\nLIMIT ${len(params)}"
+			elif amount and chunk:
+				params.extend([(chunk - 1) * amount, amount])
+				query += f"\nOFFSET ${len(params) - 1}\nLIMIT ${len(params)}"
+			rows = await conn.fetch(query, *params)
+			logger.info("Количество полученных статей %s", len(rows))
+			return [ArticleAnnouncementRow._make(row) for row in rows]
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@cached_article("data")
+@sync_fallback(articles.select_article)
+async def select_article(article_id: int) -> ArticleDataRow | None:
+	logger.info("Начало получения статьи, c id %s", article_id)
+	try:
+		async with apg_connection() as conn:
+			query = """
+                    SELECT art.article_id,
+                           art.title,
+                           us.login,
+                           art.article_body
+                    FROM articles.articles art
+                             JOIN users.users us ON art.user_id = us.id
+                    WHERE article_id = $1;
+					"""
+			row = await conn.fetchrow(query, article_id)
+			logger.info("Получена статься с id %s", article_id)
+			return ArticleDataRow._make(row) if row is not None else None
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@cached_article_batch("data")
+@sync_fallback(articles.select_articles_batch)
+async def select_articles_batch(article_ids: list[int]) -> dict[int, ArticleDataRow]:
+	"""Статьи с указанными id одним запросом. :return: Словарь article_id -> статья; отсутствующих id в нём нет."""
+	logger.info("Начало получения %d статей", len(article_ids))
+	if not article_ids:
+		return {}
+	try:
+		async with apg_connection() as conn:
+			query = """
+                    SELECT art.article_id,
+                           art.title,
+                           us.login,
+                           art.article_body
+                    FROM articles.articles art
+                             JOIN users.users us ON art.user_id = us.id
+                    WHERE art.article_id = ANY ($1::bigint[]);
+					"""
+			rows = await conn.fetch(query, list(article_ids))
+			result = {row[0]: ArticleDataRow._make(row) for row in rows}
+			logger.info("Получено %d статей из %d", len(result), len(article_ids))
+			return result
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@cached_article("full")
+@sync_fallback(articles.select_article_full)
+async def select_article_full(article_id: int) -> ArticleFullRow | None:
+	logger.info("Начало получения полной статьи, c id %s", article_id)
+	try:
+		async with apg_connection() as conn:
+			query = """
+                    SELECT art.article_id,
+                           art.title,
+                           us.login,
+                           art.announcement,
+                           art.article_body
+                    FROM articles.articles art
+                             JOIN users.users us ON art.user_id = us.id
+                    WHERE article_id = $1;
+					"""
+			row = await conn.fetchrow(query, article_id)
+			logger.info("Получена полная статься, с id %s", article_id)
+			return ArticleFullRow._make(row) if row is not None else None
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@sync_fallback(articles.insert_article)
+async def insert_article(article: ArticleFull) -> int | None:
+	logger.info("Начало вставки статьи, с названием %s", article.title)
+	try:
+		async with apg_connection() as conn:
+			query = """
+                    INSERT INTO articles.articles
+                        (title, user_id, announcement, article_body)
+                    VALUES ($1, (SELECT id FROM users.users WHERE login = $2), $3, $4)
+                    RETURNING article_id;
+					"""
+			result = await conn.fetchval(query, article.title, article.user_name, article.announcement,
+										 article.article_body)
+			logger.info("Вставлена статься, с названием %s", article.title)
+			await invalidate_feed_pages(article.user_name)
+			await invalidate_search_snapshots()
+			await publish_article_suggestion(result, article.title, article.user_name)
+			return result
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@sync_fallback(articles.update_article)
+async def update_article(article: ArticleFull) -> None:
+	logger.info("Начало обновления статьи, с id %s", article.id)
+	try:
+		async with apg_connection() as conn:
+			query = """
+                    UPDATE articles.articles
+                    SET title        = $1,
+                        article_body = $2,
+                        announcement = $3
+                    WHERE article_id = $4
+                    RETURNING (SELECT login FROM users.users WHERE id = articles.user_id);
+					"""
+			login = await conn.fetchval(query, article.title, article.article_body, article.announcement, article.id)
+			logger.info("Обновлена статья, с id %s", article.id)
+			await invalidate_article(article.id)
+			await invalidate_feed_pages(login)
+			await invalidate_search_snapshots()
+			if login:
+				await publish_article_suggestion(article.id, article.title, login)
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@sync_fallback(articles.delete_article)
+async def delete_article(article_id: int) -> None:
+	logger.info("Начало удаления статьи %s", article_id)
+	try:
+		async with apg_connection() as conn:
+			query = """
+                    DELETE
+                    FROM articles.articles
+                    WHERE article_id = $1
+                    RETURNING (SELECT login FROM users.users WHERE id = articles.user_id);
+					"""
+			login = await conn.fetchval(query, article_id)
+			logger.info("Удалена статья %s", article_id)
+			await invalidate_article(article_id)
+			await invalidate_feed_pages(login)
+			await invalidate_search_snapshots()
+			await publish_article_removal(article_id)
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@sync_fallback(articles.select_articles_by_search)
+async def select_articles_by_search(
+		query_str: str,
+		amount: Optional[int] = None,
+		chunk: Optional[int] = None,
+		login: Optional[str] = None
+) -> list[dict]:
+	"""
+	Ищет статьи по поисковому документу: сначала полнотекстово, затем, если совпадений не хватает на страницу,
+	нечётко по триграммам. Ранжируются не больше SEARCH_TOP_K статей (см. app.database.search).
+	"""
+	offset, limit = search_window(amount, chunk)
+	if limit <= offset:
+		return []
+	try:
+		async with apg_connection() as conn:
+			params: list = [query_str, limit] + ([login] if login else [])
+			login_filter = SEARCH_LOGIN_FILTER if login else ""
+			fts_rows = await conn.fetch(FTS_SEARCH_SQL.format(login_filter=login_filter), *params)
+
+			trgm_rows = []
+			if len(fts_rows) < limit:
+				params[1] = limit - len(fts_rows)
+				params.append([row["article_id"] for row in fts_rows])
+				trgm_rows = await conn.fetch(
+					TRGM_SEARCH_SQL.format(login_filter=login_filter, exclude=f"${len(params)}"), *params
+				)
+
+			rows = merge_hits([dict(row) for row in fts_rows], [dict(row) for row in trgm_rows], offset)
+			logger.info("Найдено %d статей по запросу %r: полнотекстово %d, по триграммам %d",
+						len(rows), query_str, len(fts_rows), len(trgm_rows))
+			return rows
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении поиска: %s", e)
+		raise
+
+
+@sync_stream_fallback(articles.iter_articles_announcement)
+async def iter_articles_announcement(login: Optional[str] = None,
+									 after_id: Optional[int] = None,
+									 batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[dict]:
+	"""
+	Анонсы всех статей (или статей автора login) от новых к старым через серверный курсор.
+	Строки читаются пачками по batch_size, поэтому в памяти процесса не бывает больше одной пачки.
+	"""
+	logger.info("Начало потокового чтения статей из базы данных.")
+	query = """
+            SELECT art.article_id,
+                   art.title,
+                   us.login,
+                   art.announcement
+            FROM articles.articles art
+                     JOIN users.users us ON art.user_id = us.id
+			"""
+	params = []
+	conditions = []
+	if login:
+		params.append(login)
+		conditions.append(f"us.login = ${len(params)}")
+	if after_id is not None:
+		params.append(after_id)
+		conditions.append(f"art.article_id < ${len(params)}")
+	if conditions:
+		query += "\nWHERE " + " AND ".join(conditions)
+	query += "\nORDER BY art.article_id DESC"
+	try:
+		async with apg_connection() as conn, conn.transaction():
+			async for row in conn.cursor(query, *params, prefetch=batch_size):
+				yield dict(row)
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при потоковом чтении статей: %s", e)
+		raise
+
+
+@sync_stream_fallback(articles.iter_articles_by_search)
+async def iter_articles_by_search(query_str: str, login: Optional[str] = None,
+								  batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[dict]:
+	"""
+	Вся выдача поиска (не больше SEARCH_TOP_K статей) в порядке ранга через серверные курсоры:
+	сначала полнотекстовые совпадения, затем нечёткие, как в select_articles_by_search.
+	"""
+	params: list = [query_str, SEARCH_TOP_K] + ([login] if login else [])
+	login_filter = SEARCH_LOGIN_FILTER if login else ""
+	found: list[int] = []
+	try:
+		async with apg_connection() as conn, conn.transaction():
+			async for row in conn.cursor(FTS_SEARCH_SQL.format(login_filter=login_filter), *params,
+										 prefetch=batch_size):
+				found.append(row["article_id"])
+				yield dict(row)
+			if len(found) < SEARCH_TOP_K:
+				params[1] = SEARCH_TOP_K - len(found)
+				params.append(found)
+				query = TRGM_SEARCH_SQL.format(login_filter=login_filter, exclude=f"${len(params)}")
+				async for row in conn.cursor(query, *params, prefetch=batch_size):
+					hit = dict(row)
+					hit["score"] *= TRIGRAM_WEIGHT
+					yield hit
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при потоковом поиске: %s", e)
+		raise
@@ -0,0 +1,60 @@
+"""Асинхронный профиль автора с кэшем (см. app.database.authors)."""
+from logging import Logger
+import json
+
+from .connect import apg_connection, sync_fallback, CONNECTION_ERRORS
+from .feed_cache import cached_feed_page
+from .. import authors
+from ..authors import profile_from_row
+from ..exceptions.users import AuthorNotFoundException
+from ...logger import configure_logs
+
+__all__: list[str] = ["select_author_profile", "cached_author_profile"]
+logger: Logger = configure_logs(__name__)
+
+AUTHOR_PROFILE_SQL: str = """
+    SELECT us.id,
+           us.login,
+           us.description,
+           us.article_count,
+           coalesce((SELECT json_agg(json_build_array(art.article_id, art.title, us.login, art.announcement)
+                                     ORDER BY art.article_id DESC)
+                     FROM (SELECT article_id, title, announcement
+                           FROM articles.articles
+                           WHERE user_id = us.id
+                           ORDER BY article_id DESC
+                           LIMIT $2) art), '[]'::json) AS latest
+    FROM users.users us
+    WHERE us.login = $1
+"""
+
+
+@sync_fallback(authors.select_author_profile)
+async def select_author_profile(login: str, latest: int) -> dict:
+	"""
+	Профиль автора одним запросом к базе.
+	:return: author_info, article_count и articles - latest последних анонсов от новых к старым.
+	:raises AuthorNotFoundException: Автора с таким логином нет.
+	"""
+	logger.info("Начало получения профиля автора %s", login)
+	try:
+		async with apg_connection() as conn:
+			row = await conn.fetchrow(AUTHOR_PROFILE_SQL, login, latest)
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+	if row is None:
+		raise AuthorNotFoundException()
+	# asyncpg возвращает json строкой
+	return profile_from_row(tuple(row), json.loads(row["latest"]))
+
+
+async def cached_author_profile(login: str, latest: int) -> dict:
+	"""
+	Профиль автора из кэша ленты автора: сбрасывается при записи его статей и при изменении описания.
+	Отсутствующий автор не кэшируется.
+	"""
+	return await cached_feed_page(login, "profile", latest, lambda: select_author_profile(login, latest))
@@ -0,0 +1,171 @@
+"""
+Асинхронные аналоги хранилищ app.database.blobstore.
+
+AsyncRedisBlobStore работает через общий клиент redis.asyncio. Для остальных хранилищ (файловая система)
+AsyncBlobStore выполняет синхронные методы в пуле потоков: асинхронного дискового ввода-вывода нет.
+"""
+
+from typing import Optional
+from logging import Logger
+import asyncio
+
+from redis.asyncio.client import Pipeline
+
+from .connect import connect_redis
+from ..blobstore import STORE_VARIANTS_SCRIPT, BlobStore, BlobWriter, get_blob_store, image_key, variant_keys
+from ...imaging import IMAGE_VARIANTS
+from ...logger import configure_logs
+from ...static import IMAGE_STORAGE_BACKEND, IMAGE_UPLOAD_TTL
+
+__all__ = ["AsyncBlobStore", "AsyncRedisBlobStore", "get_async_blob_store"]
+logger: Logger = configure_logs(__name__)
+
+# Временный ключ, в который дописываются части загружаемого изображения до завершения загрузки
+UPLOAD_KEY: str = "upload:{article_id}:{image_id}"
+
+_async_blob_store: Optional["AsyncBlobStore"] = None
+
+
+class AsyncBlobWriter:
+    """Потоковая запись файла BlobWriter, каждая операция которой выполняется в пуле потоков."""
+
+    def __init__(self, writer: BlobWriter) -> None:
+        self._writer = writer
+
+    async def write(self, data: bytes) -> None:
+        await asyncio.to_thread(self._writer.write, data)
+
+    async def commit(self, pipe: Pipeline) -> None:
+        """Делает файл видимым до выполнения транзакции pipe, которая добавляет идентификатор в список статьи."""
+        await asyncio.to_thread(self._writer.commit)
+
+    async def abort(self) -> None:
+        await asyncio.to_thread(self._writer.abort)
+
+
+class AsyncRedisBlobWriter:
+    """Потоковая запись изображения командами APPEND во временный ключ с TTL."""
+
+    def __init__(self, article_id: int, image_id: str) -> None:
+        self._target_key = image_key(article_id, image_id)
+        self._upload_key = UPLOAD_KEY.format(article_id=article_id, image_id=image_id)
+
+    async def write(self, data: bytes) -> None:
+        async with connect_redis().pipeline(transaction=False) as pipe:
+            pipe.append(self._upload_key, data)
+            pipe.expire(self._upload_key, IMAGE_UPLOAD_TTL)
+            await pipe.execute()
+
+    async def commit(self, pipe: Pipeline) -> None:
+        """Переименовывает временный ключ в ключ изображения в транзакции pipe."""
+        pipe.rename(self._upload_key, self._target_key)
+        pipe.persist(self._target_key)
+
+    async def abort(self) -> None:
+        await connect_redis().delete(self._upload_key)
+
+
+class AsyncBlobStore:
+    """
+    Асинхронный интерфейс хранилища байтов изображений с методами BlobStore.
+    Методы выполняют синхронное хранилище store в пуле потоков.
+    """
+
+    def __init__(self, store: BlobStore) -> None:
+        self.store = store
+
+    async def write(self, article_id: int, image_id: str, data: bytes, variant: Optional[str] = None) -> None:
+        await asyncio.to_thread(self.store.write, article_id, image_id, data, variant)
+
+    async def write_batch(self, article_id: int, blobs: dict[str, bytes], pipe: Pipeline) -> None:
+        await asyncio.to_thread(self.store.write_batch, article_id, blobs, pipe)
+
+    async def write_variants(self, article_id: int, image_id: str, variants: dict[str, bytes]) -> bool:
+        return await asyncio.to_thread(self.store.write_variants, article_id, image_id, variants)
+
+    async def writer(self, article_id: int, image_id: str) -> AsyncBlobWriter | AsyncRedisBlobWriter:
+        """Открывает потоковую запись оригинала изображения."""
+        return AsyncBlobWriter(await asyncio.to_thread(self.store.writer, article_id, image_id))
+
+    async def exists(self, article_id: int, image_id: str, variant: Optional[str] = None) -> bool:
+        return await asyncio.to_thread(self.store.exists, article_id, image_id, variant)
+
+    async def read(self, article_id: int, image_id: str, variant: Optional[str] = None) -> bytes | None:
+        return await asyncio.to_thread(self.store.read, article_id, image_id, variant)
+
+    async def head(self, article_id: int, image_id: str, head_bytes: int,
+                   variant: Optional[str] = None) -> tuple[int, bytes] | None:
+        return await asyncio.to_thread(self.store.head, article_id, image_id, head_bytes, variant)
+
+    async def read_range(self, article_id: int, image_id: str, start: int, end: int,
+                         variant: Optional[str] = None) -> bytes:
+        return await asyncio.to_thread(self.store.read_range, article_id, image_id, start, end, variant)
+
+    async def open_path(self, article_id: int, image_id: str, variant: Optional[str] = None) -> str | None:
+        return await asyncio.to_thread(self.store.open_path, article_id, image_id, variant)
+
+    async def delete(self, article_id: int, image_id: str) -> bool:
+        return await asyncio.to_thread(self.store.delete, article_id, image_id)
+
+    async def delete_unlisted(self, article_id: int, image_ids: list[str]) -> list[bool]:
+        return await asyncio.to_thread(self.store.delete_unlisted, article_id, image_ids)
+
+
+class AsyncRedisBlobStore(AsyncBlobStore):
+    """Байты изображений в Redis через клиент redis.asyncio, без пула потоков."""
+
+    async def write(self, article_id: int, image_id: str, data: bytes, variant: Optional[str] = None) -> None:
+        await connect_redis().set(image_key(article_id, image_id, variant), data)
+
+    async def write_batch(self, article_id: int, blobs: dict[str, bytes], pipe: Pipeline) -> None:
+        for image_id, data in blobs.items():
+            pipe.set(image_key(article_id, image_id), data)
+
+    async def write_variants(self, article_id: int, image_id: str, variants: dict[str, bytes]) -> bool:
+        store = connect_redis().register_script(STORE_VARIANTS_SCRIPT)
+        return bool(await store(keys=variant_keys(article_id, image_id, variants), args=list(variants.values())))
+
+    async def writer(self, article_id: int, image_id: str) -> AsyncRedisBlobWriter:
+        return AsyncRedisBlobWriter(article_id, image_id)
+
+    async def exists(self, article_id: int, image_id: str, variant: Optional[str] = None) -> bool:
+        return bool(await connect_redis().exists(image_key(article_id, image_id, variant)))
+
+    async def read(self, article_id: int, image_id: str, variant: Optional[str] = None) -> bytes | None:
+        return await connect_redis().get(image_key(article_id, image_id, variant))
+
+    async def head(self, article_id: int, image_id: str, head_bytes: int,
+                   variant: Optional[str] = None) -> tuple[int, bytes] | None:
+        key = image_key(article_id, image_id, variant)
+        async with connect_redis().pipeline(transaction=False) as pipe:
+            pipe.strlen(key)
+            pipe.getrange(key, 0, head_bytes - 1)
+            size, head = await pipe.execute()
+        return (size, head) if size else None
+
+    async def read_range(self, article_id: int, image_id: str, start: int, end: int,
+                         variant: Optional[str] = None) -> bytes:
+        return await connect_redis().getrange(image_key(article_id, image_id, variant), start, end)
+
+    async def open_path(self, article_id: int, image_id: str, variant: Optional[str] = None) -> str | None:
+        return None
+
+    async def delete(self, article_id: int, image_id: str) -> bool:
+        keys = [image_key(article_id, image_id, variant) for variant in (None, *IMAGE_VARIANTS)]
+        async with connect_redis().pipeline(transaction=True) as pipe:
+            pipe.exists(keys[0])
+            pipe.delete(*keys)
+            existed, _ = await pipe.execute()
+        return bool(existed)
+
+    async def delete_unlisted(self, article_id: int, image_ids: list[str]) -> list[bool]:
+        return self.store.delete_unlisted(article_id, image_ids)
+
+
+def get_async_blob_store() -> AsyncBlobStore:
+    """Асинхронное хранилище байтов изображений процесса поверх get_blob_store()."""
+    global _async_blob_store
+    if _async_blob_store is None:
+        store = get_blob_store()
+        _async_blob_store = AsyncRedisBlobStore(store) if IMAGE_STORAGE_BACKEND == "redis" else AsyncBlobStore(store)
+    return _async_blob_store
@@ -0,0 +1,222 @@
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from contextlib import asynccontextmanager, aclosing
+from functools import wraps
+from logging import Logger
+from typing import Any
+import asyncio
+import time
+
+from psycopg2.extensions import parse_dsn
+import redis.asyncio as aioredis
+import asyncpg
+
+from ..connect import redis_connection_kwargs
+from ..exceptions.pool import PoolTimeoutException
+from ...logger import configure_logs
+from ...metrics import METRICS_AVAILABLE, observe_db_call, observe_redis_command
+from ...static import (POSTGRES_SOURCE, ASYNC_DB_ENABLED, ASYNC_PG_POOL_MIN_CONN, ASYNC_PG_POOL_MAX_CONN,
+					   ASYNC_PG_POOL_MAX_IDLE, PG_POOL_TIMEOUT, PG_CONNECT_TIMEOUT, REDIS_MAX_CONNECTIONS,
+					   REDIS_POOL_TIMEOUT)
+
+__all__: list[str] = ["get_apg_pool", "apg_connection", "close_apg_pool", "apg_pool_stats", "sync_fallback",
+					  "sync_stream_fallback", "CONNECTION_ERRORS", "connect_redis", "close_redis"]
+logger: Logger = configure_logs(__name__)
+
+# Ошибки, означающие проблемы с соединением, а не с самим запросом
+CONNECTION_ERRORS: tuple[type[Exception], ...] = (asyncpg.PostgresConnectionError, asyncpg.InterfaceError, OSError)
+
+_pool: asyncpg.Pool | None = None
+_pool_lock: asyncio.Lock = asyncio.Lock()
+_redis_client: aioredis.Redis | None = None
+_stats: dict[str, float | int] = {"checkouts": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+
+def _connect_kwargs() -> dict[str, Any]:
+	"""
+	Переводит POSTGRES_SOURCE (URI или строку вида key=value, которую понимает psycopg2)
+	в параметры asyncpg, чтобы оба слоя работали с одной и той же настройкой.
+	"""
+	params = parse_dsn(POSTGRES_SOURCE)
+	kwargs: dict[str, Any] = {
+		"host": params.get("host"),
+		"port": int(params["port"]) if "port" in params else None,
+		"user": params.get("user"),
+		"password": params.get("password"),
+		"database": params.get("dbname"),
+		"timeout": PG_CONNECT_TIMEOUT,
+	}
+	if "sslmode" in params:
+		kwargs["ssl"] = params["sslmode"]
+	return {key: value for key, value in kwargs.items() if value is not None}
+
+
+async def get_apg_pool() -> asyncpg.Pool:
+	"""Лениво создаёт пул asyncpg текущего процесса и возвращает его."""
+	global _pool
+	if _pool is None:
+		async with _pool_lock:
+			if _pool is None:
+				_pool = await asyncpg.create_pool(
+					min_size=ASYNC_PG_POOL_MIN_CONN,
+					max_size=ASYNC_PG_POOL_MAX_CONN,
+					max_inactive_connection_lifetime=ASYNC_PG_POOL_MAX_IDLE,
+					**_connect_kwargs()
+				)
+				logger.info("Пул asyncpg создан: от %d до %d соединений",
+							ASYNC_PG_POOL_MIN_CONN, ASYNC_PG_POOL_MAX_CONN)
+	return _pool
+
+
+@asynccontextmanager
+async def apg_connection() -> AsyncIterator[asyncpg.Connection]:
+	"""
+	Получение соединения из пула asyncpg.
+	Используется как асинхронный контекстный менеджер: async with apg_connection() as conn: ...
+	"""
+	pool = await get_apg_pool()
+	started = time.perf_counter()
+	try:
+		conn = await pool.acquire(timeout=PG_POOL_TIMEOUT)
+	except asyncio.TimeoutError:
+		_stats["timeouts"] += 1
+		logger.error("Пул asyncpg исчерпан: нет свободного соединения дольше %.1f с", PG_POOL_TIMEOUT)
+		raise PoolTimeoutException()
+	wait = time.perf_counter() - started
+	_stats["checkouts"] += 1
+	_stats["wait_seconds_total"] += wait
+	_stats["wait_seconds_max"] = max(_stats["wait_seconds_max"], wait)
+	try:
+		yield conn
+	finally:
+		await pool.release(conn)
+
+
+async def close_apg_pool() -> None:
+	"""Закрывает пул asyncpg, если он был создан."""
+	global _pool
+	if _pool is not None:
+		await _pool.close()
+		_pool = None
+		logger.info("Пул asyncpg закрыт.")
+
+
+def apg_pool_stats() -> dict[str, float | int]:
+	"""Статистика пула asyncpg в том же формате, что и connect.pg_pool_stats()."""
+	size = _pool.get_size() if _pool is not None else 0
+	idle = _pool.get_idle_size() if _pool is not None else 0
+	checkouts = _stats["checkouts"]
+	return {
+		"max_size": ASYNC_PG_POOL_MAX_CONN,
+		"in_use": size - idle,
+		"idle": idle,
+		"utilisation": (size - idle) / ASYNC_PG_POOL_MAX_CONN,
+		**_stats,
+		"wait_seconds_avg": _stats["wait_seconds_total"] / checkouts if checkouts else 0.0,
+	}
+
+
+class _TimedPipeline(aioredis.client.Pipeline):
+	"""Конвейер Redis, время выполнения которого попадает в метрики одной меткой PIPELINE."""
+
+	async def execute(self, raise_on_error: bool = True) -> list[Any]:
+		started = time.perf_counter()
+		try:
+			return await super().execute(raise_on_error)
+		finally:
+			observe_redis_command("PIPELINE", time.perf_counter() - started)
+
+
+class _TimedRedis(aioredis.Redis):
+	"""Клиент Redis, время каждой команды которого попадает в метрики с меткой имени команды."""
+
+	async def execute_command(self, *args, **options) -> Any:
+		started = time.perf_counter()
+		try:
+			return await super().execute_command(*args, **options)
+		finally:
+			observe_redis_command(args[0], time.perf_counter() - started)
+
+	def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> aioredis.client.Pipeline:
+		return _TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def connect_redis() -> aioredis.Redis:
+	"""
+	Возвращает общий асинхронный клиент Redis процесса.
+	Клиент создаётся лениво; соединения пула открываются по мере необходимости внутри цикла событий воркера.
+	"""
+	global _redis_client
+	if _redis_client is None:
+		pool = aioredis.BlockingConnectionPool(
+			max_connections=REDIS_MAX_CONNECTIONS,
+			timeout=REDIS_POOL_TIMEOUT,
+			**redis_connection_kwargs()
+		)
+		redis_class = _TimedRedis if METRICS_AVAILABLE else aioredis.Redis
+		_redis_client = redis_class(connection_pool=pool)
+		logger.info("Создан асинхронный клиент Redis: до %d соединений.", REDIS_MAX_CONNECTIONS)
+	return _redis_client
+
+
+async def close_redis() -> None:
+	"""Закрывает соединения асинхронного клиента Redis, если он был создан."""
+	global _redis_client
+	if _redis_client is not None:
+		await _redis_client.aclose()
+		await _redis_client.connection_pool.disconnect()
+		_redis_client = None
+
+
+def sync_fallback(sync_func: Callable[..., Any]) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+	"""
+	Переключатель совместимости: при ASYNC_DB_ENABLED=false асинхронная функция не использует асинхронные драйверы,
+	а выполняет синхронный аналог из app.database в пуле потоков, не блокируя цикл событий.
+	:param sync_func: Синхронная функция с той же сигнатурой.
+	"""
+	def decorator(async_func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+		@wraps(async_func)
+		async def wrapper(*args, **kwargs) -> Any:
+			if not ASYNC_DB_ENABLED:
+				return await asyncio.to_thread(sync_func, *args, **kwargs)
+			return await async_func(*args, **kwargs)
+
+		if not METRICS_AVAILABLE:
+			return wrapper
+		# Метка - модуль слоя базы данных и имя функции, например articles.select_article
+		function = f"{async_func.__module__.rsplit('.', 1)[-1]}.{async_func.__name__}"
+
+		@wraps(async_func)
+		async def timed_wrapper(*args, **kwargs) -> Any:
+			started = time.perf_counter()
+			try:
+				return await wrapper(*args, **kwargs)
+			finally:
+				observe_db_call(function, time.perf_counter() - started)
+		return timed_wrapper
+	return decorator
+
+
+def sync_stream_fallback(sync_func: Callable[..., Iterator[Any]]
+						 ) -> Callable[[Callable[..., AsyncIterator[Any]]], Callable[..., AsyncIterator[Any]]]:
+	"""
+	sync_fallback для асинхронных генераторов: при ASYNC_DB_ENABLED=false элементы берутся из синхронного генератора
+	с той же сигнатурой, каждый следующий - в пуле потоков. Досрочно закрытый генератор закрывает и источник,
+	чтобы соединение сразу вернулось в пул.
+	"""
+	def decorator(async_func: Callable[..., AsyncIterator[Any]]) -> Callable[..., AsyncIterator[Any]]:
+		@wraps(async_func)
+		async def wrapper(*args, **kwargs) -> AsyncIterator[Any]:
+			if ASYNC_DB_ENABLED:
+				async with aclosing(async_func(*args, **kwargs)) as items:
+					async for item in items:
+						yield item
+				return
+			items = sync_func(*args, **kwargs)
+			done = object()
+			try:
+				while (item := await asyncio.to_thread(next, items, done)) is not done:
+					yield item
+			finally:
+				await asyncio.to_thread(items.close)
+		return wrapper
+	return decorator
@@ -0,0 +1,163 @@
+"""
+Чтение страниц ленты через кэш Redis с защитой от лавины запросов.
+
+При промахе страницу пересчитывает только один запрос: внутри процесса одинаковые запросы ждут общую задачу,
+а между воркерами - блокировку SET NX. Остальные ждут, пока страница появится в кэше, не дольше
+FEED_CACHE_LOCK_WAIT, после чего считают её сами. Ошибки Redis не ломают ленту: страница берётся из базы.
+"""
+from collections.abc import Awaitable, Callable
+from logging import Logger
+from typing import Any, Optional
+import asyncio
+import copy
+import json
+import time
+
+from redis.exceptions import RedisError
+
+from .connect import connect_redis
+from ..feed_cache import (FEED_PAGES_KEY, FEED_VERSION_KEY, FEED_LOCK_KEY, FEED_STATS_KEY, LOOKUP_PAGE_SCRIPT,
+						  STORE_PAGE_SCRIPT, feed_scope, invalidation_keys)
+from ...logger import configure_logs
+from ...static import FEED_CACHE_ENABLED, FEED_CACHE_TTL, FEED_CACHE_LOCK_TTL, FEED_CACHE_LOCK_WAIT
+
+__all__: list[str] = ["cached_feed_page", "invalidate_feed_pages", "invalidate_author_pages", "feed_cache_stats"]
+logger: Logger = configure_logs(__name__)
+
+# Интервал опроса кэша, пока страницу пересчитывает другой воркер
+LOCK_POLL_INTERVAL: float = 0.05
+
+# Пересчёты страниц, выполняющиеся в этом процессе: ключ страницы -> задача
+_inflight: dict[tuple[str, str], asyncio.Task] = {}
+
+
+def _decode(raw: bytes | None) -> dict | None:
+	if raw is None:
+		return None
+	page = json.loads(raw)
+	return page["data"] if page["expires"] > time.time() else None
+
+
+async def _lookup(scope: str, field: str) -> tuple[dict | None, bytes]:
+	client = connect_redis()
+	raw, version = await client.register_script(LOOKUP_PAGE_SCRIPT)(
+		keys=[FEED_PAGES_KEY.format(scope=scope), FEED_VERSION_KEY.format(scope=scope), FEED_STATS_KEY],
+		args=[field]
+	)
+	return _decode(raw), version
+
+
+async def _load_and_store(scope: str, field: str, version: bytes, loader: Callable[[], Awaitable[dict]]) -> dict:
+	client = connect_redis()
+	lock_key = FEED_LOCK_KEY.format(scope=scope, page=field)
+	try:
+		locked = await client.set(lock_key, 1, nx=True, px=int(FEED_CACHE_LOCK_TTL * 1000))
+		if not locked:
+			# Страницу уже пересчитывает другой воркер - ждём её появления в кэше
+			await client.hincrby(FEED_STATS_KEY, "lock_waits", 1)
+			deadline = time.monotonic() + FEED_CACHE_LOCK_WAIT
+			while time.monotonic() < deadline:
+				await asyncio.sleep(LOCK_POLL_INTERVAL)
+				page = _decode(await client.hget(FEED_PAGES_KEY.format(scope=scope), field))
+				if page is not None:
+					return page
+	except RedisError as e:
+		logger.error("Redis: ошибка блокировки кэша ленты: %s", e)
+		return await loader()
+
+	try:
+		# Ошибки loader (в том числе RedisError) передаются вызывающему, перехватывается только запись в кэш
+		data = await loader()
+		value = json.dumps({"expires": time.time() + FEED_CACHE_TTL, "data": data}, ensure_ascii=False)
+		try:
+			await client.register_script(STORE_PAGE_SCRIPT)(
+				keys=[FEED_PAGES_KEY.format(scope=scope), FEED_VERSION_KEY.format(scope=scope)],
+				args=[field, value, version, FEED_CACHE_TTL]
+			)
+		except RedisError as e:
+			logger.error("Redis: ошибка записи кэша ленты: %s", e)
+	finally:
+		if locked:
+			try:
+				await client.delete(lock_key)
+			except RedisError as e:
+				logger.error("Redis: не удалось снять блокировку кэша ленты: %s", e)
+	return data
+
+
+async def cached_feed_page(login: Optional[str], page: str, amount: Optional[int],
+						   loader: Callable[[], Awaitable[dict]]) -> dict:
+	"""
+	Возвращает страницу ленты из кэша или вычисляет её через loader и кэширует на FEED_CACHE_TTL.
+
+	:param login: Фильтр ленты по автору; None - общая лента.
+	:param page: Описание позиции страницы: номер или курсор.
+	:param amount: Размер страницы.
+	:param loader: Функция, вычисляющая страницу при промахе. Результат должен сериализоваться в JSON.
+	:return: Страница ленты. Одновременные промахи одного воркера получают результат одного вызова loader,
+		поэтому каждому возвращается поверхностная копия словаря; вложенные значения общие и не должны меняться.
+	"""
+	if not FEED_CACHE_ENABLED:
+		return await loader()
+	scope, field = feed_scope(login), f"{page}:{amount}"
+	try:
+		data, version = await _lookup(scope, field)
+	except RedisError as e:
+		logger.error("Redis: ошибка чтения кэша ленты: %s", e)
+		return await loader()
+	if data is not None:
+		return data
+
+	task = _inflight.get((scope, field))
+	if task is None:
+		async def load() -> dict:
+			try:
+				return await _load_and_store(scope, field, version, loader)
+			finally:
+				_inflight.pop((scope, field), None)
+
+		task = _inflight[(scope, field)] = asyncio.ensure_future(load())
+	return copy.copy(await asyncio.shield(task))
+
+
+async def invalidate_feed_pages(*logins: Optional[str]) -> None:
+	"""
+	Сбрасывает закэшированные страницы общей ленты и лент указанных авторов.
+	Ошибка Redis не прерывает запись статьи: страницы устареют не дольше чем на FEED_CACHE_TTL.
+	"""
+	if not FEED_CACHE_ENABLED:
+		return
+	try:
+		async with connect_redis().pipeline(transaction=True) as pipe:
+			for pages_key, version_key in invalidation_keys(logins):
+				pipe.delete(pages_key)
+				pipe.incr(version_key)
+			await pipe.execute()
+	except Exception as e:
+		logger.error("Redis: не удалось сбросить кэш ленты для %s: %s", logins, e)
+
+
+async def invalidate_author_pages(login: str) -> None:
+	"""
+	Сбрасывает ленту и профиль одного автора, не трогая общую ленту: для изменений данных автора, а не его статей.
+	"""
+	if not FEED_CACHE_ENABLED:
+		return
+	try:
+		async with connect_redis().pipeline(transaction=True) as pipe:
+			for pages_key, version_key in invalidation_keys([login], include_all=False):
+				pipe.delete(pages_key)
+				pipe.incr(version_key)
+			await pipe.execute()
+	except Exception as e:
+		logger.error("Redis: не удалось сбросить кэш ленты автора %s: %s", login, e)
+
+
+async def feed_cache_stats() -> dict[str, Any]:
+	"""Счётчики кэша ленты, общие для всех воркеров: попадания, промахи и ожидания блокировки."""
+	raw = await connect_redis().hgetall(FEED_STATS_KEY)
+	stats = {"hits": 0, "misses": 0, "lock_waits": 0}
+	stats.update({key.decode("utf-8"): int(value) for key, value in raw.items()})
+	lookups = stats["hits"] + stats["misses"]
+	stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+	return stats
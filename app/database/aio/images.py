@@ -0,0 +1,297 @@
+"""
+Асинхронные аналоги функций app.database.images.
+
+Работают через общий клиент redis.asyncio, поэтому маршруты могут ожидать операции с изображениями,
+не блокируя цикл событий. Байты изображений читаются и пишутся через хранилище get_async_blob_store()
+(см. aio.blobstore).
+"""
+
+from typing import Optional
+from logging import Logger
+import asyncio
+import uuid
+
+from .blobstore import AsyncBlobWriter, AsyncRedisBlobWriter, get_async_blob_store
+from .connect import connect_redis, sync_fallback
+from .. import images
+from ..images import (ARTICLE_IMAGES_LIST, DELETE_IMAGES_SCRIPT, IMAGE_SIGNATURE_BYTES, image_key,
+                      delete_script_params, merge_deleted)
+from ..exceptions.images import ImageTooLargeException, InvalidUploadException
+from ...imaging import render_variants, get_derivatives_executor
+from ...logger import configure_logs
+from ...models.articles import ImagesAdd, ImageResult
+from ...static import IMAGE_DECODE_OFFLOAD_BYTES, MAX_IMAGE_BYTES, IMAGE_UPLOAD_CHUNK_BYTES
+
+__all__ = ["insert_images", "delete_images", "select_article_images", "select_images_batch", "get_image_bytes",
+           "insert_images_batch", "delete_images_batch", "get_image_head", "get_image_range", "ImageUpload",
+           "schedule_derivatives", "image_path"]
+logger: Logger = configure_logs(__name__)
+
+
+# Ссылки на фоновые задачи создания вариантов, чтобы их не удалил сборщик мусора до завершения
+_derivative_tasks: set[asyncio.Task] = set()
+
+
+async def _generate_derivatives(article_id: int, images_data: dict[str, Optional[bytes]]) -> None:
+    executor = get_derivatives_executor()
+    loop = asyncio.get_running_loop()
+    for image_id, data in images_data.items():
+        try:
+            if data is None:
+                data = await get_image_bytes(article_id, image_id)
+                if data is None:
+                    continue
+            variants = await loop.run_in_executor(executor, render_variants, data)
+            if await get_async_blob_store().write_variants(article_id, image_id, variants):
+                logger.info("Сохранены варианты %s изображения %s", list(variants), image_id)
+        except Exception as e:
+            logger.warning("Не удалось создать варианты изображения %s статьи %s: %s", image_id, article_id, e)
+
+
+def schedule_derivatives(article_id: int, images_data: dict[str, Optional[bytes]]) -> None:
+    """
+    Запускает в фоне создание вариантов изображений в пуле процессов, не задерживая ответ на запрос.
+
+    Варианты сохраняются рядом с оригиналом по ключам image:{article_id}:{image_id}:{variant}.
+
+    :param article_id: Идентификатор статьи.
+    :param images_data: Словарь image_id -> байты оригинала; None - прочитать оригинал из хранилища.
+    """
+    if not images_data or get_derivatives_executor() is None:
+        return
+    task = asyncio.create_task(_generate_derivatives(article_id, images_data))
+    _derivative_tasks.add(task)
+    task.add_done_callback(_derivative_tasks.discard)
+
+
+@sync_fallback(images.insert_images_batch)
+async def insert_images_batch(images_data: ImagesAdd) -> list[ImageResult]:
+    """
+    Вставляет пакет изображений за один атомарный запрос к Redis (MULTI/EXEC).
+
+    Если суммарный размер base64 превышает IMAGE_DECODE_OFFLOAD_BYTES, декодирование выполняется
+    в пуле потоков, чтобы не занимать цикл событий.
+
+    :param images_data: Объект с идентификатором статьи и списком изображений в формате base64.
+    :return: Результат для каждого изображения в порядке запроса.
+    """
+    article_id = images_data.article_id
+    if sum(len(b64) for b64 in images_data.images) > IMAGE_DECODE_OFFLOAD_BYTES:
+        decoded = await asyncio.to_thread(images.decode_images, images_data.images)
+    else:
+        decoded = images.decode_images(images_data.images)
+    results, to_store = images.prepare_images(article_id, decoded)
+    if to_store:
+        blob_store = get_async_blob_store()
+        try:
+            async with connect_redis().pipeline(transaction=True) as pipe:
+                await blob_store.write_batch(article_id, to_store, pipe)
+                pipe.rpush(ARTICLE_IMAGES_LIST.format(article_id=article_id), *to_store)
+                await pipe.execute()
+        except Exception:
+            await blob_store.delete_unlisted(article_id, list(to_store))
+            raise
+        schedule_derivatives(article_id, to_store)
+    logger.info("Вставлено %d из %d изображений для статьи %s",
+                len(to_store), len(results), article_id)
+    return results
+
+
+async def insert_images(images_data: ImagesAdd) -> list[str]:
+    """
+    Вставляет изображения в Redis и сохраняет связь с соответствующей статьей.
+
+    :param images_data: Объект с идентификатором статьи и списком изображений в формате base64.
+    :return: Список сгенерированных image_id для дальнейшего формирования URL.
+    """
+    return [result.image_id for result in await insert_images_batch(images_data) if result.success]
+
+
+@sync_fallback(images.delete_images_batch)
+async def delete_images_batch(article_id: int, image_ids: list[str]) -> list[ImageResult]:
+    """
+    Удаляет пакет изображений статьи одним атомарным Lua-скриптом.
+
+    :param article_id: Идентификатор статьи, из которой удаляются изображения.
+    :param image_ids: Список идентификаторов изображений для удаления.
+    :return: Результат для каждого изображения в порядке запроса.
+    """
+    logger.info("Удаление %d изображений для статьи %s", len(image_ids), article_id)
+    if not image_ids:
+        return []
+    keys, args = delete_script_params(article_id, image_ids)
+    flags = await connect_redis().register_script(DELETE_IMAGES_SCRIPT)(keys=keys, args=args)
+    flags = merge_deleted(flags, await get_async_blob_store().delete_unlisted(article_id, image_ids))
+    results = [ImageResult(index=index, image_id=image_id, success=bool(flag),
+                           error=None if flag else "Изображение не найдено")
+               for index, (image_id, flag) in enumerate(zip(image_ids, flags))]
+    logger.info("Удалено %d изображений для статьи %s", sum(flags), article_id)
+    return results
+
+
+async def delete_images(article_id: int, image_ids: list[str]) -> list[str]:
+    """
+    Удаляет указанные изображения для данной статьи.
+
+    :param article_id: Идентификатор статьи, из которой удаляются изображения.
+    :param image_ids: Список идентификаторов изображений для удаления.
+    :return: Список удалённых идентификаторов изображений.
+    """
+    return [result.image_id for result in await delete_images_batch(article_id, image_ids) if result.success]
+
+
+@sync_fallback(images.select_article_images)
+async def select_article_images(article_id: int, announce: bool = False) -> list[str]:
+    """
+    Получает список идентификаторов изображений для заданной статьи.
+
+    :param article_id: Идентификатор статьи.
+    :param announce: Если True, возвращает только первый идентификатор изображений.
+    :return: Список идентификаторов изображений, закодированных в UTF-8.
+    """
+    redis_client = connect_redis()
+    list_key = ARTICLE_IMAGES_LIST.format(article_id=article_id)
+    raw_ids = await redis_client.lrange(list_key, 0, 0 if announce else -1)
+    image_ids = [rid.decode('utf-8') for rid in raw_ids]
+    logger.info("Redis: получено %d image_id для статьи %s (announce=%s)", len(image_ids), article_id, announce)
+    return image_ids
+
+
+@sync_fallback(images.select_images_batch)
+async def select_images_batch(article_ids: list[int], announce: bool = False) -> dict[int, list[str]]:
+    """
+    Получает списки идентификаторов изображений для нескольких статей одним конвейером Redis.
+
+    :param article_ids: Идентификаторы статей.
+    :param announce: Если True, для каждой статьи возвращается только первый идентификатор (обложка).
+    :return: Словарь article_id -> список идентификаторов изображений; у статьи без изображений список пуст.
+    """
+    if not article_ids:
+        return {}
+    async with connect_redis().pipeline(transaction=False) as pipe:
+        for article_id in article_ids:
+            pipe.lrange(ARTICLE_IMAGES_LIST.format(article_id=article_id), 0, 0 if announce else -1)
+        replies = await pipe.execute()
+    logger.info("Redis: получены списки изображений для %d статей (announce=%s)", len(article_ids), announce)
+    return {article_id: [rid.decode('utf-8') for rid in raw_ids] for article_id, raw_ids in zip(article_ids, replies)}
+
+
+@sync_fallback(images.get_image_bytes)
+async def get_image_bytes(article_id: int, image_id: str, variant: Optional[str] = None) -> bytes | None:
+    """
+    Извлекает байты изображения по-заданному article_id и image_id.
+
+    :param article_id: Идентификатор статьи.
+    :param image_id: Идентификатор изображения.
+    :param variant: Имя варианта из IMAGE_VARIANTS; None - оригинал.
+    :return: Байты изображения, либо None если изображение не найдено.
+    """
+    data = await get_async_blob_store().read(article_id, image_id, variant)
+    if data is None:
+        logger.error("Изображение не найдено: %s", image_key(article_id, image_id, variant))
+    return data
+
+
+@sync_fallback(images.get_image_head)
+async def get_image_head(article_id: int, image_id: str, variant: Optional[str] = None) -> tuple[int, bytes] | None:
+    """
+    Получает размер изображения и его первые байты, не читая изображение целиком.
+
+    :param article_id: Идентификатор статьи.
+    :param image_id: Идентификатор изображения.
+    :param variant: Имя варианта из IMAGE_VARIANTS; None - оригинал.
+    :return: Размер в байтах и первые IMAGE_SIGNATURE_BYTES байтов, либо None если изображение не найдено.
+    """
+    return await get_async_blob_store().head(article_id, image_id, IMAGE_SIGNATURE_BYTES, variant)
+
+
+@sync_fallback(images.get_image_range)
+async def get_image_range(article_id: int, image_id: str, start: int, end: int,
+                          variant: Optional[str] = None) -> bytes:
+    """
+    Извлекает диапазон байтов изображения [start, end] включительно.
+
+    :param article_id: Идентификатор статьи.
+    :param image_id: Идентификатор изображения.
+    :param start: Смещение первого байта.
+    :param end: Смещение последнего байта.
+    :param variant: Имя варианта из IMAGE_VARIANTS; None - оригинал.
+    :return: Байты диапазона (пустые, если изображение не найдено).
+    """
+    return await get_async_blob_store().read_range(article_id, image_id, start, end, variant)
+
+
+async def image_path(article_id: int, image_id: str, variant: Optional[str] = None) -> str | None:
+    """
+    Путь к файлу изображения в файловом хранилище, чтобы отдать его без копирования через процесс.
+
+    :return: Путь к файлу, либо None если байты изображения хранятся в Redis или изображение не найдено.
+    """
+    return await get_async_blob_store().open_path(article_id, image_id, variant)
+
+
+class ImageUpload:
+    """
+    Потоковая запись одного изображения в хранилище частями.
+
+    Байты копятся в буфере не больше IMAGE_UPLOAD_CHUNK_BYTES и дописываются командой APPEND во временный ключ
+    с TTL (или во временный файл при файловом хранилище), поэтому память на загрузку ограничена размером буфера
+    независимо от размера изображения. commit() атомарно переименовывает временный ключ (файл) в ключ (файл)
+    изображения и добавляет image_id в список статьи.
+    """
+
+    def __init__(self, article_id: int, max_bytes: int = MAX_IMAGE_BYTES) -> None:
+        self.article_id = article_id
+        self.image_id = str(uuid.uuid4())
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._buffer = bytearray()
+        self._writer: AsyncBlobWriter | AsyncRedisBlobWriter | None = None
+
+    async def write(self, data: bytes) -> None:
+        """
+        Добавляет очередную часть изображения.
+        :raises ImageTooLargeException: Если изображение превысило max_bytes.
+        """
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise ImageTooLargeException(f"Изображение превышает {self.max_bytes} байт")
+        self._buffer.extend(data)
+        if len(self._buffer) >= IMAGE_UPLOAD_CHUNK_BYTES:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._buffer:
+            return
+        if self._writer is None:
+            self._writer = await get_async_blob_store().writer(self.article_id, self.image_id)
+        await self._writer.write(bytes(self._buffer))
+        self._buffer.clear()
+
+    async def commit(self) -> str:
+        """
+        Завершает загрузку и делает изображение доступным в статье.
+        :return: Сгенерированный image_id.
+        :raises InvalidUploadException: Если изображение пустое.
+        """
+        if self.size == 0:
+            raise InvalidUploadException("Пустое изображение")
+        await self._flush()
+        try:
+            async with connect_redis().pipeline(transaction=True) as pipe:
+                await self._writer.commit(pipe)
+                pipe.rpush(ARTICLE_IMAGES_LIST.format(article_id=self.article_id), self.image_id)
+                await pipe.execute()
+        except Exception:
+            await get_async_blob_store().delete_unlisted(self.article_id, [self.image_id])
+            raise
+        logger.info("Загружено изображение %s (%d байт) для статьи %s",
+                    self.image_id, self.size, self.article_id)
+        schedule_derivatives(self.article_id, {self.image_id: None})
+        return self.image_id
+
+    async def abort(self) -> None:
+        """Отменяет загрузку и удаляет уже записанные части."""
+        self._buffer.clear()
+        if self._writer is not None:
+            await self._writer.abort()
@@ -0,0 +1,64 @@
+"""
+Фоновая подписка воркера на канал Redis pub/sub с переподключением.
+"""
+from collections.abc import Awaitable, Callable
+from logging import Logger
+import asyncio
+
+from .connect import connect_redis
+from ...logger import configure_logs
+
+__all__: list[str] = ["listen_channel", "stop_listener"]
+logger: Logger = configure_logs(__name__)
+
+# Пауза перед повторной подпиской после потери соединения с Redis: удваивается до LISTENER_RETRY_MAX_DELAY
+LISTENER_RETRY_DELAY: float = 1.0
+LISTENER_RETRY_MAX_DELAY: float = 30.0
+
+
+async def listen_channel(channel: str, on_message: Callable[[bytes], Awaitable[None]],
+						 on_subscribe: Callable[[], Awaitable[None]]) -> None:
+	"""
+	Бесконечно слушает канал и передаёт данные каждого сообщения в on_message.
+
+	После каждой (в том числе повторной) подписки вызывается on_subscribe: пока подписки не было, сообщения могли
+	быть пропущены, и подписчик должен сбросить или перечитать своё состояние. Исключение on_message логируется
+	и не прерывает подписку. Завершается только отменой задачи.
+	"""
+	delay = LISTENER_RETRY_DELAY
+	while True:
+		pubsub = connect_redis().pubsub()
+		try:
+			await pubsub.subscribe(channel)
+			await on_subscribe()
+			delay = LISTENER_RETRY_DELAY
+			logger.info("Подписка на канал %s", channel)
+			while True:
+				message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+				if message is None or message["type"] != "message":
+					continue
+				try:
+					await on_message(message["data"])
+				except Exception as e:
+					logger.warning("Не удалось обработать сообщение канала %s %r: %s", channel, message["data"], e)
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			logger.error("Redis: подписка на канал %s прервана, повтор через %.0f с: %s", channel, delay, e)
+			await asyncio.sleep(delay)
+			delay = min(delay * 2, LISTENER_RETRY_MAX_DELAY)
+		finally:
+			try:
+				await pubsub.aclose()
+			except Exception:
+				pass
+
+
+async def stop_listener(task: asyncio.Task | None) -> None:
+	"""Отменяет задачу подписки и дожидается её завершения."""
+	if task is not None:
+		task.cancel()
+		try:
+			await task
+		except asyncio.CancelledError:
+			pass
@@ -0,0 +1,88 @@
+"""
+Постраничное чтение результатов поиска через снимки в Redis (см. app.database.search_cache).
+Ошибки Redis не ломают поиск: выдача ранжируется заново.
+"""
+from collections.abc import Awaitable, Callable
+from logging import Logger
+from typing import Any, Optional
+
+from redis.exceptions import RedisError
+
+from .connect import connect_redis
+from ..search import search_window
+from ..search_cache import (SEARCH_SNAPSHOTS_KEY, SEARCH_VERSION_KEY, SEARCH_STATS_KEY, LOOKUP_SNAPSHOT_SCRIPT,
+							STORE_SNAPSHOT_SCRIPT, INVALIDATE_SNAPSHOTS_SCRIPT, normalize_query, snapshot_key,
+							encode_hit, decode_hit)
+from ...logger import configure_logs
+from ...static import SEARCH_CACHE_ENABLED, SEARCH_CACHE_TTL
+
+__all__: list[str] = ["search_page", "invalidate_search_snapshots", "search_cache_stats"]
+logger: Logger = configure_logs(__name__)
+
+
+async def _store(key: str, version: bytes, hits: list[dict]) -> None:
+	try:
+		await connect_redis().register_script(STORE_SNAPSHOT_SCRIPT)(
+			keys=[key, SEARCH_VERSION_KEY, SEARCH_SNAPSHOTS_KEY],
+			args=[version, SEARCH_CACHE_TTL, len(hits), *(encode_hit(row) for row in hits)]
+		)
+	except RedisError as e:
+		logger.error("Redis: ошибка записи снимка поиска: %s", e)
+
+
+async def search_page(query_str: str, amount: Optional[int], chunk: Optional[int], login: Optional[str],
+					  loader: Callable[[str, Optional[str]], Awaitable[list[dict]]]) -> tuple[list[dict], int]:
+	"""
+	Возвращает страницу результатов поиска и общее число найденных статей (не больше SEARCH_TOP_K).
+
+	При промахе loader ранжирует всю выдачу нормализованного запроса, она сохраняется снимком на SEARCH_CACHE_TTL,
+	и следующие страницы читаются из него.
+	:param loader: Поиск всей выдачи: принимает нормализованный запрос и фильтр по логину.
+	"""
+	query_str = normalize_query(query_str)
+	offset, limit = search_window(amount, chunk)
+	if not SEARCH_CACHE_ENABLED:
+		hits = await loader(query_str, login)
+		return hits[offset:limit], len(hits)
+
+	key = snapshot_key(query_str, login)
+	try:
+		total, version, *page = await connect_redis().register_script(LOOKUP_SNAPSHOT_SCRIPT)(
+			keys=[key, SEARCH_VERSION_KEY, SEARCH_STATS_KEY],
+			args=[offset, limit - 1]
+		)
+	except RedisError as e:
+		logger.error("Redis: ошибка чтения снимка поиска: %s", e)
+		hits = await loader(query_str, login)
+		return hits[offset:limit], len(hits)
+	if total is not None:
+		return [decode_hit(raw) for raw in page[0]], int(total)
+
+	hits = await loader(query_str, login)
+	await _store(key, version, hits)
+	return hits[offset:limit], len(hits)
+
+
+async def invalidate_search_snapshots() -> None:
+	"""
+	Удаляет все снимки результатов поиска.
+	Ошибка Redis не прерывает запись статьи: снимки устареют не дольше чем на SEARCH_CACHE_TTL.
+	"""
+	if not SEARCH_CACHE_ENABLED:
+		return
+	try:
+		await connect_redis().register_script(INVALIDATE_SNAPSHOTS_SCRIPT)(
+			keys=[SEARCH_SNAPSHOTS_KEY, SEARCH_VERSION_KEY]
+		)
+	except Exception as e:
+		logger.error("Redis: не удалось сбросить снимки поиска: %s", e)
+
+
+async def search_cache_stats() -> dict[str, Any]:
+	"""Счётчики снимков поиска, общие для всех воркеров: попадания и промахи."""
+	raw = await connect_redis().hgetall(SEARCH_STATS_KEY)
+	stats = {"hits": 0, "misses": 0}
+	stats.update({key.decode("utf-8"): int(value) for key, value in raw.items()})
+	lookups = stats["hits"] + stats["misses"]
+	stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+	return stats
@@ -0,0 +1,101 @@
+"""
+Асинхронная часть индекса подсказок: построение из базы, публикация изменений и подписка на изменения из других
+воркеров (см. app.database.suggest).
+"""
+from logging import Logger
+from typing import Optional
+import asyncio
+import json
+
+from .connect import apg_connection, sync_fallback, connect_redis
+from .pubsub import listen_channel, stop_listener
+from .. import suggest
+from ..suggest import (suggest_index, suggestion_message, apply_suggestion_message, SUGGEST_ARTICLES_SQL,
+					   SUGGEST_LOGINS_SQL)
+from ...logger import configure_logs
+from ...static import SUGGEST_ENABLED, SUGGEST_CHANNEL
+
+__all__: list[str] = ["load_suggest_index", "publish_article_suggestion", "publish_article_removal",
+					  "publish_login_suggestion", "start_suggest_listener", "stop_suggest_listener"]
+logger: Logger = configure_logs(__name__)
+
+_listener_task: asyncio.Task | None = None
+_subscriptions: int = 0
+
+
+@sync_fallback(suggest.load_suggest_index)
+async def load_suggest_index() -> None:
+	"""Строит индекс подсказок процесса из базы."""
+	suggest_index.begin_rebuild()
+	try:
+		async with apg_connection() as conn:
+			articles = [tuple(row) for row in await conn.fetch(SUGGEST_ARTICLES_SQL)]
+			logins = [row["login"] for row in await conn.fetch(SUGGEST_LOGINS_SQL)]
+	except Exception:
+		suggest_index.cancel_rebuild()
+		raise
+	suggest_index.finish_rebuild(articles, logins)
+	logger.info("Индекс подсказок построен: %s", suggest_index.stats())
+
+
+async def _publish(message: str) -> None:
+	try:
+		await connect_redis().publish(SUGGEST_CHANNEL, message)
+	except Exception as e:
+		logger.error("Redis: не удалось оповестить воркеры об изменении подсказок: %s", e)
+
+
+async def publish_article_suggestion(article_id: int, title: str, login: Optional[str]) -> None:
+	"""Добавляет или обновляет статью в индексе подсказок этого процесса и остальных воркеров."""
+	if SUGGEST_ENABLED and article_id is not None:
+		suggest_index.upsert_article(article_id, title, login)
+		await _publish(suggestion_message(article_id=article_id, title=title, login=login))
+
+
+async def publish_article_removal(article_id: int) -> None:
+	"""Удаляет статью из индекса подсказок этого процесса и остальных воркеров."""
+	if SUGGEST_ENABLED:
+		suggest_index.remove_article(article_id)
+		await _publish(suggestion_message(article_id=article_id, removed=True))
+
+
+async def publish_login_suggestion(login: str) -> None:
+	"""Добавляет логин нового пользователя в индекс подсказок этого процесса и остальных воркеров."""
+	if SUGGEST_ENABLED:
+		suggest_index.add_login(login)
+		await _publish(suggestion_message(login=login))
+
+
+async def _on_message(data: bytes) -> None:
+	if json.loads(data).get("rebuild"):
+		await load_suggest_index()
+	else:
+		apply_suggestion_message(data)
+
+
+async def _on_subscribe() -> None:
+	global _subscriptions
+	_subscriptions += 1
+	# Первая подписка следует сразу за построением индекса при запуске; после переподключения
+	# пропущенные изменения восстанавливаются только полным перестроением
+	if _subscriptions > 1 or suggest_index.loaded_at is None:
+		await load_suggest_index()
+
+
+async def start_suggest_listener() -> None:
+	"""Строит индекс подсказок и запускает фоновую подписку воркера на его изменения."""
+	global _listener_task
+	if not SUGGEST_ENABLED or _listener_task is not None:
+		return
+	try:
+		await load_suggest_index()
+	except Exception as e:
+		logger.error("Не удалось построить индекс подсказок при запуске: %s", e)
+	_listener_task = asyncio.create_task(listen_channel(SUGGEST_CHANNEL, _on_message, _on_subscribe))
+
+
+async def stop_suggest_listener() -> None:
+	"""Останавливает фоновую подписку на изменения подсказок."""
+	global _listener_task
+	await stop_listener(_listener_task)
+	_listener_task = None
@@ -0,0 +1,208 @@
+"""Асинхронные аналоги функций app.database.users на asyncpg."""
+from logging import Logger
+
+import asyncpg
+
+from .connect import apg_connection, sync_fallback, CONNECTION_ERRORS
+from .feed_cache import invalidate_author_pages
+from .suggest import publish_login_suggestion
+from .. import users
+from ..exceptions.change_password import *
+from ...logger import configure_logs
+from ...passwords import hash_password_async, verify_password_async
+from ...models.user_info import AuthorInfoRow
+
+__all__: list[str] = ["insert_user", "change_password", "process_user", "check_credentials", "check_login",
+					  "select_user_info", "change_description", "select_password_hash"]
+logger: Logger = configure_logs(__name__)
+
+
+async def insert_user(conn: asyncpg.Connection, user: dict) -> bool:
+	"""
+	Вставляет запись в таблице users.users.
+	Возвращает True, если операция прошла успешно, иначе False.
+	"""
+	try:
+		query = """
+            INSERT INTO users.users (
+                login, password, description
+            ) VALUES ($1, $2, $3);
+        """
+		params = (
+			user.get('login'),
+			await hash_password_async(user.get('password')),
+			user.get('description')
+		)
+		logger.debug("Вставка пользователя с login %s", user.get('login'))
+		await conn.execute(query, *params)
+		logger.debug("Пользователь с login %s успешно вставлен.", user.get('login'))
+		return True
+	except asyncpg.UniqueViolationError as e:
+		logger.exception("Пользователь с login %s уже существует: %s", user.get('login'), e)
+		raise
+	except Exception as e:
+		logger.exception("Ошибка при вставке пользователя с login %s: %s", user.get('login'), e)
+		return False
+
+
+@sync_fallback(users.change_password)
+async def change_password(login: str, old_password: str, new_password: str) -> bool | None:
+	try:
+		async with apg_connection() as conn, conn.transaction():
+			password: str | None = await conn.fetchval("SELECT password FROM users.users WHERE login = $1;", login)
+
+			if password is None:
+				raise IncorrectLoginException(f"Логин {login} не найден")
+
+			if not await verify_password_async(old_password, password):
+				raise OldPasswordMismatchException("Неверный старый пароль")
+
+			if old_password == new_password:
+				raise SamePasswordException("Новый пароль совпадает со старым")
+
+			await conn.execute("UPDATE users.users SET password = $1 WHERE login = $2;",
+							   await hash_password_async(new_password), login)
+			logger.debug("Пароль успешно изменён для пользователя с login %s", login)
+			return True
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		return False
+
+
+@sync_fallback(users.process_user)
+async def process_user(user: dict) -> bool | None:
+	"""
+	Обрабатывает и вставляет пользователя в базу данных.
+	Использует aio.connect.apg_connection() для получения соединения из пула.
+	"""
+	logger.info("Начало обработки пользователя %s.", user.get('login'))
+	try:
+		async with apg_connection() as conn:
+			transaction = conn.transaction()
+			await transaction.start()
+			try:
+				await conn.execute("SET LOCAL search_path TO users, public;")
+				logger.debug("Поисковый путь установлен на схемы 'users' и 'public'.")
+				if not await insert_user(conn, user):
+					await transaction.rollback()
+					logger.error("Ошибка вставки пользователя %s, транзакция откатилась.", user.get('login'))
+					return False
+			except Exception:
+				await transaction.rollback()
+				raise
+			await transaction.commit()
+			logger.info("Транзакция зафиксирована для пользователя %s.", user.get('login'))
+			await publish_login_suggestion(user.get('login'))
+			return True
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения для пользователя %s. Ошибка: %s", user.get('login'), e)
+	except asyncpg.UniqueViolationError:
+		raise
+	except Exception as e:
+		logger.error("Транзакция откатилась для пользователя %s. Ошибка: %s", user.get('login'), e)
+
+
+@sync_fallback(users.check_credentials)
+async def check_credentials(login: str, password: str) -> bool | None:
+	"""
+	Проверяет корректность логина и пароля.
+	"""
+	logger.info("Начало проверки учетных данных в базе данных.")
+	try:
+		async with apg_connection() as conn:
+			query = """
+                SELECT EXISTS (
+                    SELECT 1
+                    FROM users.users
+                    WHERE login = $1 AND password = $2
+                ) AS is_valid;
+            """
+			hashed_password = await hash_password_async(password)
+			result = bool(await conn.fetchval(query, login, hashed_password))
+			logger.info("Результат проверки учетных данных: %s", result)
+			return result
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@sync_fallback(users.select_password_hash)
+async def select_password_hash(login: str) -> str | None:
+	"""
+	Получает сохранённый хэш пароля одним запросом.
+	Возвращает None, если пользователя с таким логином нет.
+	"""
+	logger.info("Получение хэша пароля пользователя %s.", login)
+	try:
+		async with apg_connection() as conn:
+			return await conn.fetchval("SELECT password FROM users.users WHERE login = $1;", login)
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@sync_fallback(users.check_login)
+async def check_login(login: str) -> bool | None:
+	"""
+	Проверяет корректность логина.
+	"""
+	logger.info("Начало проверки логина в базе данных.")
+	try:
+		async with apg_connection() as conn:
+			query = """
+                SELECT EXISTS (
+                    SELECT 1
+                    FROM users.users
+                    WHERE login = $1
+                ) AS is_valid;
+            """
+			result: bool = bool(await conn.fetchval(query, login))
+			logger.info("Результат проверки логина: %s", result)
+			return result
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@sync_fallback(users.select_user_info)
+async def select_user_info(username: str) -> AuthorInfoRow | None:
+	logger.info("Начало получения данных о пользователе %s", username)
+	try:
+		async with apg_connection() as conn:
+			query = """
+				SELECT
+					id,
+					login,
+					description
+				FROM users.users us
+				WHERE us.login = $1
+			"""
+			row = await conn.fetchrow(query, username)
+			logger.info("Получен пользователь с id %s", username)
+			return AuthorInfoRow._make(row) if row is not None else None
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+@sync_fallback(users.change_description)
+async def change_description(username: str, description: str) -> None:
+	try:
+		async with apg_connection() as conn:
+			await conn.execute("UPDATE users.users SET description = $1 WHERE login = $2;", description, username)
+			logger.debug("Описание успешно изменёно для пользователя с login %s", username)
+		await invalidate_author_pages(username)
+	except CONNECTION_ERRORS as e:
+		logger.error("Ошибка соединения: %s", e)
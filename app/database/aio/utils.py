@@ -0,0 +1,34 @@
+from typing import Optional
+from logging import Logger
+
+from .connect import apg_connection, sync_fallback, CONNECTION_ERRORS
+from .. import utils
+from ...logger import configure_logs
+
+logger: Logger = configure_logs(__name__)
+
+
+@sync_fallback(utils.check_article_owner)
+async def check_article_owner(article_id: int, requester: str) -> Optional[bool]:
+    logger.info("Проверка владельца статьи %s для пользователя %s", article_id, requester)
+    try:
+        async with apg_connection() as conn:
+            actual_owner = await conn.fetchval(
+                """
+                SELECT u.login
+                FROM users.users u
+                JOIN articles.articles a ON u.id = a.user_id
+                WHERE a.article_id = $1
+                """,
+                article_id
+            )
+            if actual_owner is None:
+                raise ValueError(f"Статья с id={article_id} не найдена")
+            if actual_owner != requester:
+                raise PermissionError(
+                    f"Пользователь '{requester}' не является владельцем статьи (владелец: '{actual_owner}')"
+                )
+        return True
+    except CONNECTION_ERRORS as e:
+        logger.error("Ошибка соединения при проверке владельца: %s", e)
+        raise
@@ -0,0 +1,136 @@
+"""
+Кэш статей в памяти процесса.
+
+Каждый воркер uvicorn держит свой LRU-кэш статей, ограниченный суммарным размером в байтах и временем жизни
+записей. Чтобы воркеры не отдавали устаревшие статьи, изменение статьи публикуется в канал Redis
+ARTICLE_CACHE_CHANNEL, и все воркеры удаляют её из своих кэшей (см. aio.article_cache). Если сообщение
+потеряно, статья устареет не дольше чем на ARTICLE_CACHE_TTL.
+"""
+from collections import OrderedDict
+from collections.abc import Hashable
+from logging import Logger
+from typing import Any
+import threading
+import time
+import sys
+
+from .connect import connect_redis
+from ..compression import ENCODINGS
+from ..logger import configure_logs
+from ..static import ARTICLE_CACHE_ENABLED, ARTICLE_CACHE_MAX_BYTES, ARTICLE_CACHE_TTL, ARTICLE_CACHE_CHANNEL
+
+__all__: list[str] = ["LRUCache", "article_cache", "invalidate_article"]
+logger: Logger = configure_logs(__name__)
+
+
+def estimate_size(value: Any) -> int:
+	"""Приблизительный размер строки результата в памяти: кортеж и его элементы."""
+	if isinstance(value, (tuple, list)):
+		return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+	return sys.getsizeof(value)
+
+
+class LRUCache:
+	"""
+	Потокобезопасный LRU-кэш с ограничением суммарного размера значений в байтах и временем жизни записей.
+
+	Чтобы запрос, начавшийся до инвалидации, не положил в кэш устаревшее значение, set() принимает эпоху,
+	полученную через epoch() до чтения из базы, и ничего не сохраняет, если с тех пор была инвалидация.
+	"""
+
+	def __init__(self, max_bytes: int, ttl: float) -> None:
+		self.max_bytes = max_bytes
+		self.ttl = ttl
+		self._entries: OrderedDict[Hashable, tuple[Any, int, float]] = OrderedDict()
+		self._lock = threading.Lock()
+		self._size = 0
+		self._epoch = 0
+		self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+	def epoch(self) -> int:
+		return self._epoch
+
+	def get(self, key: Hashable) -> Any | None:
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				self._stats["misses"] += 1
+				return None
+			value, size, expires = entry
+			if expires <= time.monotonic():
+				self._remove(key)
+				self._stats["expirations"] += 1
+				self._stats["misses"] += 1
+				return None
+			self._entries.move_to_end(key)
+			self._stats["hits"] += 1
+			return value
+
+	def set(self, key: Hashable, value: Any, epoch: int) -> None:
+		size = estimate_size(value)
+		if size > self.max_bytes:
+			return
+		with self._lock:
+			if epoch != self._epoch:
+				return
+			if key in self._entries:
+				self._remove(key)
+			self._entries[key] = (value, size, time.monotonic() + self.ttl)
+			self._size += size
+			while self._size > self.max_bytes:
+				self._remove(next(iter(self._entries)))
+				self._stats["evictions"] += 1
+
+	def invalidate(self, keys: list[Hashable]) -> None:
+		with self._lock:
+			self._epoch += 1
+			for key in keys:
+				if key in self._entries:
+					self._remove(key)
+					self._stats["invalidations"] += 1
+
+	def clear(self) -> None:
+		with self._lock:
+			self._epoch += 1
+			self._entries.clear()
+			self._size = 0
+
+	def _remove(self, key: Hashable) -> None:
+		_, size, _ = self._entries.pop(key)
+		self._size -= size
+
+	def stats(self) -> dict[str, int | float]:
+		"""Размер кэша, вытеснения и доля попаданий в этом процессе."""
+		with self._lock:
+			lookups = self._stats["hits"] + self._stats["misses"]
+			return {
+				"entries": len(self._entries),
+				"size_bytes": self._size,
+				"max_bytes": self.max_bytes,
+				**self._stats,
+				"hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+			}
+
+
+# Кэш статей процесса. Ключ - (вид статьи, article_id): "data" для select_article, "full" для select_article_full,
+# и (вид статьи, article_id, кодирование) для сжатых тел ответов (см. aio.article_cache.cached_encoded_article)
+article_cache: LRUCache = LRUCache(ARTICLE_CACHE_MAX_BYTES, ARTICLE_CACHE_TTL)
+ARTICLE_KINDS: tuple[str, ...] = ("data", "full")
+
+
+def article_keys(article_id: int) -> list[tuple]:
+	return ([(kind, article_id) for kind in ARTICLE_KINDS]
+			+ [(kind, article_id, encoding) for kind in ARTICLE_KINDS for encoding in ENCODINGS])
+
+
+def invalidate_article(article_id: int) -> None:
+	"""
+	Удаляет статью из кэша этого процесса и оповещает остальные воркеры через Redis pub/sub.
+	"""
+	if not ARTICLE_CACHE_ENABLED:
+		return
+	article_cache.invalidate(article_keys(article_id))
+	try:
+		connect_redis().publish(ARTICLE_CACHE_CHANNEL, str(article_id))
+	except Exception as e:
+		logger.error("Redis: не удалось оповестить воркеры об изменении статьи %s: %s", article_id, e)
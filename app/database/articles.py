@@ -1,26 +1,67 @@
+from collections.abc import Iterator
 from typing import Optional
 from logging import Logger
+import uuid
 
-from sqlite3 import InterfaceError, OperationalError
+from psycopg2 import InterfaceError, OperationalError
 from psycopg2.extras import RealDictCursor
 
-from .connect import connect_pg
+from .connect import pg_connection
+from .feed_cache import invalidate_feed_pages
+from .search_cache import invalidate_search_snapshots
+from .article_cache import invalidate_article
+from .suggest import publish_article_suggestion, publish_article_removal
+from .search import search_window, merge_hits, TRIGRAM_WEIGHT
 from ..logger import configure_logs
-from ..models.articles import ArticleData, ArticleAnnouncement, ArticleFull
+from ..models.articles import ArticleFull, ArticleAnnouncementRow, ArticleDataRow, ArticleFullRow
+from ..static import STREAM_BATCH_SIZE, SEARCH_TOP_K
 
-__all__: list[str] = ["select_articles_announcement", "select_article", "select_article_full", "insert_article",
-					  "update_article", "delete_article", "select_articles_by_search"]
+__all__: list[str] = ["select_articles_announcement", "select_article", "select_articles_batch", "select_article_full",
+					  "insert_article", "update_article", "delete_article", "select_articles_by_search",
+					  "iter_articles_announcement", "iter_articles_by_search"]
 logger: Logger = configure_logs(__name__)
 
+# Шаги поиска (см. app.database.search). {login_filter} - пусто или SEARCH_LOGIN_FILTER
+FTS_SEARCH_SQL: str = """
+    SELECT a.article_id,
+           a.title,
+           us.login,
+           ts_rank_cd(a.search_vector, q.tsq) AS score
+    FROM articles.articles a
+             JOIN users.users us ON a.user_id = us.id
+             CROSS JOIN plainto_tsquery('russian', %(query)s) AS q(tsq)
+    WHERE a.search_vector @@ q.tsq{login_filter}
+    ORDER BY score DESC, a.article_id DESC
+    LIMIT %(limit)s
+"""
+TRGM_SEARCH_SQL: str = """
+    SELECT a.article_id,
+           a.title,
+           us.login,
+           word_similarity(%(query)s, a.search_document) AS score
+    FROM articles.articles a
+             JOIN users.users us ON a.user_id = us.id
+    WHERE %(query)s <%% a.search_document
+      AND NOT a.article_id = ANY (%(exclude)s::bigint[]){login_filter}
+    ORDER BY score DESC, a.article_id DESC
+    LIMIT %(limit)s
+"""
+SEARCH_LOGIN_FILTER: str = "\n      AND us.login = %(login)s"
+
 
 def select_articles_announcement(amount: Optional[int] = None,
 								 chunk: Optional[int] = None,
-								 login: Optional[str] = None) -> list[ArticleAnnouncement]:
+								 login: Optional[str] = None,
+								 after_id: Optional[int] = None) -> list[ArticleAnnouncementRow]:
+	"""
+	Получает анонсы статей от новых к старым.
+
+	Если передан after_id, страница выбирается по ключу (article_id < after_id) и стоит одинаково на любой глубине;
+	иначе - смещением (chunk - 1) * amount, которое просматривает и отбрасывает все предыдущие строки.
+	"""
 	logger.info("Начало получения статей из базы данных.")
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			query = """
                     SELECT art.article_id,
                            art.title,
@@ -30,17 +71,26 @@ def select_articles_announcement(amount: Optional[int] = None,
                              JOIN users.users us ON art.user_id = us.id
 					"""
 			params = []
+			conditions = []
 			if login:
-				query += "\nWHERE us.login = %s"
+				conditions.append("us.login = %s")
 				params.append(login)
+			if after_id is not None:
+				conditions.append("art.article_id < %s")
+				params.append(after_id)
+			if conditions:
+				query += "\nWHERE " + " AND ".join(conditions)
 			query += "\nORDER BY art.article_id DESC"
-			if amount and chunk:
+			if amount and after_id is not None:
+				query += "\nLIMIT %s"
+				params.append(amount)
+			elif amount and chunk:
 				query += """\nOFFSET %s
 						 \nLIMIT %s
 						 """
 				params.extend([(chunk - 1) * amount, amount])
 			cur.execute(query, params)
-			result = cur.fetchall()
+			result = [ArticleAnnouncementRow._make(row) for row in cur.fetchall()]
 			logger.info("Количество полученных статей %s", len(result))
 			return result
 	except (OperationalError, InterfaceError) as e:
@@ -49,17 +99,12 @@ def select_articles_announcement(amount: Optional[int] = None,
 	except Exception as e:
 		logger.error("Ошибка при выполнении запроса: %s", e)
 		raise
-	finally:
-		if conn:
-			conn.close()
 
 
-def select_article(article_id: int) -> ArticleData | None:
+def select_article(article_id: int) -> ArticleDataRow | None:
 	logger.info("Начало получения статьи, c id %s", article_id)
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			query = """
                     SELECT art.article_id,
                            art.title,
@@ -70,8 +115,36 @@ def select_article(article_id: int) -> ArticleData | None:
                     WHERE article_id = %s;
 					"""
 			cur.execute(query, (article_id,))
-			result = cur.fetchone()
+			row = cur.fetchone()
 			logger.info("Получена статься с id %s", article_id)
+			return ArticleDataRow._make(row) if row is not None else None
+	except (OperationalError, InterfaceError) as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+
+
+def select_articles_batch(article_ids: list[int]) -> dict[int, ArticleDataRow]:
+	"""Статьи с указанными id одним запросом. :return: Словарь article_id -> статья; отсутствующих id в нём нет."""
+	logger.info("Начало получения %d статей", len(article_ids))
+	if not article_ids:
+		return {}
+	try:
+		with pg_connection() as conn, conn.cursor() as cur:
+			query = """
+                    SELECT art.article_id,
+                           art.title,
+                           us.login,
+                           art.article_body
+                    FROM articles.articles art
+                             JOIN users.users us ON art.user_id = us.id
+                    WHERE art.article_id = ANY (%s::bigint[]);
+					"""
+			cur.execute(query, (list(article_ids),))
+			result = {row[0]: ArticleDataRow._make(row) for row in cur.fetchall()}
+			logger.info("Получено %d статей из %d", len(result), len(article_ids))
 			return result
 	except (OperationalError, InterfaceError) as e:
 		logger.error("Ошибка соединения: %s", e)
@@ -79,17 +152,12 @@ def select_article(article_id: int) -> ArticleData | None:
 	except Exception as e:
 		logger.error("Ошибка при выполнении запроса: %s", e)
 		raise
-	finally:
-		if conn:
-			conn.close()
 
 
-def select_article_full(article_id: int) -> ArticleFull | None:
+def select_article_full(article_id: int) -> ArticleFullRow | None:
 	logger.info("Начало получения полной статьи, c id %s", article_id)
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			query = """
                     SELECT art.article_id,
                            art.title,
@@ -101,26 +169,21 @@ def select_article_full(article_id: int) -> ArticleFull | None:
                     WHERE article_id = %s;
 					"""
 			cur.execute(query, (article_id,))
-			result = cur.fetchone()
+			row = cur.fetchone()
 			logger.info("Получена полная статься, с id %s", article_id)
-			return result
+			return ArticleFullRow._make(row) if row is not None else None
 	except (OperationalError, InterfaceError) as e:
 		logger.error("Ошибка соединения: %s", e)
 		raise
 	except Exception as e:
 		logger.error("Ошибка при выполнении запроса: %s", e)
 		raise
-	finally:
-		if conn:
-			conn.close()
 
 
 def insert_article(article: ArticleFull) -> int | None:
 	logger.info("Начало вставки статьи, с названием %s", article.title)
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			query = """
                     INSERT INTO articles.articles
                         (title, user_id, announcement, article_body)
@@ -132,6 +195,9 @@ def insert_article(article: ArticleFull) -> int | None:
 			result = cur.fetchone()[0]
 			conn.commit()
 			logger.info("Вставлена статься, с названием %s", article.title)
+			invalidate_feed_pages(article.user_name)
+			invalidate_search_snapshots()
+			publish_article_suggestion(result, article.title, article.user_name)
 			return result
 	except (OperationalError, InterfaceError) as e:
 		logger.error("Ошибка соединения: %s", e)
@@ -139,62 +205,62 @@ def insert_article(article: ArticleFull) -> int | None:
 	except Exception as e:
 		logger.error("Ошибка при выполнении запроса: %s", e)
 		raise
-	finally:
-		if conn:
-			conn.close()
 
 
 def update_article(article: ArticleFull) -> None:
 	logger.info("Начало обновления статьи, с id %s", article.id)
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			query = """
                     UPDATE articles.articles
                     SET title        = %s,
                         article_body = %s,
                         announcement = %s
-                    WHERE article_id = %s;
+                    WHERE article_id = %s
+                    RETURNING (SELECT login FROM users.users WHERE id = articles.user_id);
 					"""
 			data = (article.title, article.article_body, article.announcement, article.id)
 			cur.execute(query, data)
+			row = cur.fetchone()
 			conn.commit()
 			logger.info("Обновлена статья, с id %s", article.id)
+			invalidate_article(article.id)
+			invalidate_feed_pages(row[0] if row else None)
+			invalidate_search_snapshots()
+			if row:
+				publish_article_suggestion(article.id, article.title, row[0])
 	except (OperationalError, InterfaceError) as e:
 		logger.error("Ошибка соединения: %s", e)
 		raise
 	except Exception as e:
 		logger.error("Ошибка при выполнении запроса: %s", e)
 		raise
-	finally:
-		if conn:
-			conn.close()
 
 
 def delete_article(article_id: int) -> None:
 	logger.info("Начало удаления статьи %s", article_id)
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			query = """
                     DELETE
                     FROM articles.articles
-                    WHERE article_id = %s;
+                    WHERE article_id = %s
+                    RETURNING (SELECT login FROM users.users WHERE id = articles.user_id);
 					"""
 			cur.execute(query, (article_id,))
+			row = cur.fetchone()
 			conn.commit()
 			logger.info("Удалена статья %s", article_id)
+			invalidate_article(article_id)
+			invalidate_feed_pages(row[0] if row else None)
+			invalidate_search_snapshots()
+			publish_article_removal(article_id)
 	except (OperationalError, InterfaceError) as e:
 		logger.error("Ошибка соединения: %s", e)
 		raise
 	except Exception as e:
 		logger.error("Ошибка при выполнении запроса: %s", e)
 		raise
-	finally:
-		if conn:
-			conn.close()
 
 
 def select_articles_by_search(
@@ -204,70 +270,113 @@ def select_articles_by_search(
 		login: Optional[str] = None
 ) -> list[dict]:
 	"""
-	Выполняет «умный» поиск по title, announcement и article_body,
-	комбинируя полнотекстовый поиск и fuzzy‑поиск на pg_trgm.
+	Ищет статьи по поисковому документу: сначала полнотекстово, затем, если совпадений не хватает на страницу,
+	нечётко по триграммам. Ранжируются не больше SEARCH_TOP_K статей (см. app.database.search).
 	"""
-	conn = None
+	offset, limit = search_window(amount, chunk)
+	if limit <= offset:
+		return []
 	try:
-		conn = connect_pg()
-		with conn.cursor(cursor_factory=RealDictCursor) as cur:
-			sql = """ 
-                  WITH q AS (SELECT plainto_tsquery('russian', %s) AS tsq,
-                                    %s::text                       AS rawq),
-                       fts AS (SELECT article_id,
-                                      ts_rank_cd(search_vector, q.tsq) AS rank_fts
-                               FROM articles.articles,
-                                    q
-                               WHERE search_vector @@ q.tsq),
-                       trgm AS (SELECT article_id,
-                                       greatest(
-                                               similarity(title, q.rawq),
-                                               similarity(announcement, q.rawq),
-                                               similarity(article_body, q.rawq)
-                                       ) AS rank_trgm
-                                FROM articles.articles,
-                                     q
-                                WHERE (coalesce(title, '') || ' ' ||
-                                       coalesce(announcement, '') || ' ' ||
-                                       coalesce(article_body, ''))
-                                          %% q.rawq)
-                  SELECT a.article_id,
-                         a.title                                 AS title,
-                         us.login                                AS login,
-                         coalesce(fts.rank_fts, 0) * 1.0
-                             + coalesce(trgm.rank_trgm, 0) * 0.5 AS score
-                  FROM articles.articles a
-                           JOIN users.users us
-                                ON a.user_id = us.id
-                           LEFT JOIN fts ON fts.article_id = a.article_id
-                           LEFT JOIN trgm ON trgm.article_id = a.article_id
-				  """
-			params: list = [query_str, query_str]
+		with pg_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+			login_filter = SEARCH_LOGIN_FILTER if login else ""
+			params = {"query": query_str, "login": login, "limit": limit}
+			cur.execute(FTS_SEARCH_SQL.format(login_filter=login_filter), params)
+			fts_rows = cur.fetchall()
 
-			if login:
-				sql += "\nWHERE us.login = %s AND "
-				params.append(login)
-			else:
-				sql += "\nWHERE "
-			sql += "(coalesce(fts.rank_fts, 0) * 1.0 + coalesce(trgm.rank_trgm, 0) * 0.5) > 0"
+			trgm_rows = []
+			if len(fts_rows) < limit:
+				params["limit"] = limit - len(fts_rows)
+				params["exclude"] = [row["article_id"] for row in fts_rows]
+				cur.execute(TRGM_SEARCH_SQL.format(login_filter=login_filter), params)
+				trgm_rows = cur.fetchall()
 
-			sql += "\nORDER BY score DESC"
+			rows = merge_hits(fts_rows, trgm_rows, offset)
+			logger.info("Найдено %d статей по запросу %r: полнотекстово %d, по триграммам %d",
+						len(rows), query_str, len(fts_rows), len(trgm_rows))
+			return rows
+	except (OperationalError, InterfaceError) as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении поиска: %s", e)
+		raise
 
-			if amount is not None and chunk is not None:
-				sql += "\nOFFSET %s LIMIT %s"
-				params.extend([(chunk - 1) * amount, amount])
 
-			cur.execute(sql, params)
-			rows = cur.fetchall()
-			logger.info("Найдено %d статей по запросу %r", len(rows), query_str)
+def _cursor_name(prefix: str) -> str:
+	"""Уникальное в соединении имя серверного курсора."""
+	return f"{prefix}_{uuid.uuid4().hex}"
 
-			return rows
+
+def iter_articles_announcement(login: Optional[str] = None,
+							   after_id: Optional[int] = None,
+							   batch_size: int = STREAM_BATCH_SIZE) -> Iterator[dict]:
+	"""
+	Анонсы всех статей (или статей автора login) от новых к старым через именованный серверный курсор.
+	Строки читаются пачками по batch_size, поэтому в памяти процесса не бывает больше одной пачки.
+	"""
+	logger.info("Начало потокового чтения статей из базы данных.")
+	query = """
+            SELECT art.article_id,
+                   art.title,
+                   us.login,
+                   art.announcement
+            FROM articles.articles art
+                     JOIN users.users us ON art.user_id = us.id
+			"""
+	params = []
+	conditions = []
+	if login:
+		conditions.append("us.login = %s")
+		params.append(login)
+	if after_id is not None:
+		conditions.append("art.article_id < %s")
+		params.append(after_id)
+	if conditions:
+		query += "\nWHERE " + " AND ".join(conditions)
+	query += "\nORDER BY art.article_id DESC"
+	try:
+		with pg_connection() as conn:
+			with conn.cursor(name=_cursor_name("announcements"), cursor_factory=RealDictCursor) as cur:
+				cur.itersize = batch_size
+				cur.execute(query, params)
+				yield from cur
 	except (OperationalError, InterfaceError) as e:
 		logger.error("Ошибка соединения: %s", e)
 		raise
 	except Exception as e:
-		logger.error("Ошибка при выполнении поиска: %s", e)
+		logger.error("Ошибка при потоковом чтении статей: %s", e)
+		raise
+
+
+def iter_articles_by_search(query_str: str, login: Optional[str] = None,
+							batch_size: int = STREAM_BATCH_SIZE) -> Iterator[dict]:
+	"""
+	Вся выдача поиска (не больше SEARCH_TOP_K статей) в порядке ранга через именованные серверные курсоры:
+	сначала полнотекстовые совпадения, затем нечёткие, как в select_articles_by_search.
+	"""
+	login_filter = SEARCH_LOGIN_FILTER if login else ""
+	params = {"query": query_str, "login": login, "limit": SEARCH_TOP_K}
+	found: list[int] = []
+	try:
+		with pg_connection() as conn:
+			with conn.cursor(name=_cursor_name("search_fts"), cursor_factory=RealDictCursor) as cur:
+				cur.itersize = batch_size
+				cur.execute(FTS_SEARCH_SQL.format(login_filter=login_filter), params)
+				for row in cur:
+					found.append(row["article_id"])
+					yield row
+			if len(found) < SEARCH_TOP_K:
+				params["limit"] = SEARCH_TOP_K - len(found)
+				params["exclude"] = found
+				with conn.cursor(name=_cursor_name("search_trgm"), cursor_factory=RealDictCursor) as cur:
+					cur.itersize = batch_size
+					cur.execute(TRGM_SEARCH_SQL.format(login_filter=login_filter), params)
+					for row in cur:
+						row["score"] *= TRIGRAM_WEIGHT
+						yield row
+	except (OperationalError, InterfaceError) as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при потоковом поиске: %s", e)
 		raise
-	finally:
-		if conn:
-			conn.close()
@@ -0,0 +1,130 @@
+"""
+Профиль автора: данные пользователя, число статей и последние анонсы одним запросом.
+
+Число статей хранится в users.users.article_count и поддерживается триггерами на articles.articles
+уровня оператора: вставка, удаление и смена автора статьи меняют счётчик на число затронутых строк,
+поэтому пачка COPY из массового импорта обновляет строку автора один раз, а не по разу на статью.
+Колонку, триггеры и начальный пересчёт создаёт миграция 4 (python -m app.database.migrations upgrade).
+
+Профиль кэшируется в области видимости ленты автора (см. feed_cache): её уже сбрасывает каждая запись статьи
+автора, а изменение описания сбрасывает её через invalidate_author_pages.
+"""
+from logging import Logger
+
+from psycopg2 import OperationalError, InterfaceError
+
+from .connect import pg_connection
+from .exceptions.users import AuthorNotFoundException
+from ..logger import configure_logs
+from ..models.articles import ArticleAnnouncementRow
+from ..models.user_info import AuthorInfoRow
+
+__all__: list[str] = ["select_author_profile"]
+logger: Logger = configure_logs(__name__)
+
+# Колонка счётчика и триггеры. Выполняются по порядку в одной транзакции, повторный запуск безопасен.
+AUTHOR_STATS_STATEMENTS: list[str] = [
+	"ALTER TABLE users.users ADD COLUMN IF NOT EXISTS article_count integer NOT NULL DEFAULT 0",
+	"""
+	CREATE OR REPLACE FUNCTION articles.articles_article_count() RETURNS trigger AS $$
+	BEGIN
+		IF TG_OP = 'INSERT' THEN
+			UPDATE users.users us
+			SET article_count = us.article_count + d.delta
+			FROM (SELECT user_id, count(*) AS delta FROM new_rows GROUP BY user_id) d
+			WHERE us.id = d.user_id;
+		ELSIF TG_OP = 'DELETE' THEN
+			UPDATE users.users us
+			SET article_count = us.article_count - d.delta
+			FROM (SELECT user_id, count(*) AS delta FROM old_rows GROUP BY user_id) d
+			WHERE us.id = d.user_id;
+		ELSE
+			UPDATE users.users us
+			SET article_count = us.article_count + d.delta
+			FROM (SELECT user_id, sum(delta) AS delta
+				  FROM (SELECT user_id, 1 AS delta FROM new_rows
+						UNION ALL
+						SELECT user_id, -1 FROM old_rows) moved
+				  GROUP BY user_id
+				  HAVING sum(delta) <> 0) d
+			WHERE us.id = d.user_id;
+		END IF;
+		RETURN NULL;
+	END
+	$$ LANGUAGE plpgsql
+	""",
+	"DROP TRIGGER IF EXISTS articles_article_count_insert ON articles.articles",
+	"DROP TRIGGER IF EXISTS articles_article_count_delete ON articles.articles",
+	"DROP TRIGGER IF EXISTS articles_article_count_update ON articles.articles",
+	"""
+	CREATE TRIGGER articles_article_count_insert
+		AFTER INSERT ON articles.articles REFERENCING NEW TABLE AS new_rows
+		FOR EACH STATEMENT EXECUTE FUNCTION articles.articles_article_count()
+	""",
+	"""
+	CREATE TRIGGER articles_article_count_delete
+		AFTER DELETE ON articles.articles REFERENCING OLD TABLE AS old_rows
+		FOR EACH STATEMENT EXECUTE FUNCTION articles.articles_article_count()
+	""",
+	"""
+	CREATE TRIGGER articles_article_count_update
+		AFTER UPDATE ON articles.articles REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+		FOR EACH STATEMENT EXECUTE FUNCTION articles.articles_article_count()
+	""",
+	# Пока идёт пересчёт, запись статей ждёт: иначе вставка, не попавшая в снимок подсчёта, потеряла бы единицу
+	"LOCK TABLE articles.articles IN SHARE MODE",
+	"""
+	UPDATE users.users us
+	SET article_count = coalesce((SELECT count(*) FROM articles.articles art WHERE art.user_id = us.id), 0)
+	""",
+]
+
+# Данные автора, число статей и последние анонсы; %(login)s и %(latest)s. Анонсы читаются по индексу
+# (user_id, article_id DESC), число статей - из счётчика, без подсчёта строк
+AUTHOR_PROFILE_SQL: str = """
+    SELECT us.id,
+           us.login,
+           us.description,
+           us.article_count,
+           coalesce((SELECT json_agg(json_build_array(art.article_id, art.title, us.login, art.announcement)
+                                     ORDER BY art.article_id DESC)
+                     FROM (SELECT article_id, title, announcement
+                           FROM articles.articles
+                           WHERE user_id = us.id
+                           ORDER BY article_id DESC
+                           LIMIT %(latest)s) art), '[]'::json) AS latest
+    FROM users.users us
+    WHERE us.login = %(login)s
+"""
+
+
+def profile_from_row(row: tuple, latest: list) -> dict:
+	"""Профиль из строки AUTHOR_PROFILE_SQL и разобранного JSON последних анонсов."""
+	return {
+		"author_info": AuthorInfoRow._make(row[:3]),
+		"article_count": row[3],
+		"articles": [ArticleAnnouncementRow._make(item) for item in latest],
+	}
+
+
+def select_author_profile(login: str, latest: int) -> dict:
+	"""
+	Профиль автора одним запросом к базе.
+	:return: author_info, article_count и articles - latest последних анонсов от новых к старым.
+	:raises AuthorNotFoundException: Автора с таким логином нет.
+	"""
+	logger.info("Начало получения профиля автора %s", login)
+	try:
+		with pg_connection() as conn, conn.cursor() as cur:
+			cur.execute(AUTHOR_PROFILE_SQL, {"login": login, "latest": latest})
+			row = cur.fetchone()
+	except (OperationalError, InterfaceError) as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
+	if row is None:
+		raise AuthorNotFoundException()
+	# psycopg2 разбирает json сам
+	return profile_from_row(row, row[4])
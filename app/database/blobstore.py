@@ -0,0 +1,368 @@
+"""
+Хранилища байтов изображений и их вариантов.
+
+BlobStore - общий интерфейс хранилища, через который app.database.images читает и пишет байты изображений.
+Реализации:
+- RedisBlobStore хранит байты в Redis по ключам image:{article_id}:{image_id}[:{variant}];
+- FilesystemBlobStore хранит их в локальной файловой системе в дереве каталогов, шардированном по первым символам
+  image_id (IMAGE_STORAGE_DIR/ab/cd/{article_id}-{image_id}[.{variant}]), поэтому ни в одном каталоге не скапливаются
+  миллионы записей. Запись атомарна: данные пишутся во временный файл рядом с целевым и переименовываются через
+  os.replace. Изображения, ещё не перенесённые на диск (см. image_migration), читаются из Redis.
+
+Списки идентификаторов изображений статей в обоих случаях хранятся в Redis.
+"""
+
+from logging import Logger
+from typing import Optional
+import mmap
+import os
+import tempfile
+import uuid
+
+from redis.client import Pipeline
+
+from .connect import connect_redis
+from ..imaging import IMAGE_VARIANTS
+from ..logger import configure_logs
+from ..static import IMAGE_STORAGE_BACKEND, IMAGE_STORAGE_DIR, IMAGE_STORAGE_FSYNC
+
+__all__ = ["BlobStore", "RedisBlobStore", "FilesystemBlobStore", "BlobWriter", "get_blob_store", "image_key"]
+logger: Logger = configure_logs(__name__)
+
+# Поддерживаемые значения IMAGE_STORAGE_BACKEND
+STORAGE_BACKENDS: tuple[str, ...] = ("redis", "filesystem")
+
+# Шаблоны ключей байтов изображений в Redis
+IMAGE_KEY: str = "image:{article_id}:{image_id}"
+IMAGE_VARIANT_KEY: str = "image:{article_id}:{image_id}:{variant}"
+
+# Сохраняет варианты изображения, только если оригинал ещё существует: изображение могли удалить,
+# пока варианты создавались в пуле процессов. KEYS[1] - оригинал, KEYS[2..] - варианты, ARGV - их байты.
+STORE_VARIANTS_SCRIPT: str = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 2, #KEYS do
+    redis.call('SET', KEYS[i], ARGV[i - 1])
+end
+return 1
+"""
+
+_blob_store: Optional["BlobStore"] = None
+
+
+def image_key(article_id: int, image_id: str, variant: Optional[str] = None) -> str:
+    """Ключ оригинала изображения или, если указан variant, ключ его варианта."""
+    if variant is None:
+        return IMAGE_KEY.format(article_id=article_id, image_id=image_id)
+    return IMAGE_VARIANT_KEY.format(article_id=article_id, image_id=image_id, variant=variant)
+
+
+def variant_keys(article_id: int, image_id: str, variants: dict[str, bytes]) -> list[str]:
+    """KEYS для STORE_VARIANTS_SCRIPT: ключ оригинала и ключи вариантов в порядке variants."""
+    keys = [image_key(article_id, image_id)]
+    keys.extend(image_key(article_id, image_id, variant) for variant in variants)
+    return keys
+
+
+class BlobStore:
+    """
+    Интерфейс хранилища байтов изображений. Параметр variant - имя варианта из IMAGE_VARIANTS, None - оригинал.
+
+    Пакетная запись и удаление согласованы со списком статьи в Redis: write_batch вызывается до добавления
+    идентификаторов в список (и может поставить команды в его транзакцию), delete_unlisted - после их удаления.
+    """
+
+    def write(self, article_id: int, image_id: str, data: bytes, variant: Optional[str] = None) -> None:
+        """Записывает изображение целиком."""
+        raise NotImplementedError
+
+    def write_batch(self, article_id: int, blobs: dict[str, bytes], pipe: Pipeline) -> None:
+        """
+        Записывает пакет оригиналов изображений: либо все, либо ни одного.
+
+        :param blobs: Словарь image_id -> байты изображения.
+        :param pipe: Транзакция Redis, в которой идентификаторы добавляются в список статьи.
+        """
+        raise NotImplementedError
+
+    def write_variants(self, article_id: int, image_id: str, variants: dict[str, bytes]) -> bool:
+        """
+        Записывает варианты изображения, только если оригинал ещё существует.
+        :return: True, если варианты сохранены.
+        """
+        raise NotImplementedError
+
+    def exists(self, article_id: int, image_id: str, variant: Optional[str] = None) -> bool:
+        raise NotImplementedError
+
+    def read(self, article_id: int, image_id: str, variant: Optional[str] = None) -> bytes | None:
+        """:return: Байты изображения, либо None если изображение не найдено."""
+        raise NotImplementedError
+
+    def head(self, article_id: int, image_id: str, head_bytes: int,
+             variant: Optional[str] = None) -> tuple[int, bytes] | None:
+        """Размер изображения и его первые head_bytes байтов без чтения изображения целиком."""
+        raise NotImplementedError
+
+    def read_range(self, article_id: int, image_id: str, start: int, end: int,
+                   variant: Optional[str] = None) -> bytes:
+        """Диапазон байтов [start, end] включительно (пустой, если изображение не найдено)."""
+        raise NotImplementedError
+
+    def open_path(self, article_id: int, image_id: str, variant: Optional[str] = None) -> str | None:
+        """Путь к файлу изображения для отдачи без копирования (sendfile), либо None, если файла нет."""
+        return None
+
+    def delete(self, article_id: int, image_id: str) -> bool:
+        """
+        Удаляет оригинал изображения и все его варианты.
+        :return: True, если оригинал существовал.
+        """
+        raise NotImplementedError
+
+    def delete_unlisted(self, article_id: int, image_ids: list[str]) -> list[bool]:
+        """
+        Удаляет байты изображений, идентификаторы которых уже убраны из списка статьи или не попали в него.
+        :return: Для каждого изображения - был ли удалён его оригинал.
+        """
+        return [self.delete(article_id, image_id) for image_id in image_ids]
+
+
+class RedisBlobStore(BlobStore):
+    """Байты изображений и их вариантов в Redis."""
+
+    def write(self, article_id: int, image_id: str, data: bytes, variant: Optional[str] = None) -> None:
+        connect_redis().set(image_key(article_id, image_id, variant), data)
+
+    def write_batch(self, article_id: int, blobs: dict[str, bytes], pipe: Pipeline) -> None:
+        # Байты пишутся в той же транзакции MULTI/EXEC, что и идентификаторы в список статьи
+        for image_id, data in blobs.items():
+            pipe.set(image_key(article_id, image_id), data)
+
+    def write_variants(self, article_id: int, image_id: str, variants: dict[str, bytes]) -> bool:
+        store = connect_redis().register_script(STORE_VARIANTS_SCRIPT)
+        return bool(store(keys=variant_keys(article_id, image_id, variants), args=list(variants.values())))
+
+    def exists(self, article_id: int, image_id: str, variant: Optional[str] = None) -> bool:
+        return bool(connect_redis().exists(image_key(article_id, image_id, variant)))
+
+    def read(self, article_id: int, image_id: str, variant: Optional[str] = None) -> bytes | None:
+        return connect_redis().get(image_key(article_id, image_id, variant))
+
+    def head(self, article_id: int, image_id: str, head_bytes: int,
+             variant: Optional[str] = None) -> tuple[int, bytes] | None:
+        key = image_key(article_id, image_id, variant)
+        with connect_redis().pipeline(transaction=False) as pipe:
+            pipe.strlen(key)
+            pipe.getrange(key, 0, head_bytes - 1)
+            size, head = pipe.execute()
+        return (size, head) if size else None
+
+    def read_range(self, article_id: int, image_id: str, start: int, end: int,
+                   variant: Optional[str] = None) -> bytes:
+        return connect_redis().getrange(image_key(article_id, image_id, variant), start, end)
+
+    def delete(self, article_id: int, image_id: str) -> bool:
+        keys = [image_key(article_id, image_id, variant) for variant in (None, *IMAGE_VARIANTS)]
+        with connect_redis().pipeline(transaction=True) as pipe:
+            pipe.exists(keys[0])
+            pipe.delete(*keys)
+            existed, _ = pipe.execute()
+        return bool(existed)
+
+    def delete_unlisted(self, article_id: int, image_ids: list[str]) -> list[bool]:
+        # Ключи изображений удаляет DELETE_IMAGES_SCRIPT вместе с идентификаторами, а транзакция вставки
+        # не оставляет ключей без идентификаторов
+        return [False] * len(image_ids)
+
+
+class BlobWriter:
+    """
+    Потоковая запись одного файла: части дописываются во временный файл,
+    commit() атомарно делает его видимым под целевым именем.
+    """
+
+    def __init__(self, target: str, fsync: bool) -> None:
+        self.target = target
+        self._fsync = fsync
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".upload-")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+
+    def commit(self) -> None:
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.target)
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class FilesystemBlobStore(BlobStore):
+    """
+    Байты изображений и их вариантов в шардированном дереве каталогов.
+
+    :param fallback: Хранилище, из которого читаются изображения, которых ещё нет на диске.
+    """
+
+    def __init__(self, root: str, fsync: bool = True, fallback: Optional[BlobStore] = None) -> None:
+        self.root = os.path.abspath(root)
+        self.fsync = fsync
+        self.fallback = fallback
+
+    def path(self, article_id: int, image_id: str, variant: Optional[str] = None) -> str:
+        """
+        Путь к файлу изображения.
+
+        :raises ValueError: Если image_id не является UUID или вариант неизвестен - так идентификаторы из URL
+            не могут указать на файл за пределами хранилища.
+        """
+        image_id = str(uuid.UUID(image_id))
+        if variant is not None and variant not in IMAGE_VARIANTS:
+            raise ValueError(f"Неизвестный вариант изображения: {variant}")
+        name = f"{int(article_id)}-{image_id}" + (f".{variant}" if variant else "")
+        return os.path.join(self.root, image_id[:2], image_id[2:4], name)
+
+    def _existing_path(self, article_id: int, image_id: str, variant: Optional[str] = None) -> str | None:
+        try:
+            path = self.path(article_id, image_id, variant)
+        except ValueError:
+            return None
+        return path if os.path.isfile(path) else None
+
+    def writer(self, article_id: int, image_id: str, variant: Optional[str] = None) -> BlobWriter:
+        """Открывает потоковую запись изображения."""
+        return BlobWriter(self.path(article_id, image_id, variant), self.fsync)
+
+    def write(self, article_id: int, image_id: str, data: bytes, variant: Optional[str] = None) -> None:
+        """Атомарно записывает изображение целиком."""
+        writer = self.writer(article_id, image_id, variant)
+        try:
+            writer.write(data)
+            writer.commit()
+        except BaseException:
+            writer.abort()
+            raise
+
+    def write_batch(self, article_id: int, blobs: dict[str, bytes], pipe: Pipeline) -> None:
+        # Файлы записываются сразу, до выполнения транзакции со списком статьи
+        written: list[str] = []
+        try:
+            for image_id, data in blobs.items():
+                self.write(article_id, image_id, data)
+                written.append(image_id)
+        except Exception:
+            for image_id in written:
+                self.delete(article_id, image_id)
+            raise
+
+    def write_variants(self, article_id: int, image_id: str, variants: dict[str, bytes]) -> bool:
+        """
+        Записывает варианты изображения, только если оригинал ещё существует.
+        Если оригинал удалили во время записи, записанные варианты удаляются.
+        Варианты изображения, ещё не перенесённого на диск, записываются в fallback.
+        """
+        if self._existing_path(article_id, image_id) is None:
+            return self.fallback is not None and self.fallback.write_variants(article_id, image_id, variants)
+        for variant, data in variants.items():
+            self.write(article_id, image_id, data, variant)
+        if self._existing_path(article_id, image_id) is None:
+            self.delete(article_id, image_id)
+            return False
+        return True
+
+    def exists(self, article_id: int, image_id: str, variant: Optional[str] = None) -> bool:
+        if self._existing_path(article_id, image_id, variant) is not None:
+            return True
+        return self.fallback is not None and self.fallback.exists(article_id, image_id, variant)
+
+    def delete(self, article_id: int, image_id: str) -> bool:
+        """
+        Удаляет оригинал изображения и все его варианты.
+        :return: True, если оригинал существовал.
+        """
+        deleted = False
+        for variant in (None, *IMAGE_VARIANTS):
+            path = self._existing_path(article_id, image_id, variant)
+            if path is None:
+                continue
+            try:
+                os.unlink(path)
+                deleted = deleted or variant is None
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def read(self, article_id: int, image_id: str, variant: Optional[str] = None) -> bytes | None:
+        path = self._existing_path(article_id, image_id, variant)
+        if path is not None:
+            try:
+                with open(path, "rb") as file:
+                    return file.read()
+            except FileNotFoundError:
+                pass
+        return self.fallback.read(article_id, image_id, variant) if self.fallback is not None else None
+
+    def head(self, article_id: int, image_id: str, head_bytes: int,
+             variant: Optional[str] = None) -> tuple[int, bytes] | None:
+        path = self._existing_path(article_id, image_id, variant)
+        if path is not None:
+            try:
+                with open(path, "rb") as file:
+                    size = os.fstat(file.fileno()).st_size
+                    if size:
+                        return size, file.read(head_bytes)
+            except FileNotFoundError:
+                pass
+        return self.fallback.head(article_id, image_id, head_bytes, variant) if self.fallback is not None else None
+
+    def read_range(self, article_id: int, image_id: str, start: int, end: int,
+                   variant: Optional[str] = None) -> bytes:
+        """
+        Читает диапазон [start, end] включительно через mmap: в память процесса копируется только
+        запрошенный диапазон, а не файл целиком.
+        """
+        path = self._existing_path(article_id, image_id, variant)
+        if path is None:
+            if self.fallback is not None:
+                return self.fallback.read_range(article_id, image_id, start, end, variant)
+            return b""
+        try:
+            with open(path, "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return b""
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[start:end + 1]
+        except FileNotFoundError:
+            return b""
+
+    def open_path(self, article_id: int, image_id: str, variant: Optional[str] = None) -> str | None:
+        return self._existing_path(article_id, image_id, variant)
+
+
+def get_blob_store() -> BlobStore:
+    """
+    Возвращает хранилище байтов изображений процесса согласно IMAGE_STORAGE_BACKEND.
+
+    :raises ValueError: Если задан неизвестный IMAGE_STORAGE_BACKEND.
+    """
+    global _blob_store
+    if IMAGE_STORAGE_BACKEND not in STORAGE_BACKENDS:
+        raise ValueError(f"Неизвестный IMAGE_STORAGE_BACKEND: {IMAGE_STORAGE_BACKEND}")
+    if _blob_store is None:
+        if IMAGE_STORAGE_BACKEND == "redis":
+            _blob_store = RedisBlobStore()
+        else:
+            _blob_store = FilesystemBlobStore(IMAGE_STORAGE_DIR, IMAGE_STORAGE_FSYNC, fallback=RedisBlobStore())
+            logger.info("Изображения хранятся в файловой системе: %s", _blob_store.root)
+    return _blob_store
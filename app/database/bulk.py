@@ -0,0 +1,237 @@
+"""
+Массовый импорт и экспорт статей через COPY.
+
+Формат записи - NDJSON (объект на строку) или CSV с заголовком, поля: login, title, announcement, article_body;
+при экспорте первым полем идёт article_id. При импорте article_id игнорируется: статьи получают новые id.
+
+Импорт читает вход пачками по batch_size записей. Для каждой пачки логины авторов переводятся в id одним
+запросом по всем различным логинам пачки, статьи загружаются одним COPY FROM STDIN, и пачка фиксируется отдельной
+транзакцией. Записи с неизвестным автором или без заголовка отклоняются, остальные записи пачки загружаются.
+Экспорт выполняет COPY TO STDOUT и передаёт данные получателю по мере поступления. В памяти в любой момент
+находится не больше одной пачки, поэтому расход памяти не зависит от объёма данных.
+"""
+from collections.abc import Iterable, Iterator
+from logging import Logger
+from typing import Any, Optional, TextIO
+import threading
+import queue
+import json
+import csv
+import io
+
+from .connect import pg_connection
+from .feed_cache import invalidate_feed_pages
+from .search_cache import invalidate_search_snapshots
+from .suggest import publish_suggest_rebuild
+from ..logger import configure_logs
+from ..static import BULK_BATCH_SIZE
+
+__all__: list[str] = ["BULK_FORMATS", "import_articles", "export_articles", "iter_export_articles"]
+logger: Logger = configure_logs(__name__)
+
+# Формат -> тип содержимого
+BULK_FORMATS: dict[str, str] = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# Сколько сообщений об отклонённых записях возвращать в итогах импорта
+MAX_REPORTED_ERRORS: int = 50
+# Сколько фрагментов COPY TO STDOUT может ждать отправки при потоковом экспорте
+EXPORT_QUEUE_CHUNKS: int = 16
+
+_COPY_ARTICLES_SQL: str = """
+    COPY articles.articles (title, user_id, announcement, article_body) FROM STDIN WITH (FORMAT csv)
+"""
+_EXPORT_SELECT_SQL: str = """
+    SELECT art.article_id, us.login, art.title, art.announcement, art.article_body
+    FROM articles.articles art
+             JOIN users.users us ON art.user_id = us.id
+"""
+_EXPORT_NDJSON_SELECT_SQL: str = """
+    SELECT json_build_object('article_id', art.article_id, 'login', us.login, 'title', art.title,
+                             'announcement', art.announcement, 'article_body', art.article_body)
+    FROM articles.articles art
+             JOIN users.users us ON art.user_id = us.id
+"""
+
+
+def _read_records(stream: TextIO, fmt: str) -> Iterator[tuple[int, dict | None, str | None]]:
+	"""Записи входа по одной: номер записи, запись или None и описание ошибки разбора."""
+	if fmt == "csv":
+		for number, record in enumerate(csv.DictReader(stream), start=1):
+			yield number, record, None
+		return
+	for number, line in enumerate(stream, start=1):
+		if not line.strip():
+			continue
+		try:
+			record = json.loads(line)
+		except ValueError as e:
+			yield number, None, f"некорректный JSON: {e}"
+			continue
+		if not isinstance(record, dict):
+			yield number, None, "ожидался JSON-объект"
+			continue
+		yield number, record, None
+
+
+def _batches(records: Iterable[Any], batch_size: int) -> Iterator[list[Any]]:
+	batch = []
+	for record in records:
+		batch.append(record)
+		if len(batch) >= batch_size:
+			yield batch
+			batch = []
+	if batch:
+		yield batch
+
+
+def _import_batch(batch: list[tuple[int, dict | None, str | None]], stats: dict) -> set[str]:
+	"""Загружает пачку записей одной транзакцией. :return: Логины авторов загруженных статей."""
+	def reject(number: int, reason: str) -> None:
+		stats["rejected"] += 1
+		if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+			stats["errors"].append(f"запись {number}: {reason}")
+
+	valid = []
+	for number, record, error in batch:
+		if error is not None:
+			reject(number, error)
+		elif not record.get("login") or not record.get("title"):
+			reject(number, "нет login или title")
+		else:
+			valid.append((number, record))
+	if not valid:
+		return set()
+
+	with pg_connection() as conn:
+		try:
+			with conn.cursor() as cur:
+				cur.execute("SELECT login, id FROM users.users WHERE login = ANY (%s)",
+							(list({record["login"] for _, record in valid}),))
+				user_ids = dict(cur.fetchall())
+				buffer = io.StringIO()
+				writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+				logins = set()
+				for number, record in valid:
+					user_id = user_ids.get(record["login"])
+					if user_id is None:
+						reject(number, f"автор {record['login']!r} не найден")
+						continue
+					writer.writerow((record["title"], user_id, record.get("announcement") or "",
+									 record.get("article_body") or ""))
+					logins.add(record["login"])
+				buffer.seek(0)
+				cur.copy_expert(_COPY_ARTICLES_SQL, buffer)
+				imported = cur.rowcount
+			conn.commit()
+		except Exception:
+			conn.rollback()
+			raise
+	stats["imported"] += imported
+	stats["batches"] += 1
+	return logins
+
+
+def import_articles(stream: TextIO, fmt: str = "ndjson", batch_size: int = BULK_BATCH_SIZE) -> dict[str, Any]:
+	"""
+	Импортирует статьи из текстового потока NDJSON или CSV.
+
+	Каждая пачка фиксируется отдельно: если импорт прервался ошибкой базы, уже загруженные пачки остаются.
+	После импорта сбрасываются кэши ленты авторов и снимки поиска, а воркеры перестраивают индекс подсказок.
+	:return: Количество пачек, загруженных и отклонённых записей и первые сообщения об отклонённых записях.
+	"""
+	if fmt not in BULK_FORMATS:
+		raise ValueError(f"Неизвестный формат {fmt!r}, ожидается один из {sorted(BULK_FORMATS)}")
+	stats: dict[str, Any] = {"batches": 0, "imported": 0, "rejected": 0, "errors": []}
+	try:
+		for batch in _batches(_read_records(stream, fmt), batch_size):
+			logins = _import_batch(batch, stats)
+			if logins:
+				invalidate_feed_pages(*logins)
+			logger.info("Импорт статей: пачка %d, загружено %d, отклонено %d",
+						stats["batches"], stats["imported"], stats["rejected"])
+	finally:
+		if stats["imported"]:
+			invalidate_search_snapshots()
+			publish_suggest_rebuild()
+	return stats
+
+
+def _export_sql(cur: Any, fmt: str, login: Optional[str]) -> str:
+	select = _EXPORT_NDJSON_SELECT_SQL if fmt == "ndjson" else _EXPORT_SELECT_SQL
+	if login:
+		select += cur.mogrify("\nWHERE us.login = %s", (login,)).decode("utf-8")
+	select += "\nORDER BY art.article_id"
+	if fmt == "csv":
+		return f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER)"
+	# Объект JSON - одна колонка без кавычек: символы \x01 и \x02 to_json экранирует, поэтому они не встретятся
+	return f"COPY ({select}) TO STDOUT WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+
+
+def export_articles(out: Any, fmt: str = "ndjson", login: Optional[str] = None) -> None:
+	"""
+	Записывает все статьи (или статьи автора login) в файлоподобный объект out в порядке article_id.
+	Данные передаются в out.write фрагментами по мере чтения COPY TO STDOUT.
+	"""
+	if fmt not in BULK_FORMATS:
+		raise ValueError(f"Неизвестный формат {fmt!r}, ожидается один из {sorted(BULK_FORMATS)}")
+	with pg_connection() as conn, conn.cursor() as cur:
+		cur.copy_expert(_export_sql(cur, fmt, login), out)
+		conn.rollback()
+
+
+class _QueueWriter:
+	"""Файлоподобный получатель COPY TO STDOUT: кладёт фрагменты в ограниченную очередь, пока экспорт не отменён."""
+
+	def __init__(self, chunks: queue.Queue, cancelled: threading.Event) -> None:
+		self._chunks = chunks
+		self._cancelled = cancelled
+
+	def write(self, data: bytes | str) -> None:
+		chunk = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+		while True:
+			if self._cancelled.is_set():
+				raise OSError("Экспорт статей отменён получателем")
+			try:
+				self._chunks.put(chunk, timeout=0.5)
+				return
+			except queue.Full:
+				continue
+
+
+def iter_export_articles(fmt: str = "ndjson", login: Optional[str] = None) -> Iterator[bytes]:
+	"""
+	Экспорт статей как синхронный итератор фрагментов для потокового ответа.
+	COPY выполняется в отдельном потоке; очередь из EXPORT_QUEUE_CHUNKS фрагментов держит его не дальше получателя.
+	Если итератор закрыт досрочно (клиент отключился), COPY прерывается и соединение возвращается в пул.
+	"""
+	if fmt not in BULK_FORMATS:
+		raise ValueError(f"Неизвестный формат {fmt!r}, ожидается один из {sorted(BULK_FORMATS)}")
+	chunks: queue.Queue = queue.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+	cancelled = threading.Event()
+	done = object()
+
+	def produce() -> None:
+		try:
+			export_articles(_QueueWriter(chunks, cancelled), fmt, login)
+			result: Any = done
+		except Exception as e:
+			result = e
+		while not cancelled.is_set():
+			try:
+				chunks.put(result, timeout=0.5)
+				return
+			except queue.Full:
+				continue
+
+	threading.Thread(target=produce, name="articles-export", daemon=True).start()
+	try:
+		while True:
+			item = chunks.get()
+			if item is done:
+				return
+			if isinstance(item, Exception):
+				logger.error("Ошибка экспорта статей: %s", item)
+				raise item
+			yield item
+	finally:
+		cancelled.set()
+
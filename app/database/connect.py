@@ -1,55 +1,270 @@
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
+from collections import deque
 from logging import Logger
+import threading
+import time
+import os
 
-from psycopg2.extensions import connection as pg_connection
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.extensions import connection as PgConnection, TRANSACTION_STATUS_IDLE
 import psycopg2
 import redis
 
+from .exceptions.pool import PoolTimeoutException
 from ..logger import configure_logs
-from ..static import POSTGRES_SOURCE, REDIS_PORT, REDIS_DB, REDIS_PASSWORD, REDIS_USER, REDIS_HOST
+from ..static import (POSTGRES_SOURCE, REDIS_PORT, REDIS_DB, REDIS_PASSWORD, REDIS_USER, REDIS_HOST,
+					  PG_POOL_MIN_CONN, PG_POOL_MAX_CONN, PG_POOL_TIMEOUT, PG_POOL_HEALTHCHECK_INTERVAL,
+					  PG_CONNECT_TIMEOUT, REDIS_MAX_CONNECTIONS, REDIS_POOL_TIMEOUT, REDIS_HEALTH_CHECK_INTERVAL,
+					  REDIS_SOCKET_TIMEOUT)
 
+__all__: list[str] = ["PgConnectionPool", "pg_connection_pool", "pg_connection", "pg_pool_stats", "connect_redis",
+					  "close_redis", "redis_connection_kwargs"]
 logger: Logger = configure_logs(__name__)
 
-POOL_MIN_CONN = 1
-POOL_MAX_CONN = 2
-connection_pool = SimpleConnectionPool(
-	POOL_MIN_CONN,
-	POOL_MAX_CONN,
+# Ожидание соединения дольше этого порога логируется как предупреждение
+SLOW_CHECKOUT_SECONDS: float = 0.5
+
+
+class PgConnectionPool:
+	"""
+	Потокобезопасный ограниченный пул соединений PostgreSQL.
+
+	В отличие от psycopg2.pool.ThreadedConnectionPool не закрывает соединения сверх minconn при возврате
+	и не выбрасывает ошибку при исчерпании, а ждёт освобождения соединения не дольше timeout секунд.
+	Соединения, простаивавшие дольше healthcheck_interval, перед выдачей проверяются запросом SELECT 1.
+	Соединения открываются лениво, а после fork пул начинается заново, поэтому каждый воркер uvicorn работает со своим пулом.
+	"""
+
+	def __init__(self, dsn: str, minconn: int, maxconn: int, timeout: float, healthcheck_interval: float,
+				 connect_timeout: int) -> None:
+		if maxconn < 1 or minconn < 0 or minconn > maxconn:
+			raise ValueError(f"Некорректные размеры пула: minconn={minconn}, maxconn={maxconn}")
+		self.dsn = dsn
+		self.minconn = minconn
+		self.maxconn = maxconn
+		self.timeout = timeout
+		self.healthcheck_interval = healthcheck_interval
+		self.connect_timeout = connect_timeout
+
+		self._cond = threading.Condition(threading.Lock())
+		self._idle: deque[tuple[PgConnection, float]] = deque()
+		self._in_use: int = 0
+		self._pid: int = os.getpid()
+
+		self._checkouts: int = 0
+		self._timeouts: int = 0
+		self._broken: int = 0
+		self._wait_total: float = 0.0
+		self._wait_max: float = 0.0
+
+	def _connect(self) -> PgConnection:
+		return psycopg2.connect(dsn=self.dsn, connect_timeout=self.connect_timeout)
+
+	def _reset_after_fork(self) -> None:
+		"""Забывает соединения родительского процесса: сокеты нельзя делить между процессами."""
+		if self._pid != os.getpid():
+			self._idle.clear()
+			self._in_use = 0
+			self._pid = os.getpid()
+
+	def _is_alive(self, conn: PgConnection, idle_since: float) -> bool:
+		if conn.closed:
+			return False
+		if time.monotonic() - idle_since < self.healthcheck_interval:
+			return True
+		try:
+			with conn.cursor() as cur:
+				cur.execute("SELECT 1;")
+			conn.rollback()
+			return True
+		except psycopg2.Error as e:
+			logger.warning("Соединение из пула PostgreSQL не прошло проверку: %s", e)
+			self._close_quietly(conn)
+			return False
+
+	@staticmethod
+	def _close_quietly(conn: PgConnection) -> None:
+		try:
+			conn.close()
+		except Exception:
+			pass
+
+	def getconn(self) -> PgConnection:
+		"""
+		Выдаёт соединение из пула, при необходимости ожидая освобождения.
+		:raises PoolTimeoutException: Если свободное соединение не появилось за timeout секунд.
+		"""
+		started = time.perf_counter()
+		deadline = time.monotonic() + self.timeout
+		with self._cond:
+			self._reset_after_fork()
+			while not self._idle and self._in_use >= self.maxconn:
+				remaining = deadline - time.monotonic()
+				if remaining <= 0 or not self._cond.wait(remaining):
+					if self._idle or self._in_use < self.maxconn:
+						break
+					self._timeouts += 1
+					logger.error("Пул PostgreSQL исчерпан: %d/%d соединений заняты дольше %.1f с",
+								 self._in_use, self.maxconn, self.timeout)
+					raise PoolTimeoutException()
+			idle = self._idle.pop() if self._idle else None
+			self._in_use += 1
+			wait = time.perf_counter() - started
+			self._checkouts += 1
+			self._wait_total += wait
+			self._wait_max = max(self._wait_max, wait)
+
+		if wait > SLOW_CHECKOUT_SECONDS:
+			logger.warning("Ожидание соединения из пула PostgreSQL заняло %.3f с", wait)
+
+		try:
+			if idle is not None and self._is_alive(*idle):
+				return idle[0]
+			if idle is not None:
+				with self._cond:
+					self._broken += 1
+			return self._connect()
+		except Exception as e:
+			logger.error("Ошибка подключения к PostgreSQL: %s", e)
+			with self._cond:
+				self._in_use -= 1
+				self._cond.notify()
+			raise
+
+	def putconn(self, conn: PgConnection) -> None:
+		"""Возвращает соединение в пул, откатывая незавершённую транзакцию."""
+		keep = not conn.closed
+		if keep and conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+			try:
+				conn.rollback()
+			except psycopg2.Error:
+				keep = False
+		with self._cond:
+			if self._pid != os.getpid():
+				return
+			self._in_use -= 1
+			if keep:
+				self._idle.append((conn, time.monotonic()))
+			self._cond.notify()
+		if not keep:
+			self._close_quietly(conn)
+
+	@contextmanager
+	def connection(self) -> Iterator[PgConnection]:
+		"""Контекстный менеджер: выдаёт соединение и гарантированно возвращает его в пул."""
+		conn = self.getconn()
+		try:
+			yield conn
+		finally:
+			self.putconn(conn)
+
+	def open(self) -> None:
+		"""Заранее открывает minconn соединений, чтобы первые запросы не платили за установку соединения."""
+		with self._cond:
+			self._reset_after_fork()
+			missing = self.minconn - len(self._idle) - self._in_use
+		opened = [self._connect() for _ in range(max(missing, 0))]
+		with self._cond:
+			self._idle.extend((conn, time.monotonic()) for conn in opened)
+		logger.info("Пул PostgreSQL открыт: %d соединений, максимум %d", len(opened), self.maxconn)
+
+	def closeall(self) -> None:
+		"""Закрывает все простаивающие соединения пула."""
+		with self._cond:
+			idle = list(self._idle)
+			self._idle.clear()
+		for conn, _ in idle:
+			self._close_quietly(conn)
+
+	def stats(self) -> dict[str, float | int]:
+		"""Возвращает текущую загрузку пула и статистику ожидания соединений."""
+		with self._cond:
+			return {
+				"max_size": self.maxconn,
+				"in_use": self._in_use,
+				"idle": len(self._idle),
+				"utilisation": self._in_use / self.maxconn,
+				"checkouts": self._checkouts,
+				"timeouts": self._timeouts,
+				"broken": self._broken,
+				"wait_seconds_total": self._wait_total,
+				"wait_seconds_max": self._wait_max,
+				"wait_seconds_avg": self._wait_total / self._checkouts if self._checkouts else 0.0,
+			}
+
+
+pg_connection_pool: PgConnectionPool = PgConnectionPool(
 	dsn=POSTGRES_SOURCE,
-	connect_timeout=10
+	minconn=PG_POOL_MIN_CONN,
+	maxconn=PG_POOL_MAX_CONN,
+	timeout=PG_POOL_TIMEOUT,
+	healthcheck_interval=PG_POOL_HEALTHCHECK_INTERVAL,
+	connect_timeout=PG_CONNECT_TIMEOUT
 )
 
-def connect_pg() -> pg_connection | None:
-	try:
-		db_connection = psycopg2.connect(
-			dsn=POSTGRES_SOURCE,
-			port=5432
-		)
-		logger.info("Подключение к PostgreSQL успешно.")
-		return db_connection
-	except Exception as e:
-		logger.error("Ошибка подключения к PostgreSQL: %s", e)
-		return None
+
+def pg_connection() -> AbstractContextManager[PgConnection]:
+	"""
+	Получение соединения PostgreSQL из общего пула процесса.
+	Используется как контекстный менеджер: with pg_connection() as conn: ...
+	"""
+	return pg_connection_pool.connection()
+
+
+def pg_pool_stats() -> dict[str, float | int]:
+	"""Статистика общего пула PostgreSQL: размер, занятость и время ожидания соединений."""
+	return pg_connection_pool.stats()
+
+
+def redis_connection_kwargs() -> dict:
+	"""Общие параметры подключения к Redis для синхронного и асинхронного клиентов."""
+	return {
+		"host": REDIS_HOST,
+		"port": REDIS_PORT,
+		"db": REDIS_DB,
+		"password": REDIS_PASSWORD,
+		"username": REDIS_USER,
+		"decode_responses": False,
+		"health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+		"socket_timeout": REDIS_SOCKET_TIMEOUT,
+		"socket_connect_timeout": REDIS_SOCKET_TIMEOUT,
+	}
+
+
+_redis_client: redis.Redis | None = None
+_redis_pid: int | None = None
+_redis_lock: threading.Lock = threading.Lock()
 
 
 def connect_redis() -> redis.Redis:
 	"""
-	Подключение к Redis через пул соединений.
-	Использует константы из static: REDIS_SOURCE
+	Возвращает общий клиент Redis текущего процесса.
+
+	Клиент и его ограниченный пул соединений (REDIS_MAX_CONNECTIONS) создаются лениво при первом вызове
+	и переиспользуются всеми последующими, в том числе после fork создаётся собственный клиент.
+	Отдельный PING не выполняется: живость простаивающих соединений проверяется раз
+	в REDIS_HEALTH_CHECK_INTERVAL секунд перед очередной командой.
 	"""
-	try:
-		pool = redis.ConnectionPool(
-			host=REDIS_HOST,
-			port=REDIS_PORT,
-			db=REDIS_DB,
-			password=REDIS_PASSWORD,
-			username=REDIS_USER,
-			decode_responses=False
-		)
-		client = redis.Redis(connection_pool=pool)
-		client.ping()
-		logger.info("Подключение к Redis успешно.")
-		return client
-	except Exception as e:
-		logger.error("Ошибка подключения к Redis: %s", e)
-		raise
+	global _redis_client, _redis_pid
+	if _redis_client is None or _redis_pid != os.getpid():
+		with _redis_lock:
+			if _redis_client is None or _redis_pid != os.getpid():
+				pool = redis.BlockingConnectionPool(
+					max_connections=REDIS_MAX_CONNECTIONS,
+					timeout=REDIS_POOL_TIMEOUT,
+					**redis_connection_kwargs()
+				)
+				_redis_client = redis.Redis(connection_pool=pool)
+				_redis_pid = os.getpid()
+				logger.info("Создан клиент Redis: до %d соединений.", REDIS_MAX_CONNECTIONS)
+	return _redis_client
+
+
+def close_redis() -> None:
+	"""Закрывает соединения общего клиента Redis, если он был создан в этом процессе."""
+	global _redis_client
+	with _redis_lock:
+		if _redis_client is not None and _redis_pid == os.getpid():
+			_redis_client.close()
+			_redis_client.connection_pool.disconnect()
+		_redis_client = None
@@ -1,6 +1,10 @@
-from . import change_password
+from . import change_password, pool, images, pagination, users
 
-__all__: list[str] = change_password.__all__
-__version__: str = "0.1.0"
+__all__: list[str] = change_password.__all__.copy()
+__all__.extend(pool.__all__)
+__all__.extend(images.__all__)
+__all__.extend(pagination.__all__)
+__all__.extend(users.__all__)
+__version__: str = "0.3.0"
 __author__: str = "honfi555"
 __email__: str = "kasanindaniil@gmail.com"
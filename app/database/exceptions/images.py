@@ -0,0 +1,13 @@
+__all__: list[str] = ["ImageTooLargeException", "InvalidUploadException"]
+
+
+class ImageTooLargeException(Exception):
+    """Исключение выбрасывается, когда загружаемое изображение превышает допустимый размер."""
+    def __init__(self, message="Изображение превышает максимально допустимый размер."):
+        super().__init__(message)
+
+
+class InvalidUploadException(Exception):
+    """Исключение выбрасывается, когда тело запроса с изображениями имеет некорректный формат."""
+    def __init__(self, message="Некорректное тело запроса с изображениями."):
+        super().__init__(message)
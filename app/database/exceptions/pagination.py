@@ -0,0 +1,7 @@
+__all__: list[str] = ["InvalidCursorException"]
+
+
+class InvalidCursorException(Exception):
+    """Исключение выбрасывается, когда курсор постраничной выборки повреждён или подделан."""
+    def __init__(self, message="Некорректный курсор постраничной выборки."):
+        super().__init__(message)
@@ -0,0 +1,7 @@
+__all__: list[str] = ["PoolTimeoutException"]
+
+
+class PoolTimeoutException(Exception):
+    """Исключение выбрасывается, когда за отведённое время не удалось получить соединение из пула."""
+    def __init__(self, message="Превышено время ожидания свободного соединения в пуле."):
+        super().__init__(message)
@@ -0,0 +1,7 @@
+__all__: list[str] = ["AuthorNotFoundException"]
+
+
+class AuthorNotFoundException(Exception):
+    """Исключение выбрасывается, когда автора с указанным логином нет в базе данных."""
+    def __init__(self, message="Автор не найден."):
+        super().__init__(message)
@@ -0,0 +1,92 @@
+"""
+Кэш страниц ленты статей в Redis.
+
+Страницы одной области видимости хранятся в одном хэше: feed:pages:all - общая лента,
+feed:pages:login:{login} - лента автора. Поле хэша описывает страницу (номер или курсор и размер),
+значение - сериализованная страница со временем истечения. Запись статьи автора X меняет только общую ленту
+и ленту X, поэтому инвалидация удаляет ровно эти два хэша и увеличивает их версии: читатель, начавший
+пересчитывать страницу до инвалидации, не сможет записать устаревший результат.
+
+Здесь - ключи, скрипты и синхронная инвалидация для слоя psycopg2; чтение с защитой от лавины запросов
+находится в aio.feed_cache.
+"""
+from collections.abc import Iterable
+from logging import Logger
+from typing import Optional
+
+from .connect import connect_redis
+from ..logger import configure_logs
+from ..static import FEED_CACHE_ENABLED
+
+__all__: list[str] = ["invalidate_feed_pages", "invalidate_author_pages"]
+logger: Logger = configure_logs(__name__)
+
+FEED_PAGES_KEY: str = "feed:pages:{scope}"
+FEED_VERSION_KEY: str = "feed:version:{scope}"
+FEED_LOCK_KEY: str = "feed:lock:{scope}:{page}"
+FEED_STATS_KEY: str = "feed:stats"
+# Область видимости общей ленты (без фильтра по логину)
+ALL_SCOPE: str = "all"
+
+# Возвращает страницу и текущую версию области видимости, считая попадание или промах.
+# KEYS[1] - хэш страниц, KEYS[2] - версия, KEYS[3] - счётчики; ARGV[1] - поле страницы.
+LOOKUP_PAGE_SCRIPT: str = """
+local page = redis.call('HGET', KEYS[1], ARGV[1])
+redis.call('HINCRBY', KEYS[3], page and 'hits' or 'misses', 1)
+return {page, redis.call('GET', KEYS[2]) or '0'}
+"""
+
+# Сохраняет страницу, только если область видимости не инвалидировали с момента промаха.
+# KEYS[1] - хэш страниц, KEYS[2] - версия; ARGV: поле, значение, версия при промахе, TTL хэша в секундах.
+STORE_PAGE_SCRIPT: str = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[3] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+
+def feed_scope(login: Optional[str]) -> str:
+	"""Область видимости страницы ленты: общая лента или лента автора."""
+	return f"login:{login}" if login else ALL_SCOPE
+
+
+def invalidation_keys(logins: Iterable[Optional[str]], include_all: bool = True) -> list[tuple[str, str]]:
+	"""Пары (хэш страниц, версия) для общей ленты (если include_all) и лент указанных авторов."""
+	scopes = ({ALL_SCOPE} if include_all else set()) | {feed_scope(login) for login in logins if login}
+	return [(FEED_PAGES_KEY.format(scope=scope), FEED_VERSION_KEY.format(scope=scope)) for scope in sorted(scopes)]
+
+
+def invalidate_feed_pages(*logins: Optional[str]) -> None:
+	"""
+	Сбрасывает закэшированные страницы общей ленты и лент указанных авторов.
+	Ошибка Redis не прерывает запись статьи: страницы устареют не дольше чем на FEED_CACHE_TTL.
+	"""
+	if not FEED_CACHE_ENABLED:
+		return
+	try:
+		with connect_redis().pipeline(transaction=True) as pipe:
+			for pages_key, version_key in invalidation_keys(logins):
+				pipe.delete(pages_key)
+				pipe.incr(version_key)
+			pipe.execute()
+	except Exception as e:
+		logger.error("Redis: не удалось сбросить кэш ленты для %s: %s", logins, e)
+
+
+def invalidate_author_pages(login: str) -> None:
+	"""
+	Сбрасывает ленту и профиль одного автора, не трогая общую ленту: для изменений данных автора, а не его статей.
+	"""
+	if not FEED_CACHE_ENABLED:
+		return
+	try:
+		with connect_redis().pipeline(transaction=True) as pipe:
+			for pages_key, version_key in invalidation_keys([login], include_all=False):
+				pipe.delete(pages_key)
+				pipe.incr(version_key)
+			pipe.execute()
+	except Exception as e:
+		logger.error("Redis: не удалось сбросить кэш ленты автора %s: %s", login, e)
@@ -0,0 +1,103 @@
+"""
+Перенос байтов изображений из Redis в файловое хранилище.
+
+Запуск: python -m app.database.image_migration [--batch-size N] [--keep-source] [--dry-run]
+
+Переносить изображения нужно после переключения приложения на IMAGE_STORAGE_BACKEND=filesystem: новые
+изображения сразу пишутся на диск, а ещё не перенесённые читаются из Redis. Перенос идемпотентен и может
+быть прерван и запущен повторно. Ключ изображения в Redis удаляется, только если он всё ещё существует
+после записи файла; если изображение удалили во время переноса, записанный файл удаляется.
+"""
+
+from logging import Logger
+import argparse
+import json
+
+from .blobstore import FilesystemBlobStore, image_key
+from .connect import connect_redis
+from ..imaging import IMAGE_VARIANTS
+from ..logger import configure_logs
+from ..static import IMAGE_STORAGE_DIR, IMAGE_STORAGE_FSYNC
+
+__all__ = ["migrate_images_to_filesystem"]
+logger: Logger = configure_logs(__name__)
+
+# Удаляет ключи перенесённого изображения, только если оригинал ещё существует.
+# KEYS[1] - оригинал, KEYS[2..] - варианты. ARGV[1] = 1 - удалить ключи, 0 - только проверить.
+DROP_MIGRATED_SCRIPT: str = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+if ARGV[1] == '1' then
+    redis.call('DEL', unpack(KEYS))
+end
+return 1
+"""
+
+
+def _migrate_image(blob_store: FilesystemBlobStore, article_id: int, image_id: str,
+                   keep_source: bool, dry_run: bool) -> str:
+    redis_client = connect_redis()
+    keys = [image_key(article_id, image_id)]
+    keys.extend(image_key(article_id, image_id, variant) for variant in IMAGE_VARIANTS)
+    original, *variants = redis_client.mget(keys)
+    if original is None:
+        return "skipped"
+    if dry_run:
+        return "migrated"
+    blob_store.write(article_id, image_id, original)
+    for variant, data in zip(IMAGE_VARIANTS, variants):
+        if data is not None:
+            blob_store.write(article_id, image_id, data, variant)
+    drop = redis_client.register_script(DROP_MIGRATED_SCRIPT)
+    if not drop(keys=keys, args=[0 if keep_source else 1]):
+        # Изображение удалили из Redis, пока шла запись файлов
+        blob_store.delete(article_id, image_id)
+        return "skipped"
+    return "migrated"
+
+
+def migrate_images_to_filesystem(root: str = IMAGE_STORAGE_DIR, batch_size: int = 500,
+                                 keep_source: bool = False, dry_run: bool = False) -> dict[str, int]:
+    """
+    Переносит оригиналы и варианты изображений всех статей из Redis в файловое хранилище.
+
+    :param root: Корневой каталог файлового хранилища.
+    :param batch_size: Сколько ключей списков статей запрашивать за одну итерацию SCAN.
+    :param keep_source: Не удалять ключи изображений из Redis после переноса.
+    :param dry_run: Только посчитать изображения, которые будут перенесены.
+    :return: Количество статей, перенесённых, пропущенных (уже на диске или удалённых) и ошибочных изображений.
+    """
+    blob_store = FilesystemBlobStore(root, IMAGE_STORAGE_FSYNC)
+    redis_client = connect_redis()
+    stats = {"articles": 0, "migrated": 0, "skipped": 0, "failed": 0}
+    for list_key in redis_client.scan_iter(match="article:*:images", count=batch_size):
+        try:
+            article_id = int(list_key.decode("utf-8").split(":")[1])
+        except ValueError:
+            continue
+        stats["articles"] += 1
+        for raw_id in redis_client.lrange(list_key, 0, -1):
+            image_id = raw_id.decode("utf-8")
+            try:
+                stats[_migrate_image(blob_store, article_id, image_id, keep_source, dry_run)] += 1
+            except Exception as e:
+                stats["failed"] += 1
+                logger.error("Не удалось перенести изображение %s статьи %s: %s", image_id, article_id, e)
+        logger.info("Перенос изображений: обработана статья %s, итог %s", article_id, stats)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Перенос изображений из Redis в файловое хранилище")
+    parser.add_argument("--root", default=IMAGE_STORAGE_DIR, help="Корневой каталог файлового хранилища")
+    parser.add_argument("--batch-size", type=int, default=500, help="Размер пакета SCAN")
+    parser.add_argument("--keep-source", action="store_true", help="Не удалять изображения из Redis")
+    parser.add_argument("--dry-run", action="store_true", help="Только посчитать изображения")
+    args = parser.parse_args()
+    stats = migrate_images_to_filesystem(args.root, args.batch_size, args.keep_source, args.dry_run)
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
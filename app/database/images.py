@@ -3,83 +3,250 @@
 
 Содержит функции для вставки, удаления, получения списка изображений и извлечения байтов
 изображения по ключу. Используемые ключи формируются согласно шаблонам и хранятся в Redis.
+
+Пакетные операции выполняются за один запрос к Redis и атомарно: вставка - транзакцией MULTI/EXEC,
+удаление - Lua-скриптом, поэтому в списке статьи не остаются идентификаторы без данных.
+
+Байты изображений читаются и пишутся через хранилище get_blob_store() (см. blobstore): Redis или, при
+IMAGE_STORAGE_BACKEND=filesystem, файловая система; списки идентификаторов всегда хранятся в Redis. Байты
+записываются до добавления идентификатора в список (или в одной транзакции с ним) и удаляются после его удаления
+из списка, поэтому читатели не видят идентификаторов без данных.
 """
 
+from concurrent.futures import Future
+from functools import partial
 from logging import Logger
+from typing import Optional
+import binascii
 import base64
 import uuid
 
+from .blobstore import get_blob_store, image_key
 from .connect import connect_redis
+from ..imaging import IMAGE_VARIANTS, render_variants, get_derivatives_executor
 from ..logger import configure_logs
-from ..models.articles import ImagesAdd
+from ..models.articles import ImagesAdd, ImageResult
 
-__all__ = ["insert_images", "delete_images", "select_article_images", "get_image_bytes"]
+__all__ = ["insert_images", "delete_images", "select_article_images", "select_images_batch", "get_image_bytes",
+           "insert_images_batch", "delete_images_batch", "get_image_head", "get_image_range", "sniff_image_type",
+           "schedule_derivatives", "store_variants", "image_path"]
 logger: Logger = configure_logs(__name__)
 
-# Шаблоны ключей для хранения данных в Redis
+# Шаблон ключа списка изображений статьи; ключи байтов изображений - в blobstore
 ARTICLE_IMAGES_LIST: str = "article:{article_id}:images"
-IMAGE_KEY: str = "image:{article_id}:{image_id}"
+
+# Сколько первых байтов изображения достаточно для определения его формата
+IMAGE_SIGNATURE_BYTES: int = 32
+# Сигнатуры форматов: (смещение, магические байты, MIME-тип)
+IMAGE_SIGNATURES: tuple[tuple[int, bytes, str], ...] = (
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+    (4, b"ftypavif", "image/avif"),
+    (4, b"ftypheic", "image/heic"),
+    (0, b"BM", "image/bmp"),
+    (0, b"\x00\x00\x01\x00", "image/x-icon"),
+)
+
+# Удаляет ключи изображений и их вариантов и одним проходом O(N + k) убирает идентификаторы из списка статьи.
+# KEYS[1] - список статьи, KEYS[2..k+1] - ключи изображений, KEYS[k+2..] - ключи вариантов;
+# ARGV - идентификаторы изображений в порядке их ключей.
+# Возвращает 1 для удалённого изображения (был ключ с байтами или идентификатор в списке) и 0 для отсутствующего.
+DELETE_IMAGES_SCRIPT: str = """
+local results = {}
+local requested = {}
+local n = #ARGV
+for i = 1, n do
+    results[i] = redis.call('DEL', KEYS[i + 1])
+    requested[ARGV[i]] = i
+end
+for i = n + 2, #KEYS, 1000 do
+    redis.call('DEL', unpack(KEYS, i, math.min(i + 999, #KEYS)))
+end
+local ids = redis.call('LRANGE', KEYS[1], 0, -1)
+local kept = {}
+for _, id in ipairs(ids) do
+    if requested[id] then
+        results[requested[id]] = 1
+    else
+        kept[#kept + 1] = id
+    end
+end
+if #kept ~= #ids then
+    redis.call('DEL', KEYS[1])
+    for i = 1, #kept, 1000 do
+        redis.call('RPUSH', KEYS[1], unpack(kept, i, math.min(i + 999, #kept)))
+    end
+end
+return results
+"""
+
+
+def decode_images(images_b64: list[str]) -> list[bytes | binascii.Error]:
+    """
+    Декодирует изображения из base64, не прерываясь на ошибке в одном из них.
+
+    :param images_b64: Список изображений в формате base64.
+    :return: Байты изображения либо ошибка декодирования для каждого элемента списка.
+    """
+    decoded: list[bytes | binascii.Error] = []
+    for b64 in images_b64:
+        try:
+            decoded.append(base64.b64decode(b64))
+        except binascii.Error as e:
+            decoded.append(e)
+    return decoded
+
+
+def prepare_images(article_id: int, decoded: list[bytes | binascii.Error]
+                   ) -> tuple[list[ImageResult], dict[str, bytes]]:
+    """
+    Назначает image_id успешно декодированным изображениям.
+
+    :return: Результаты по каждому изображению и словарь image_id -> байты для записи.
+    """
+    results: list[ImageResult] = []
+    to_store: dict[str, bytes] = {}
+    for index, item in enumerate(decoded):
+        if isinstance(item, Exception):
+            results.append(ImageResult(index=index, success=False, error=f"Некорректный base64: {item}"))
+            continue
+        image_id = str(uuid.uuid4())
+        to_store[image_id] = item
+        results.append(ImageResult(index=index, image_id=image_id, success=True))
+    return results, to_store
+
+
+def delete_script_params(article_id: int, image_ids: list[str]) -> tuple[list[str], list[str]]:
+    """Формирует KEYS и ARGV для DELETE_IMAGES_SCRIPT."""
+    keys = [ARTICLE_IMAGES_LIST.format(article_id=article_id)]
+    keys.extend(image_key(article_id, image_id) for image_id in image_ids)
+    keys.extend(image_key(article_id, image_id, variant) for image_id in image_ids for variant in IMAGE_VARIANTS)
+    return keys, image_ids
+
+
+def _store_variants(article_id: int, image_id: str, future: Future) -> None:
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        logger.warning("Не удалось создать варианты изображения %s статьи %s: %s",
+                       image_id, article_id, future.exception())
+        return
+    variants: dict[str, bytes] = future.result()
+    try:
+        if store_variants(article_id, image_id, variants):
+            logger.info("Сохранены варианты %s изображения %s", list(variants), image_id)
+    except Exception as e:
+        logger.error("Ошибка сохранения вариантов изображения %s: %s", image_id, e)
+
+
+def store_variants(article_id: int, image_id: str, variants: dict[str, bytes]) -> bool:
+    """
+    Сохраняет варианты изображения, если его оригинал ещё существует.
+
+    :return: True, если варианты сохранены.
+    """
+    return get_blob_store().write_variants(article_id, image_id, variants)
+
+
+def schedule_derivatives(article_id: int, images: dict[str, bytes]) -> None:
+    """
+    Ставит создание вариантов изображений в очередь пула процессов, не дожидаясь результата.
+
+    Варианты сохраняются рядом с оригиналом по ключам image:{article_id}:{image_id}:{variant}.
+
+    :param article_id: Идентификатор статьи.
+    :param images: Словарь image_id -> байты оригинала.
+    """
+    executor = get_derivatives_executor()
+    if executor is None:
+        return
+    for image_id, data in images.items():
+        executor.submit(render_variants, data).add_done_callback(partial(_store_variants, article_id, image_id))
+
+
+def insert_images_batch(images_data: ImagesAdd) -> list[ImageResult]:
+    """
+    Вставляет пакет изображений за один атомарный запрос к Redis.
+
+    Идентификаторы всех корректных изображений добавляются одним RPUSH в транзакции MULTI/EXEC; хранилище
+    записывает байты до неё или в ней же (SET для каждого изображения в Redis). Изображения с некорректным base64
+    пропускаются и отмечаются в результате.
+
+    :param images_data: Объект с идентификатором статьи и списком изображений в формате base64.
+    :return: Результат для каждого изображения в порядке запроса.
+    """
+    article_id = images_data.article_id
+    results, to_store = prepare_images(article_id, decode_images(images_data.images))
+    if to_store:
+        blob_store = get_blob_store()
+        try:
+            with connect_redis().pipeline(transaction=True) as pipe:
+                blob_store.write_batch(article_id, to_store, pipe)
+                pipe.rpush(ARTICLE_IMAGES_LIST.format(article_id=article_id), *to_store)
+                pipe.execute()
+        except Exception:
+            blob_store.delete_unlisted(article_id, list(to_store))
+            raise
+        schedule_derivatives(article_id, to_store)
+    logger.info("Вставлено %d из %d изображений для статьи %s",
+                len(to_store), len(results), article_id)
+    return results
 
 
 def insert_images(images_data: ImagesAdd) -> list[str]:
     """
     Вставляет изображения в Redis и сохраняет связь с соответствующей статьей.
 
-    Для каждого изображения:
-    - Декодирует base64 строку в байты.
-    - Генерирует уникальный image_id.
-    - Сохраняет байты изображения по ключу image:{article_id}:{image_id}.
-    - Добавляет image_id в список article:{article_id}:images.
-
     :param images_data: Объект с идентификатором статьи и списком изображений в формате base64.
     :return: Список сгенерированных image_id для дальнейшего формирования URL.
     """
-    redis_client = connect_redis()
-    article_id = images_data.article_id
-    image_ids: list[str] = []
-    for b64 in images_data.images:
-        # Декодирование изображения из base64
-        img_bytes = base64.b64decode(b64)
-        # Генерация уникального идентификатора для изображения
-        image_id = str(uuid.uuid4())
-        key = f"image:{article_id}:{image_id}"
-        # Сохранение байтов изображения в Redis
-        redis_client.set(key, img_bytes)
-        # Добавление идентификатора изображения в список статьи
-        list_key = f"article:{article_id}:images"
-        redis_client.rpush(list_key, image_id)
-        image_ids.append(image_id)
-    logger.info("Redis: вставлено %d изображений для статьи %s", len(image_ids), article_id)
-    return image_ids
+    return [result.image_id for result in insert_images_batch(images_data) if result.success]
 
 
-def delete_images(article_id: int, image_ids: list[str]) -> list[str]:
+def delete_images_batch(article_id: int, image_ids: list[str]) -> list[ImageResult]:
     """
-    Удаляет указанные изображения для данной статьи.
+    Удаляет пакет изображений статьи одним атомарным Lua-скриптом.
 
-    Для каждого image_id:
-    - Удаляет ключ image:{article_id}:{image_id} из Redis.
-    - Убирает image_id из списка article:{article_id}:images.
+    Ключи image:{article_id}:{image_id} удаляются, а их идентификаторы убираются из списка
+    article:{article_id}:images за один проход по списку, а не отдельным LREM на каждое изображение.
 
     :param article_id: Идентификатор статьи, из которой удаляются изображения.
     :param image_ids: Список идентификаторов изображений для удаления.
-    :return: Список удалённых идентификаторов изображений.
+    :return: Результат для каждого изображения в порядке запроса.
     """
     logger.info("Удаление %d изображений для статьи %s", len(image_ids), article_id)
-    client = connect_redis()
-    list_key = ARTICLE_IMAGES_LIST.format(article_id=article_id)
-    deleted: list[str] = []
+    if not image_ids:
+        return []
+    keys, args = delete_script_params(article_id, image_ids)
+    flags = connect_redis().register_script(DELETE_IMAGES_SCRIPT)(keys=keys, args=args)
+    flags = merge_deleted(flags, get_blob_store().delete_unlisted(article_id, image_ids))
+    results = [ImageResult(index=index, image_id=image_id, success=bool(flag),
+                           error=None if flag else "Изображение не найдено")
+               for index, (image_id, flag) in enumerate(zip(image_ids, flags))]
+    logger.info("Удалено %d изображений для статьи %s", sum(flags), article_id)
+    return results
 
-    for image_id in image_ids:
-        key = IMAGE_KEY.format(article_id=article_id, image_id=image_id)
-        # Попытка удаления ключа
-        if client.delete(key):
-            # Если ключ был, то удаляем UID из списка
-            client.lrem(list_key, 0, image_id)
-            deleted.append(image_id)
 
-    logger.info("Удалено %d изображений для статьи %s", len(deleted), article_id)
-    return deleted
+def merge_deleted(flags: list[int], deleted: list[bool]) -> list[int]:
+    """
+    Объединяет результаты DELETE_IMAGES_SCRIPT с результатами BlobStore.delete_unlisted.
+    :return: 1 для изображения, удалённого хотя бы одним из них, иначе 0.
+    """
+    return [int(bool(flag) or blob_deleted) for flag, blob_deleted in zip(flags, deleted)]
+
+
+def delete_images(article_id: int, image_ids: list[str]) -> list[str]:
+    """
+    Удаляет указанные изображения для данной статьи.
+
+    :param article_id: Идентификатор статьи, из которой удаляются изображения.
+    :param image_ids: Список идентификаторов изображений для удаления.
+    :return: Список удалённых идентификаторов изображений.
+    """
+    return [result.image_id for result in delete_images_batch(article_id, image_ids) if result.success]
 
 
 def select_article_images(article_id: int, announce: bool = False) -> list[str]:
@@ -104,17 +271,82 @@ def select_article_images(article_id: int, announce: bool = False) -> list[str]:
     return image_ids
 
 
-def get_image_bytes(article_id: int, image_id: str) -> bytes | None:
+def select_images_batch(article_ids: list[int], announce: bool = False) -> dict[int, list[str]]:
+    """
+    Получает списки идентификаторов изображений для нескольких статей одним конвейером Redis.
+
+    :param article_ids: Идентификаторы статей.
+    :param announce: Если True, для каждой статьи возвращается только первый идентификатор (обложка).
+    :return: Словарь article_id -> список идентификаторов изображений; у статьи без изображений список пуст.
+    """
+    if not article_ids:
+        return {}
+    with connect_redis().pipeline(transaction=False) as pipe:
+        for article_id in article_ids:
+            pipe.lrange(ARTICLE_IMAGES_LIST.format(article_id=article_id), 0, 0 if announce else -1)
+        replies = pipe.execute()
+    logger.info("Redis: получены списки изображений для %d статей (announce=%s)", len(article_ids), announce)
+    return {article_id: [rid.decode('utf-8') for rid in raw_ids] for article_id, raw_ids in zip(article_ids, replies)}
+
+
+def get_image_bytes(article_id: int, image_id: str, variant: Optional[str] = None) -> bytes | None:
     """
     Извлекает байты изображения по-заданному article_id и image_id.
 
     :param article_id: Идентификатор статьи.
     :param image_id: Идентификатор изображения.
+    :param variant: Имя варианта из IMAGE_VARIANTS; None - оригинал.
     :return: Байты изображения, либо None если изображение не найдено.
     """
-    redis_client = connect_redis()
-    key = f"image:{article_id}:{image_id}"
-    data = redis_client.get(key)
+    data = get_blob_store().read(article_id, image_id, variant)
     if data is None:
-        logger.error("Redis: изображение не найдено: %s", key)
+        logger.error("Изображение не найдено: %s", image_key(article_id, image_id, variant))
     return data
+
+
+def sniff_image_type(head: bytes) -> str:
+    """
+    Определяет MIME-тип изображения по сигнатуре в первых байтах.
+
+    :param head: Первые IMAGE_SIGNATURE_BYTES байтов изображения.
+    :return: MIME-тип или application/octet-stream, если формат не распознан.
+    """
+    for offset, signature, mime_type in IMAGE_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return mime_type
+    return "application/octet-stream"
+
+
+def get_image_head(article_id: int, image_id: str, variant: Optional[str] = None) -> tuple[int, bytes] | None:
+    """
+    Получает размер изображения и его первые байты, не читая изображение целиком.
+
+    :param article_id: Идентификатор статьи.
+    :param image_id: Идентификатор изображения.
+    :param variant: Имя варианта из IMAGE_VARIANTS; None - оригинал.
+    :return: Размер в байтах и первые IMAGE_SIGNATURE_BYTES байтов, либо None если изображение не найдено.
+    """
+    return get_blob_store().head(article_id, image_id, IMAGE_SIGNATURE_BYTES, variant)
+
+
+def get_image_range(article_id: int, image_id: str, start: int, end: int, variant: Optional[str] = None) -> bytes:
+    """
+    Извлекает диапазон байтов изображения [start, end] включительно.
+
+    :param article_id: Идентификатор статьи.
+    :param image_id: Идентификатор изображения.
+    :param start: Смещение первого байта.
+    :param end: Смещение последнего байта.
+    :param variant: Имя варианта из IMAGE_VARIANTS; None - оригинал.
+    :return: Байты диапазона (пустые, если изображение не найдено).
+    """
+    return get_blob_store().read_range(article_id, image_id, start, end, variant)
+
+
+def image_path(article_id: int, image_id: str, variant: Optional[str] = None) -> str | None:
+    """
+    Путь к файлу изображения в файловом хранилище, чтобы отдать его без копирования через процесс.
+
+    :return: Путь к файлу, либо None если байты изображения хранятся в Redis или изображение не найдено.
+    """
+    return get_blob_store().open_path(article_id, image_id, variant)
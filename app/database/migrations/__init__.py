@@ -0,0 +1,111 @@
+"""
+Версионные миграции схемы PostgreSQL и проверка объектов, на которые опираются запросы приложения.
+
+Применённые версии записываются в public.schema_migrations. Миграции применяются по порядку под
+advisory-блокировкой, поэтому одновременный запуск из нескольких процессов безопасен. Каждая миграция идемпотентна:
+прерванную можно запустить повторно. Индексы строятся CONCURRENTLY и не блокируют запись в таблицы.
+
+Запуск: python -m app.database.migrations [upgrade [--target N] | status | check]
+"""
+from logging import Logger
+
+from psycopg2.extensions import connection as PgConnection
+
+from .schema import IndexSpec, REQUIRED_INDEXES, schema_problems
+from .versions import Migration, MIGRATIONS
+from ..connect import pg_connection
+from ...logger import configure_logs
+
+__all__: list[str] = ["Migration", "MIGRATIONS", "IndexSpec", "REQUIRED_INDEXES", "upgrade", "migration_status",
+					  "check_schema", "warn_schema_problems"]
+logger: Logger = configure_logs(__name__)
+
+# Ключ advisory-блокировки, под которой применяются миграции
+MIGRATIONS_LOCK_ID: int = 5_551_017
+
+_CREATE_VERSIONS_TABLE_SQL: str = """
+	CREATE TABLE IF NOT EXISTS public.schema_migrations (
+		version    integer PRIMARY KEY,
+		name       text        NOT NULL,
+		applied_at timestamptz NOT NULL DEFAULT now()
+	)
+"""
+
+
+def _applied_versions(conn: PgConnection) -> set[int]:
+	with conn.cursor() as cur:
+		cur.execute("SELECT to_regclass('public.schema_migrations') IS NOT NULL")
+		if not cur.fetchone()[0]:
+			return set()
+		cur.execute("SELECT version FROM public.schema_migrations")
+		return {row[0] for row in cur.fetchall()}
+
+
+def upgrade(target: int | None = None) -> list[int]:
+	"""
+	Применяет не применённые миграции до версии target включительно (по умолчанию - все).
+	:return: Версии, применённые этим вызовом.
+	"""
+	applied_now = []
+	with pg_connection() as conn:
+		with conn.cursor() as cur:
+			cur.execute(_CREATE_VERSIONS_TABLE_SQL)
+		conn.commit()
+		with conn.cursor() as cur:
+			cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATIONS_LOCK_ID,))
+		conn.commit()
+		try:
+			applied = _applied_versions(conn)
+			conn.commit()
+			for migration in MIGRATIONS:
+				if migration.version in applied or (target is not None and migration.version > target):
+					continue
+				logger.info("Применение миграции %d: %s", migration.version, migration.name)
+				try:
+					migration.apply(conn)
+					with conn.cursor() as cur:
+						cur.execute("INSERT INTO public.schema_migrations (version, name) VALUES (%s, %s)",
+									(migration.version, migration.name))
+					conn.commit()
+				except Exception as e:
+					conn.rollback()
+					logger.error("Миграция %d не применена: %s", migration.version, e)
+					raise
+				applied_now.append(migration.version)
+		finally:
+			with conn.cursor() as cur:
+				cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATIONS_LOCK_ID,))
+			conn.commit()
+	return applied_now
+
+
+def migration_status() -> list[dict]:
+	"""Список миграций с признаком применения."""
+	with pg_connection() as conn:
+		applied = _applied_versions(conn)
+	return [{"version": migration.version, "name": migration.name, "applied": migration.version in applied}
+			for migration in MIGRATIONS]
+
+
+def check_schema() -> list[str]:
+	"""Описания неприменённых миграций и отсутствующих объектов схемы; пустой список - схема в порядке."""
+	with pg_connection() as conn:
+		applied = _applied_versions(conn)
+		problems = [f"миграция {migration.version} ({migration.name}) не применена"
+					for migration in MIGRATIONS if migration.version not in applied]
+		problems.extend(schema_problems(conn))
+	return problems
+
+
+def warn_schema_problems() -> None:
+	"""Проверка при запуске: предупреждает о каждом отсутствующем объекте схемы, но не мешает запуску."""
+	try:
+		problems = check_schema()
+	except Exception as e:
+		logger.warning("Не удалось проверить схему базы данных: %s", e)
+		return
+	for problem in problems:
+		logger.warning("Схема базы данных: %s. Примените миграции: python -m app.database.migrations upgrade",
+					   problem)
+	if not problems:
+		logger.info("Схема базы данных: все миграции применены, нужные индексы на месте")
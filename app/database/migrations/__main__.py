@@ -0,0 +1,29 @@
+import argparse
+import json
+import sys
+
+from . import upgrade, migration_status, check_schema
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(prog="python -m app.database.migrations", description="Миграции схемы базы данных")
+	commands = parser.add_subparsers(dest="command", required=True)
+	upgrade_parser = commands.add_parser("upgrade", help="Применить неприменённые миграции")
+	upgrade_parser.add_argument("--target", type=int, default=None,
+								help="Применить миграции до этой версии включительно")
+	commands.add_parser("status", help="Показать применённые и неприменённые миграции")
+	commands.add_parser("check", help="Проверить расширения, индексы и триггеры; код выхода 1 при проблемах")
+	args = parser.parse_args()
+
+	if args.command == "upgrade":
+		print(json.dumps({"applied": upgrade(args.target)}))
+	elif args.command == "status":
+		print(json.dumps(migration_status(), ensure_ascii=False, indent=2))
+	else:
+		problems = check_schema()
+		print(json.dumps({"problems": problems}, ensure_ascii=False, indent=2))
+		sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,137 @@
+"""
+Объекты схемы, на которые опираются запросы приложения, и их проверка по системным каталогам PostgreSQL.
+
+Индекс ищется не по имени, а по определению: таблица, метод доступа и ведущие столбцы. Поэтому индекс, созданный
+вручную или ограничением UNIQUE, тоже засчитывается, и миграция не создаёт дубликат.
+"""
+from logging import Logger
+from typing import NamedTuple
+
+from psycopg2.extensions import connection as PgConnection
+
+from ...logger import configure_logs
+
+__all__: list[str] = ["IndexSpec", "REQUIRED_EXTENSIONS", "REQUIRED_INDEXES", "REQUIRED_TRIGGERS", "find_index",
+					  "ensure_index", "schema_problems"]
+logger: Logger = configure_logs(__name__)
+
+
+class IndexSpec(NamedTuple):
+	"""Индекс, нужный горячему запросу: где он нужен, как устроен и имя для создания."""
+	schema: str
+	table: str
+	method: str
+	columns: str
+	name: str
+	purpose: str
+
+	def create_sql(self) -> str:
+		return (f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.name} "
+				f"ON {self.schema}.{self.table} USING {self.method} ({self.columns})")
+
+
+REQUIRED_EXTENSIONS: tuple[str, ...] = ("pg_trgm",)
+
+REQUIRED_INDEXES: tuple[IndexSpec, ...] = (
+	IndexSpec("users", "users", "btree", "login", "users_login_idx",
+			  "вход, проверка логина и фильтр ленты по автору"),
+	IndexSpec("articles", "articles", "btree", "article_id", "articles_article_id_idx",
+			  "статья по id и лента от новых к старым"),
+	IndexSpec("articles", "articles", "btree", "user_id, article_id DESC", "articles_user_id_article_id_idx",
+			  "лента автора и соединение статей с пользователями"),
+	IndexSpec("articles", "articles", "gin", "search_vector", "articles_search_vector_idx",
+			  "полнотекстовый поиск"),
+	IndexSpec("articles", "articles", "gin", "search_document gin_trgm_ops", "articles_search_document_trgm_idx",
+			  "нечёткий поиск по триграммам"),
+)
+
+# (схема, таблица, имя триггера)
+REQUIRED_TRIGGERS: tuple[tuple[str, str, str], ...] = (
+	("articles", "articles", "articles_search_document"),
+	("articles", "articles", "articles_article_count_insert"),
+	("articles", "articles", "articles_article_count_delete"),
+	("articles", "articles", "articles_article_count_update"),
+)
+
+_INDEXES_SQL: str = """
+	SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisvalid
+	FROM pg_index i
+			 JOIN pg_class c ON c.oid = i.indexrelid
+			 JOIN pg_class t ON t.oid = i.indrelid
+			 JOIN pg_namespace n ON n.oid = t.relnamespace
+	WHERE n.nspname = %s
+	  AND t.relname = %s
+"""
+
+
+def _matches(definition: str, spec: IndexSpec) -> bool:
+	head = f"USING {spec.method} ({spec.columns}"
+	position = definition.find(head)
+	return position >= 0 and definition[position + len(head)] in "),"
+
+
+def find_index(conn: PgConnection, spec: IndexSpec) -> tuple[str, bool] | None:
+	"""
+	Ищет индекс с методом и ведущими столбцами spec.
+	:return: Имя индекса и признак валидности или None, если индекса нет.
+	"""
+	with conn.cursor() as cur:
+		cur.execute(_INDEXES_SQL, (spec.schema, spec.table))
+		rows = cur.fetchall()
+	found = None
+	for name, definition, valid in rows:
+		if _matches(definition, spec):
+			if valid:
+				return name, True
+			found = name, False
+	return found
+
+
+def ensure_index(conn: PgConnection, spec: IndexSpec) -> None:
+	"""
+	Создаёт индекс spec, если подходящего валидного индекса нет. Индекс строится CONCURRENTLY, не блокируя запись,
+	поэтому вызывается вне транзакции. Невалидный индекс, оставшийся от прерванного построения, пересоздаётся.
+	"""
+	found = find_index(conn, spec)
+	if found is not None and found[1]:
+		return
+	autocommit = conn.autocommit
+	conn.commit()
+	conn.autocommit = True
+	try:
+		with conn.cursor() as cur:
+			if found is not None:
+				logger.warning("Индекс %s.%s невалиден и будет пересоздан", spec.schema, found[0])
+				cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {spec.schema}.{found[0]}")
+			logger.info("Создание индекса %s: %s", spec.name, spec.purpose)
+			cur.execute(spec.create_sql())
+	finally:
+		conn.autocommit = autocommit
+
+
+def schema_problems(conn: PgConnection) -> list[str]:
+	"""Описания отсутствующих расширений, индексов и триггеров, от которых зависят запросы приложения."""
+	problems = []
+	with conn.cursor() as cur:
+		cur.execute("SELECT extname FROM pg_extension WHERE extname = ANY (%s)", (list(REQUIRED_EXTENSIONS),))
+		installed = {row[0] for row in cur.fetchall()}
+		problems.extend(f"нет расширения {name}" for name in REQUIRED_EXTENSIONS if name not in installed)
+		for schema, table, trigger in REQUIRED_TRIGGERS:
+			cur.execute("""
+				SELECT 1
+				FROM pg_trigger tg
+						 JOIN pg_class t ON t.oid = tg.tgrelid
+						 JOIN pg_namespace n ON n.oid = t.relnamespace
+				WHERE n.nspname = %s AND t.relname = %s AND tg.tgname = %s AND NOT tg.tgisinternal
+			""", (schema, table, trigger))
+			if cur.fetchone() is None:
+				problems.append(f"нет триггера {trigger} на {schema}.{table}")
+	for spec in REQUIRED_INDEXES:
+		found = find_index(conn, spec)
+		if found is None:
+			problems.append(f"нет индекса {spec.schema}.{spec.table} USING {spec.method} ({spec.columns}) "
+							f"для запроса: {spec.purpose}")
+		elif not found[1]:
+			problems.append(f"индекс {spec.schema}.{found[0]} невалиден, запрос «{spec.purpose}» его не использует")
+	conn.rollback()
+	return problems
@@ -0,0 +1,53 @@
+"""
+Миграции схемы по порядку версий. Уже применённую миграцию не меняют: изменения схемы добавляются новой версией.
+"""
+from collections.abc import Callable
+from typing import NamedTuple
+
+from psycopg2.extensions import connection as PgConnection
+
+from .schema import REQUIRED_INDEXES, ensure_index
+from ..authors import AUTHOR_STATS_STATEMENTS
+from ..search import SEARCH_SCHEMA_STATEMENTS, backfill_search_document
+
+__all__: list[str] = ["Migration", "MIGRATIONS"]
+
+
+class Migration(NamedTuple):
+	version: int
+	name: str
+	apply: Callable[[PgConnection], None]
+
+
+def _execute(*statements: str) -> Callable[[PgConnection], None]:
+	def apply(conn: PgConnection) -> None:
+		with conn.cursor() as cur:
+			for statement in statements:
+				cur.execute(statement)
+	return apply
+
+
+def _ensure_indexes(*names: str) -> Callable[[PgConnection], None]:
+	def apply(conn: PgConnection) -> None:
+		for spec in REQUIRED_INDEXES:
+			if spec.name in names:
+				ensure_index(conn, spec)
+	return apply
+
+
+def _search_document(conn: PgConnection) -> None:
+	_execute(*SEARCH_SCHEMA_STATEMENTS)(conn)
+	conn.commit()
+	backfill_search_document(conn)
+	_ensure_indexes("articles_search_vector_idx", "articles_search_document_trgm_idx")(conn)
+	with conn.cursor() as cur:
+		cur.execute("ANALYZE articles.articles")
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+	Migration(1, "расширение pg_trgm", _execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")),
+	Migration(2, "индексы входа, ленты и владельца статьи",
+			  _ensure_indexes("users_login_idx", "articles_article_id_idx", "articles_user_id_article_id_idx")),
+	Migration(3, "поисковый документ статей: колонки, триггер, GIN-индексы", _search_document),
+	Migration(4, "счётчик статей автора: колонка, триггеры, пересчёт", _execute(*AUTHOR_STATS_STATEMENTS)),
+)
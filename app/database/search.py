@@ -0,0 +1,105 @@
+"""
+Поиск статей по поддерживаемому поисковому документу.
+
+У каждой статьи есть две колонки, которые триггер пересчитывает при изменении title, announcement или article_body:
+search_vector - взвешенный tsvector (заголовок A, анонс B, текст C) под GIN-индексом и search_document - склейка
+полей под GIN-индексом gin_trgm_ops. Поиск выполняется в два шага:
+
+1. Полнотекстовый: search_vector @@ plainto_tsquery, ранжирование ts_rank_cd. Идёт по GIN-индексу и почти всегда
+   находит достаточно статей для страницы.
+2. Нечёткий, только если полнотекстовых совпадений меньше, чем нужно для страницы (опечатки, словоформы, которых
+   нет в словаре, стоп-слова): запрос <% search_document по триграммному индексу, ранжирование word_similarity.
+   Статьи, уже найденные полнотекстовым поиском, исключаются.
+
+Полнотекстовые совпадения всегда стоят выше нечётких. Ранжируются не больше SEARCH_TOP_K статей: страницы
+за этой границей пусты, поэтому стоимость запроса ограничена сортировкой top-K, а не всей выдачей.
+
+Колонки, триггер и индексы создаёт миграция 3 (python -m app.database.migrations upgrade).
+"""
+from logging import Logger
+
+from psycopg2.extensions import connection as PgConnection
+
+from ..logger import configure_logs
+from ..static import SEARCH_TOP_K, SEARCH_BACKFILL_BATCH
+
+__all__: list[str] = ["search_window", "merge_hits", "backfill_search_document"]
+logger: Logger = configure_logs(__name__)
+
+# Вес нечёткого совпадения относительно полнотекстового при выдаче score
+TRIGRAM_WEIGHT: float = 0.5
+
+# Колонки и триггер поискового документа. Выполняются по порядку, повторный запуск безопасен.
+SEARCH_SCHEMA_STATEMENTS: list[str] = [
+	"ALTER TABLE articles.articles ADD COLUMN IF NOT EXISTS search_vector tsvector",
+	"ALTER TABLE articles.articles ADD COLUMN IF NOT EXISTS search_document text",
+	"""
+	CREATE OR REPLACE FUNCTION articles.articles_search_document() RETURNS trigger AS $$
+	BEGIN
+		NEW.search_vector :=
+			setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A') ||
+			setweight(to_tsvector('russian', coalesce(NEW.announcement, '')), 'B') ||
+			setweight(to_tsvector('russian', coalesce(NEW.article_body, '')), 'C');
+		NEW.search_document := concat_ws(' ', NEW.title, NEW.announcement, NEW.article_body);
+		RETURN NEW;
+	END
+	$$ LANGUAGE plpgsql
+	""",
+	"DROP TRIGGER IF EXISTS articles_search_document ON articles.articles",
+	"""
+	CREATE TRIGGER articles_search_document
+		BEFORE INSERT OR UPDATE OF title, announcement, article_body ON articles.articles
+		FOR EACH ROW EXECUTE FUNCTION articles.articles_search_document()
+	""",
+]
+
+# Пересчитывает поисковый документ пачки статей, у которых его ещё нет: присваивание title запускает триггер
+BACKFILL_SQL: str = """
+	UPDATE articles.articles
+	SET title = title
+	WHERE article_id IN (SELECT article_id
+						 FROM articles.articles
+						 WHERE search_document IS NULL
+						 LIMIT %s)
+"""
+
+
+def search_window(amount: int | None, chunk: int | None) -> tuple[int, int]:
+	"""
+	Границы страницы поиска в ранжированной выдаче, обрезанные до SEARCH_TOP_K.
+	:return: Смещение и количество статей, которые нужно отранжировать (первые offset + amount).
+	"""
+	if amount is None or chunk is None:
+		return 0, SEARCH_TOP_K
+	offset = max(chunk - 1, 0) * amount
+	return offset, max(min(offset + amount, SEARCH_TOP_K), 0)
+
+
+def merge_hits(fts_rows: list[dict], trgm_rows: list[dict], offset: int) -> list[dict]:
+	"""
+	Склеивает полнотекстовые и нечёткие совпадения в одну выдачу и вырезает страницу начиная с offset.
+	Нечёткие совпадения идут после полнотекстовых, их score умножается на TRIGRAM_WEIGHT.
+	"""
+	hits = list(fts_rows)
+	for row in trgm_rows:
+		row["score"] = row["score"] * TRIGRAM_WEIGHT
+		hits.append(row)
+	return hits[offset:]
+
+
+def backfill_search_document(conn: PgConnection, batch_size: int = SEARCH_BACKFILL_BATCH) -> int:
+	"""
+	Строит поисковый документ для статей, у которых его ещё нет.
+	Каждая пачка из batch_size статей фиксируется отдельной транзакцией, чтобы не держать блокировку всей таблицы.
+	:return: Количество статей, для которых построен поисковый документ.
+	"""
+	total = 0
+	while True:
+		with conn.cursor() as cur:
+			cur.execute(BACKFILL_SQL, (batch_size,))
+			updated = cur.rowcount
+		conn.commit()
+		if not updated:
+			return total
+		total += updated
+		logger.info("Поисковый документ построен для %d статей", total)
@@ -0,0 +1,97 @@
+"""
+Снимки результатов поиска в Redis.
+
+Первая страница запроса ранжирует всю выдачу (не больше SEARCH_TOP_K статей) и сохраняет её списком
+search:snapshot:{digest}: первый элемент - число найденных статей, остальные - найденные статьи в порядке ранга.
+Следующие страницы того же запроса с тем же фильтром по логину отдаются срезом LRANGE без обращения к базе.
+Digest считается от нормализованного запроса: регистр и лишние пробелы на выдачу не влияют.
+
+Любое изменение статьи может поменять выдачу любого запроса, поэтому инвалидация удаляет все снимки: их ключи
+перечислены в множестве search:snapshots. Версия search:version не даёт запросу, начавшему ранжирование
+до инвалидации, сохранить устаревший снимок.
+
+Здесь - ключи, скрипты и синхронная инвалидация для слоя psycopg2; чтение снимков находится в aio.search_cache.
+"""
+from logging import Logger
+from typing import Optional
+import hashlib
+import json
+
+from .connect import connect_redis
+from ..logger import configure_logs
+from ..static import SEARCH_CACHE_ENABLED
+
+__all__: list[str] = ["invalidate_search_snapshots"]
+logger: Logger = configure_logs(__name__)
+
+SEARCH_SNAPSHOT_KEY: str = "search:snapshot:{digest}"
+SEARCH_SNAPSHOTS_KEY: str = "search:snapshots"
+SEARCH_VERSION_KEY: str = "search:version"
+SEARCH_STATS_KEY: str = "search:stats"
+
+# Возвращает число найденных статей, срез снимка и текущую версию, считая попадание или промах.
+# KEYS[1] - снимок, KEYS[2] - версия, KEYS[3] - счётчики; ARGV[1], ARGV[2] - границы среза в выдаче.
+LOOKUP_SNAPSHOT_SCRIPT: str = """
+local total = redis.call('LINDEX', KEYS[1], 0)
+redis.call('HINCRBY', KEYS[3], total and 'hits' or 'misses', 1)
+if not total then
+    return {false, redis.call('GET', KEYS[2]) or '0'}
+end
+return {total, '', redis.call('LRANGE', KEYS[1], tonumber(ARGV[1]) + 1, tonumber(ARGV[2]) + 1)}
+"""
+
+# Сохраняет снимок, только если снимки не инвалидировали с момента промаха.
+# KEYS[1] - снимок, KEYS[2] - версия, KEYS[3] - множество снимков; ARGV: версия при промахе, TTL, число статей, статьи.
+STORE_SNAPSHOT_SCRIPT: str = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('RPUSH', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[3], KEYS[1])
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+return 1
+"""
+
+# Удаляет все снимки и увеличивает версию. KEYS[1] - множество снимков, KEYS[2] - версия.
+INVALIDATE_SNAPSHOTS_SCRIPT: str = """
+local keys = redis.call('SMEMBERS', KEYS[1])
+for i = 1, #keys, 500 do
+    redis.call('DEL', unpack(keys, i, math.min(i + 499, #keys)))
+end
+redis.call('DEL', KEYS[1])
+return redis.call('INCR', KEYS[2])
+"""
+
+
+def normalize_query(query_str: str) -> str:
+	"""Приводит поисковый запрос к виду, по которому строится снимок: нижний регистр, одиночные пробелы."""
+	return " ".join(query_str.lower().split())
+
+
+def snapshot_key(query_str: str, login: Optional[str]) -> str:
+	digest = hashlib.sha256(json.dumps([query_str, login or ""], ensure_ascii=False).encode("utf-8")).hexdigest()
+	return SEARCH_SNAPSHOT_KEY.format(digest=digest)
+
+
+def encode_hit(row: dict) -> str:
+	return json.dumps([row["article_id"], row["title"], row["login"], row["score"]], ensure_ascii=False)
+
+
+def decode_hit(raw: bytes) -> dict:
+	article_id, title, login, score = json.loads(raw)
+	return {"article_id": article_id, "title": title, "login": login, "score": score}
+
+
+def invalidate_search_snapshots() -> None:
+	"""
+	Удаляет все снимки результатов поиска.
+	Ошибка Redis не прерывает запись статьи: снимки устареют не дольше чем на SEARCH_CACHE_TTL.
+	"""
+	if not SEARCH_CACHE_ENABLED:
+		return
+	try:
+		connect_redis().register_script(INVALIDATE_SNAPSHOTS_SCRIPT)(keys=[SEARCH_SNAPSHOTS_KEY, SEARCH_VERSION_KEY])
+	except Exception as e:
+		logger.error("Redis: не удалось сбросить снимки поиска: %s", e)
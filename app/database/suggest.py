@@ -0,0 +1,239 @@
+"""
+Индекс подсказок для строки поиска: префиксный поиск по заголовкам статей и логинам авторов в памяти процесса.
+
+Заголовки и логины хранятся в отсортированных массивах, префикс ищется двоичным поиском, поэтому подсказка
+не обращается ни к базе, ни к Redis. Заголовок индексируется с начала каждого слова: «Портрет маслом» находится
+и по «порт», и по «мас». Индекс строится при запуске воркера и дальше обновляется по одной статье: изменивший
+статью воркер обновляет свой индекс и публикует изменение в канал Redis SUGGEST_CHANNEL, остальные применяют его
+из подписки (см. aio.suggest). После потери подписки индекс строится заново.
+"""
+from bisect import bisect_left, insort
+from collections.abc import Hashable, Iterable
+from logging import Logger
+from typing import Any, Optional
+import json
+import threading
+import time
+
+from .connect import pg_connection, connect_redis
+from ..logger import configure_logs
+from ..static import SUGGEST_ENABLED, SUGGEST_CHANNEL
+
+__all__: list[str] = ["PrefixIndex", "SuggestIndex", "suggest_index", "load_suggest_index",
+					  "publish_article_suggestion", "publish_article_removal", "publish_login_suggestion",
+					  "publish_suggest_rebuild"]
+logger: Logger = configure_logs(__name__)
+
+# Ключи индекса обрезаются до этой длины: подсказка нужна по первым символам, а не по всему заголовку
+MAX_KEY_CHARS: int = 64
+
+SUGGEST_ARTICLES_SQL: str = """
+    SELECT art.article_id,
+           art.title,
+           us.login
+    FROM articles.articles art
+             JOIN users.users us ON art.user_id = us.id
+"""
+SUGGEST_LOGINS_SQL: str = "SELECT login FROM users.users"
+
+
+def normalize_prefix(text: str) -> str:
+	return " ".join(text.lower().split())[:MAX_KEY_CHARS]
+
+
+def title_keys(title: str) -> set[str]:
+	"""Ключи заголовка: заголовок, начиная с каждого его слова."""
+	words = title.lower().split()
+	return {" ".join(words[i:])[:MAX_KEY_CHARS] for i in range(len(words))}
+
+
+class PrefixIndex:
+	"""Отсортированный массив пар (ключ, идентификатор) с поиском идентификаторов по префиксу ключа."""
+
+	def __init__(self, entries: Iterable[tuple[str, Hashable]] = ()) -> None:
+		self._entries: list[tuple[str, Any]] = sorted(entries)
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def add(self, key: str, ident: Hashable) -> None:
+		index = bisect_left(self._entries, (key, ident))
+		if index == len(self._entries) or self._entries[index] != (key, ident):
+			insort(self._entries, (key, ident), lo=index)
+
+	def remove(self, key: str, ident: Hashable) -> None:
+		index = bisect_left(self._entries, (key, ident))
+		if index < len(self._entries) and self._entries[index] == (key, ident):
+			del self._entries[index]
+
+	def search(self, prefix: str, limit: int) -> list[Any]:
+		"""Первые limit различных идентификаторов, ключ которых начинается с prefix, в порядке ключей."""
+		found: dict[Any, None] = {}
+		index = bisect_left(self._entries, (prefix,))
+		while index < len(self._entries) and len(found) < limit:
+			key, ident = self._entries[index]
+			if not key.startswith(prefix):
+				break
+			found[ident] = None
+			index += 1
+		return list(found)
+
+
+class SuggestIndex:
+	"""
+	Потокобезопасный индекс подсказок: статьи по словам заголовка и логины авторов.
+
+	Пока индекс перестраивается из базы (begin_rebuild ... finish_rebuild), изменения, пришедшие после начала
+	чтения, записываются в журнал и повторно применяются к новому индексу, чтобы не потеряться.
+	"""
+
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self._titles = PrefixIndex()
+		self._logins = PrefixIndex()
+		self._articles: dict[int, tuple[str, str]] = {}
+		self._journal: list[tuple[str, tuple]] | None = None
+		self.loaded_at: float | None = None
+
+	def begin_rebuild(self) -> None:
+		with self._lock:
+			self._journal = []
+
+	def cancel_rebuild(self) -> None:
+		with self._lock:
+			self._journal = None
+
+	def finish_rebuild(self, articles: Iterable[tuple[int, str, str]], logins: Iterable[str]) -> None:
+		records = {article_id: (title or "", login) for article_id, title, login in articles}
+		titles = PrefixIndex((key, article_id) for article_id, (title, _) in records.items() for key in title_keys(title))
+		login_index = PrefixIndex((login.lower(), login) for login in logins if login)
+		with self._lock:
+			self._titles, self._logins, self._articles = titles, login_index, records
+			journal, self._journal = self._journal or [], None
+			for operation, args in journal:
+				getattr(self, operation)(*args)
+			self.loaded_at = time.time()
+
+	def _record(self, operation: str, *args: Any) -> None:
+		if self._journal is not None:
+			self._journal.append((operation, args))
+
+	def upsert_article(self, article_id: int, title: str, login: Optional[str]) -> None:
+		with self._lock:
+			self._record("_upsert_article", article_id, title or "", login)
+			self._upsert_article(article_id, title or "", login)
+
+	def remove_article(self, article_id: int) -> None:
+		with self._lock:
+			self._record("_remove_article", article_id)
+			self._remove_article(article_id)
+
+	def add_login(self, login: str) -> None:
+		with self._lock:
+			self._record("_add_login", login)
+			self._add_login(login)
+
+	def _upsert_article(self, article_id: int, title: str, login: Optional[str]) -> None:
+		previous = self._articles.get(article_id)
+		if previous is not None:
+			self._remove_article(article_id)
+			login = login or previous[1]
+		for key in title_keys(title):
+			self._titles.add(key, article_id)
+		self._articles[article_id] = (title, login)
+
+	def _remove_article(self, article_id: int) -> None:
+		previous = self._articles.pop(article_id, None)
+		if previous is not None:
+			for key in title_keys(previous[0]):
+				self._titles.remove(key, article_id)
+
+	def _add_login(self, login: str) -> None:
+		self._logins.add(login.lower(), login)
+
+	def suggest(self, prefix: str, limit: int) -> dict[str, list]:
+		"""Статьи, в заголовке которых есть слово с префиксом prefix, и логины, начинающиеся с prefix."""
+		prefix = normalize_prefix(prefix)
+		if not prefix:
+			return {"articles": [], "logins": []}
+		with self._lock:
+			article_ids = self._titles.search(prefix, limit)
+			articles = [{"article_id": article_id, "title": self._articles[article_id][0],
+						 "login": self._articles[article_id][1]} for article_id in article_ids]
+			return {"articles": articles, "logins": self._logins.search(prefix, limit)}
+
+	def stats(self) -> dict[str, Any]:
+		with self._lock:
+			return {"articles": len(self._articles), "title_keys": len(self._titles), "logins": len(self._logins),
+					"loaded_at": self.loaded_at}
+
+
+# Индекс подсказок процесса
+suggest_index: SuggestIndex = SuggestIndex()
+
+
+def load_suggest_index() -> None:
+	"""Строит индекс подсказок процесса из базы."""
+	suggest_index.begin_rebuild()
+	try:
+		with pg_connection() as conn, conn.cursor() as cur:
+			cur.execute(SUGGEST_ARTICLES_SQL)
+			articles = cur.fetchall()
+			cur.execute(SUGGEST_LOGINS_SQL)
+			logins = [row[0] for row in cur.fetchall()]
+	except Exception:
+		suggest_index.cancel_rebuild()
+		raise
+	suggest_index.finish_rebuild(articles, logins)
+	logger.info("Индекс подсказок построен: %s", suggest_index.stats())
+
+
+def suggestion_message(**change: Any) -> str:
+	return json.dumps(change, ensure_ascii=False)
+
+
+def apply_suggestion_message(data: bytes | str) -> None:
+	"""Применяет к индексу процесса изменение, опубликованное другим воркером."""
+	change = json.loads(data)
+	if change.get("rebuild"):
+		load_suggest_index()
+	elif "login" in change and "article_id" not in change:
+		suggest_index.add_login(change["login"])
+	elif change.get("removed"):
+		suggest_index.remove_article(change["article_id"])
+	else:
+		suggest_index.upsert_article(change["article_id"], change["title"], change.get("login"))
+
+
+def _publish(message: str) -> None:
+	try:
+		connect_redis().publish(SUGGEST_CHANNEL, message)
+	except Exception as e:
+		logger.error("Redis: не удалось оповестить воркеры об изменении подсказок: %s", e)
+
+
+def publish_article_suggestion(article_id: int, title: str, login: Optional[str]) -> None:
+	"""Добавляет или обновляет статью в индексе подсказок этого процесса и остальных воркеров."""
+	if SUGGEST_ENABLED and article_id is not None:
+		suggest_index.upsert_article(article_id, title, login)
+		_publish(suggestion_message(article_id=article_id, title=title, login=login))
+
+
+def publish_article_removal(article_id: int) -> None:
+	"""Удаляет статью из индекса подсказок этого процесса и остальных воркеров."""
+	if SUGGEST_ENABLED:
+		suggest_index.remove_article(article_id)
+		_publish(suggestion_message(article_id=article_id, removed=True))
+
+
+def publish_login_suggestion(login: str) -> None:
+	"""Добавляет логин нового пользователя в индекс подсказок этого процесса и остальных воркеров."""
+	if SUGGEST_ENABLED:
+		suggest_index.add_login(login)
+		_publish(suggestion_message(login=login))
+
+
+def publish_suggest_rebuild() -> None:
+	"""Просит все воркеры перестроить индекс подсказок из базы, например после массового импорта статей."""
+	if SUGGEST_ENABLED:
+		_publish(suggestion_message(rebuild=True))
@@ -1,17 +1,18 @@
-from sqlite3 import OperationalError, InterfaceError
 from logging import Logger
-import hashlib
 
-from psycopg2 import extensions, errors
+from psycopg2 import extensions, errors, OperationalError, InterfaceError
 from psycopg2.extras import DictCursor
 
-from .connect import connect_pg
+from .connect import pg_connection
+from .feed_cache import invalidate_author_pages
+from .suggest import publish_login_suggestion
 from .exceptions.change_password import *
 from ..logger import configure_logs
-from ..models.user_info import AuthorInfo
+from ..passwords import hash_password, verify_password
+from ..models.user_info import AuthorInfoRow
 
 __all__: list[str] = ["insert_user", "change_password", "process_user", "check_credentials", "check_login",
-					  "select_user_info", "change_description"]
+					  "select_user_info", "change_description", "select_password_hash"]
 logger: Logger = configure_logs(__name__)
 UserData = dict[str, any]
 
@@ -29,7 +30,7 @@ def insert_user(cur: extensions.cursor, user: dict) -> bool:
         """
 		params = (
 			user.get('login'),
-			hashlib.sha256(user.get('password').encode('utf-8'), usedforsecurity=True).hexdigest(),
+			hash_password(user.get('password')),
 			user.get('description')
 		)
 		logger.debug("Вставка пользователя с login %s", user.get('login'))
@@ -45,10 +46,8 @@ def insert_user(cur: extensions.cursor, user: dict) -> bool:
 
 
 def change_password(login: str, old_password: str, new_password: str) -> bool | None:
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			query_select: str = "SELECT password FROM users.users WHERE login = %s;"
 			cur.execute(query_select, (login,))
 			password: str | None = cur.fetchone()
@@ -56,7 +55,7 @@ def change_password(login: str, old_password: str, new_password: str) -> bool |
 			if password is None:
 				raise IncorrectLoginException(f"Логин {login} не найден")
 
-			if password[0] != hashlib.sha256(old_password.encode('utf-8'), usedforsecurity=True).hexdigest():
+			if not verify_password(old_password, password[0]):
 				raise OldPasswordMismatchException("Неверный старый пароль")
 
 			if old_password == new_password:
@@ -64,54 +63,48 @@ def change_password(login: str, old_password: str, new_password: str) -> bool |
 
 			query_update = "UPDATE users.users SET password = %s WHERE login = %s;"
 			cur.execute(query_update,
-						(hashlib.sha256(new_password.encode('utf-8'), usedforsecurity=True).hexdigest(), login))
+						(hash_password(new_password), login))
 			conn.commit()
 			logger.debug("Пароль успешно изменён для пользователя с login %s", login)
 			return True
 	except (OperationalError, InterfaceError) as e:
 		logger.error("Ошибка соединения: %s", e)
 		return False
-	finally:
-		if conn:
-			conn.close()
 
 
 def process_user(user: dict) -> bool | None:
 	"""
 	Обрабатывает и вставляет пользователя в базу данных.
-	Использует метод static.connect_pg() для получения соединения.
+	Использует connect.pg_connection() для получения соединения из пула.
 	"""
 	logger.info("Начало обработки пользователя %s.", user.get('login'))
-	conn = None
 	try:
-		conn = connect_pg()
-		conn.autocommit = False
-		with conn.cursor(cursor_factory=DictCursor) as cur:
-			cur.execute("SET search_path TO users, public;")
-			logger.debug("Поисковый путь установлен на схемы 'users' и 'public'.")
-
-		with conn.cursor(cursor_factory=DictCursor) as cur:
-			if not insert_user(cur, user):
+		with pg_connection() as conn:
+			try:
+				with conn.cursor(cursor_factory=DictCursor) as cur:
+					# SET LOCAL действует только до конца транзакции и не протекает в пул соединений
+					cur.execute("SET LOCAL search_path TO users, public;")
+					logger.debug("Поисковый путь установлен на схемы 'users' и 'public'.")
+
+				with conn.cursor(cursor_factory=DictCursor) as cur:
+					if not insert_user(cur, user):
+						conn.rollback()
+						logger.error("Ошибка вставки пользователя %s, транзакция откатилась.", user.get('login'))
+						return False
+
+				conn.commit()
+				logger.info("Транзакция зафиксирована для пользователя %s.", user.get('login'))
+				publish_login_suggestion(user.get('login'))
+				return True
+			except Exception:
 				conn.rollback()
-				logger.error("Ошибка вставки пользователя %s, транзакция откатилась.", user.get('login'))
-				return False
-
-		conn.commit()
-		logger.info("Транзакция зафиксирована для пользователя %s.", user.get('login'))
-		return True
+				raise
 	except (OperationalError, InterfaceError) as e:
-		if conn:
-			conn.rollback()
 		logger.error("Ошибка соединения для пользователя %s. Ошибка: %s", user.get('login'), e)
 	except errors.UniqueViolation:
 		raise
 	except Exception as e:
-		if conn:
-			conn.rollback()
 		logger.error("Транзакция откатилась для пользователя %s. Ошибка: %s", user.get('login'), e)
-	finally:
-		if conn:
-			conn.close()
 
 
 def check_credentials(login: str, password: str) -> bool | None:
@@ -119,10 +112,8 @@ def check_credentials(login: str, password: str) -> bool | None:
 	Проверяет корректность логина и пароля, подключаясь напрямую к базе данных.
 	"""
 	logger.info("Начало проверки учетных данных в базе данных.")
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			query = """
                 SELECT CASE 
                     WHEN EXISTS (
@@ -134,7 +125,7 @@ def check_credentials(login: str, password: str) -> bool | None:
                     ELSE false 
                 END AS is_valid;
             """
-			hashed_password = hashlib.sha256(password.encode('utf-8'), usedforsecurity=True).hexdigest()
+			hashed_password = hash_password(password)
 			cur.execute(query, (login, hashed_password))
 			result = bool(cur.fetchone()[0])
 			logger.info("Результат проверки учетных данных: %s", result)
@@ -145,9 +136,25 @@ def check_credentials(login: str, password: str) -> bool | None:
 	except Exception as e:
 		logger.error("Ошибка при выполнении запроса: %s", e)
 		raise
-	finally:
-		if conn:
-			conn.close()
+
+
+def select_password_hash(login: str) -> str | None:
+	"""
+	Получает сохранённый хэш пароля одним запросом.
+	Возвращает None, если пользователя с таким логином нет.
+	"""
+	logger.info("Получение хэша пароля пользователя %s.", login)
+	try:
+		with pg_connection() as conn, conn.cursor() as cur:
+			cur.execute("SELECT password FROM users.users WHERE login = %s;", (login,))
+			row = cur.fetchone()
+			return row[0] if row is not None else None
+	except (OperationalError, InterfaceError) as e:
+		logger.error("Ошибка соединения: %s", e)
+		raise
+	except Exception as e:
+		logger.error("Ошибка при выполнении запроса: %s", e)
+		raise
 
 
 def check_login(login: str) -> bool | None:
@@ -155,10 +162,8 @@ def check_login(login: str) -> bool | None:
 	Проверяет корректность логина, подключаясь напрямую к базе данных.
 	"""
 	logger.info("Начало проверки логина в базе данных.")
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			query = """
                 SELECT CASE 
                     WHEN EXISTS (
@@ -180,17 +185,12 @@ def check_login(login: str) -> bool | None:
 	except Exception as e:
 		logger.error("Ошибка при выполнении запроса: %s", e)
 		raise
-	finally:
-		if conn:
-			conn.close()
 
 
-def select_user_info(username: str) -> AuthorInfo:
+def select_user_info(username: str) -> AuthorInfoRow | None:
 	logger.info("Начало получения данных о пользователе %s", username)
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			query = """
 				SELECT 
 					id,
@@ -200,30 +200,23 @@ def select_user_info(username: str) -> AuthorInfo:
 				WHERE us.login = %s
 			"""
 			cur.execute(query, (username,))
-			result = cur.fetchone()
+			row = cur.fetchone()
 			logger.info("Получен пользователь с id %s", username)
-			return result
+			return AuthorInfoRow._make(row) if row is not None else None
 	except (OperationalError, InterfaceError) as e:
 		logger.error("Ошибка соединения: %s", e)
 		raise
 	except Exception as e:
 		logger.error("Ошибка при выполнении запроса: %s", e)
 		raise
-	finally:
-		if conn:
-			conn.close()
 
 
 def change_description(username: str, description: str) -> None:
-	conn = None
 	try:
-		conn = connect_pg()
-		with conn.cursor() as cur:
+		with pg_connection() as conn, conn.cursor() as cur:
 			cur.execute("UPDATE users.users SET description = %s WHERE login = %s;", (description, username))
 			conn.commit()
 			logger.debug("Описание успешно изменёно для пользователя с login %s", username)
+		invalidate_author_pages(username)
 	except (OperationalError, InterfaceError) as e:
 		logger.error("Ошибка соединения: %s", e)
-	finally:
-		if conn:
-			conn.close()
@@ -1,9 +1,9 @@
 from typing import Optional
 from logging import Logger
 
-from sqlite3 import OperationalError, InterfaceError
+from psycopg2 import OperationalError, InterfaceError
 
-from .connect import connect_pg
+from .connect import pg_connection
 from ..logger import configure_logs
 
 logger: Logger = configure_logs(__name__)
@@ -11,10 +11,8 @@ logger: Logger = configure_logs(__name__)
 
 def check_article_owner(article_id: int, requester: str) -> Optional[bool]:
     logger.info("Проверка владельца статьи %s для пользователя %s", article_id, requester)
-    conn = None
     try:
-        conn = connect_pg()
-        with conn.cursor() as cur:
+        with pg_connection() as conn, conn.cursor() as cur:
             cur.execute(
                 """
                 SELECT u.login
@@ -36,6 +34,3 @@ def check_article_owner(article_id: int, requester: str) -> Optional[bool]:
     except (OperationalError, InterfaceError) as e:
         logger.error("Ошибка соединения при проверке владельца: %s", e)
         raise
-    finally:
-        if conn:
-            conn.close()
@@ -0,0 +1,86 @@
+"""
+Генерация производных изображений (миниатюр) в отдельном пуле процессов.
+
+Ресайз и перекодирование выполняются в ProcessPoolExecutor, чтобы не конкурировать за GIL с обработкой
+запросов. Модуль не импортирует слой базы данных: дочерние процессы запускаются через spawn и импортируют
+только то, что нужно для render_variants. Pillow - необязательная зависимость; без неё производные
+изображения не создаются, а вместо них отдаётся оригинал.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from logging import Logger
+import multiprocessing
+import io
+
+try:
+	from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow не установлен
+	Image = None
+	ImageOps = None
+
+from .logger import configure_logs
+from .static import IMAGE_DERIVATIVES_ENABLED, IMAGE_DERIVATIVE_WORKERS, IMAGE_DERIVATIVE_QUALITY
+
+__all__: list[str] = ["IMAGE_VARIANTS", "render_variants", "get_derivatives_executor", "shutdown_derivatives_executor"]
+logger: Logger = configure_logs(__name__)
+
+# Варианты изображения и максимальная длина их большей стороны в пикселях
+IMAGE_VARIANTS: dict[str, int] = {
+	"thumb": 160,
+	"card": 480,
+	"full": 1600,
+}
+VARIANT_FORMAT: str = "WEBP"
+
+_executor: ProcessPoolExecutor | None = None
+
+if Image is None and IMAGE_DERIVATIVES_ENABLED:
+	logger.warning("Pillow не установлен, производные изображения не создаются.")
+
+
+def render_variants(data: bytes) -> dict[str, bytes]:
+	"""
+	Создаёт уменьшенные и перекодированные варианты изображения.
+
+	Выполняется в дочернем процессе. Изображение поворачивается согласно EXIF, вписывается в квадрат
+	размера варианта без увеличения и сохраняется в WEBP.
+
+	:param data: Байты оригинального изображения.
+	:return: Словарь имя варианта -> байты варианта.
+	"""
+	variants: dict[str, bytes] = {}
+	with Image.open(io.BytesIO(data)) as original:
+		image = ImageOps.exif_transpose(original)
+		if image.mode not in ("RGB", "RGBA"):
+			image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+		for name, side in IMAGE_VARIANTS.items():
+			variant = image.copy()
+			variant.thumbnail((side, side), Image.Resampling.LANCZOS)
+			buffer = io.BytesIO()
+			variant.save(buffer, format=VARIANT_FORMAT, quality=IMAGE_DERIVATIVE_QUALITY, method=4)
+			variants[name] = buffer.getvalue()
+	return variants
+
+
+def get_derivatives_executor() -> ProcessPoolExecutor | None:
+	"""
+	Возвращает пул процессов для генерации производных изображений, создавая его при первом вызове.
+	:return: Пул процессов, либо None если генерация отключена или Pillow не установлен.
+	"""
+	global _executor
+	if not IMAGE_DERIVATIVES_ENABLED or IMAGE_DERIVATIVE_WORKERS < 1:
+		return None
+	if Image is None:
+		return None
+	if _executor is None:
+		_executor = ProcessPoolExecutor(max_workers=IMAGE_DERIVATIVE_WORKERS,
+										mp_context=multiprocessing.get_context("spawn"))
+		logger.info("Создан пул из %d процессов для производных изображений.", IMAGE_DERIVATIVE_WORKERS)
+	return _executor
+
+
+def shutdown_derivatives_executor() -> None:
+	"""Останавливает пул процессов, отменяя ещё не начатые задачи."""
+	global _executor
+	if _executor is not None:
+		_executor.shutdown(wait=False, cancel_futures=True)
+		_executor = None
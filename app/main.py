@@ -1,11 +1,63 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from logging import Logger
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
+from .logger import configure_logs
+from .static import ASYNC_DB_ENABLED, SCHEMA_CHECK_ON_STARTUP, COMPRESSION_ENABLED
+from .compression import CompressionMiddleware
+from .metrics import (METRICS_AVAILABLE, MetricsMiddleware, start_pool_sampler, stop_pool_sampler,
+                      mark_worker_dead)
+from .imaging import shutdown_derivatives_executor
+from .passwords import shutdown_password_executor
+from .responses import FastJSONResponse
+from .database.connect import pg_connection_pool, pg_pool_stats, close_redis
+from .database.migrations import warn_schema_problems
+from .database.aio.connect import get_apg_pool, close_apg_pool, apg_pool_stats, close_redis as close_aioredis
+from .database.aio.article_cache import start_article_cache_listener, stop_article_cache_listener
+from .database.aio.suggest import start_suggest_listener, stop_suggest_listener
 from .routers.authorization import authorization_router
 from .routers.users import users_router
 from .routers.feed import feed_router
+from .routers.images import images_router
+from .routers.service import service_router
+from .routers.admin import admin_router
+from .routers.metrics import metrics_router
+
+logger: Logger = configure_logs(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    try:
+        if ASYNC_DB_ENABLED:
+            await get_apg_pool()
+        else:
+            await run_in_threadpool(pg_connection_pool.open)
+    except Exception as e:
+        logger.error("Не удалось заранее открыть пул PostgreSQL, соединения будут открыты по запросу: %s", e)
+    if SCHEMA_CHECK_ON_STARTUP:
+        await run_in_threadpool(warn_schema_problems)
+    start_article_cache_listener()
+    await start_suggest_listener()
+    start_pool_sampler({"postgres": pg_pool_stats, "asyncpg": apg_pool_stats})
+    yield
+    await stop_pool_sampler()
+    await stop_article_cache_listener()
+    await stop_suggest_listener()
+    await close_apg_pool()
+    await close_aioredis()
+    pg_connection_pool.closeall()
+    close_redis()
+    shutdown_derivatives_executor()
+    shutdown_password_executor()
+    mark_worker_dead()
+
 
-app: FastAPI = FastAPI()
+app: FastAPI = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,7 +66,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+if METRICS_AVAILABLE:
+    # Добавлен последним - внешний слой, время запроса включает сжатие ответа
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(authorization_router)
 app.include_router(feed_router)
 app.include_router(users_router)
+app.include_router(images_router)
+app.include_router(service_router)
+app.include_router(admin_router)
+app.include_router(metrics_router)
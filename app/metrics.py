@@ -0,0 +1,169 @@
+"""
+Метрики Prometheus: задержки и статусы маршрутов, задержки функций слоя базы данных и команд Redis,
+размер, занятость и ожидание пулов соединений.
+
+Воркеры uvicorn - отдельные процессы, поэтому при заданной переменной PROMETHEUS_MULTIPROC_DIR метрики пишутся
+в общий каталог (режим multiprocess prometheus_client), и /metrics любого воркера отдаёт сумму по всем воркерам.
+Каталог нужно очищать перед запуском сервера (см. Dockerfile); без переменной каждый воркер отдаёт только
+свои метрики. Запись значения - это запись в отображённый в память файл без блокировок между процессами,
+поэтому метрики можно держать включёнными в продакшене. prometheus_client - необязательная зависимость;
+без неё метрики не собираются, а /metrics отвечает 503.
+"""
+from collections.abc import Callable
+from logging import Logger
+from typing import Any, Optional
+import asyncio
+import time
+import os
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logger import configure_logs
+from .static import METRICS_ENABLED, METRICS_POOL_INTERVAL
+
+# PROMETHEUS_MULTIPROC_DIR читается при импорте prometheus_client, поэтому импорт идёт после static (и .env)
+try:
+	if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+		os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+	from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY,
+								   generate_latest, multiprocess)
+except ImportError:  # pragma: no cover - prometheus_client не установлен
+	multiprocess = None
+
+__all__: list[str] = ["METRICS_AVAILABLE", "MetricsMiddleware", "observe_db_call", "observe_redis_command",
+					  "render_metrics", "start_pool_sampler", "stop_pool_sampler", "mark_worker_dead"]
+logger: Logger = configure_logs(__name__)
+
+METRICS_AVAILABLE: bool = METRICS_ENABLED and multiprocess is not None
+MULTIPROCESS: bool = METRICS_AVAILABLE and bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Маршрут запроса, не совпавшего ни с одним маршрутом: путь в метку не попадает, чтобы число рядов было ограничено
+UNMATCHED_ROUTE: str = "<unmatched>"
+
+if METRICS_ENABLED and multiprocess is None:
+	logger.warning("prometheus_client не установлен, метрики не собираются.")
+
+if METRICS_AVAILABLE:
+	HTTP_REQUEST_DURATION = Histogram(
+		"arthub_http_request_duration_seconds", "Время обработки запроса по маршрутам",
+		["method", "route"], buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+	)
+	HTTP_REQUESTS = Counter("arthub_http_requests", "Запросы по маршрутам и статусам ответа",
+							["method", "route", "status"])
+	DB_CALL_DURATION = Histogram(
+		"arthub_db_call_duration_seconds", "Время выполнения функций слоя базы данных",
+		["function"], buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+	)
+	REDIS_COMMAND_DURATION = Histogram(
+		"arthub_redis_command_duration_seconds", "Время выполнения команд и конвейеров Redis",
+		["command"], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+	)
+	POOL_CONNECTIONS = Gauge("arthub_pool_connections", "Соединения пулов: предел, занятые и свободные",
+							 ["pool", "state"], multiprocess_mode="livesum")
+	POOL_WAIT_MAX = Gauge("arthub_pool_wait_max_seconds", "Наибольшее ожидание соединения из пула",
+						  ["pool"], multiprocess_mode="livemax")
+	POOL_WAIT = Counter("arthub_pool_wait_seconds", "Суммарное ожидание соединений из пула", ["pool"])
+	POOL_CHECKOUTS = Counter("arthub_pool_checkouts", "Выдачи соединений из пула", ["pool"])
+
+_sampler_task: asyncio.Task | None = None
+
+
+def observe_db_call(function: str, seconds: float) -> None:
+	if METRICS_AVAILABLE:
+		DB_CALL_DURATION.labels(function).observe(seconds)
+
+
+def observe_redis_command(command: Any, seconds: float) -> None:
+	if METRICS_AVAILABLE:
+		if isinstance(command, bytes):
+			command = command.decode("ascii", "replace")
+		REDIS_COMMAND_DURATION.labels(str(command).upper()).observe(seconds)
+
+
+class MetricsMiddleware:
+	"""ASGI-middleware: время обработки и статус каждого HTTP-запроса с меткой шаблона маршрута."""
+
+	def __init__(self, app: ASGIApp) -> None:
+		self.app = app
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+		started = time.perf_counter()
+		status_code = 500
+
+		async def send_with_status(message: Message) -> None:
+			nonlocal status_code
+			if message["type"] == "http.response.start":
+				status_code = message["status"]
+			await send(message)
+
+		try:
+			await self.app(scope, receive, send_with_status)
+		finally:
+			# Маршрут FastAPI записывает в scope при сопоставлении
+			route = scope.get("route")
+			route_path = getattr(route, "path", UNMATCHED_ROUTE)
+			HTTP_REQUEST_DURATION.labels(scope["method"], route_path).observe(time.perf_counter() - started)
+			HTTP_REQUESTS.labels(scope["method"], route_path, str(status_code)).inc()
+
+
+def render_metrics() -> tuple[bytes, str]:
+	"""Метрики в текстовом формате Prometheus: по всем воркерам в режиме multiprocess, иначе этого процесса."""
+	if MULTIPROCESS:
+		registry = CollectorRegistry()
+		multiprocess.MultiProcessCollector(registry)
+		return generate_latest(registry), CONTENT_TYPE_LATEST
+	return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def _sample_pools(pools: dict[str, Callable[[], dict]], previous: dict[str, dict]) -> None:
+	for pool, stats_func in pools.items():
+		stats = stats_func()
+		for state in ("max_size", "in_use", "idle"):
+			POOL_CONNECTIONS.labels(pool, state).set(stats[state])
+		POOL_WAIT_MAX.labels(pool).set(stats["wait_seconds_max"])
+		# Пулы считают накопленные значения сами; счётчики получают прирост с прошлого замера
+		last = previous.get(pool, {"wait_seconds_total": 0.0, "checkouts": 0})
+		POOL_WAIT.labels(pool).inc(max(stats["wait_seconds_total"] - last["wait_seconds_total"], 0))
+		POOL_CHECKOUTS.labels(pool).inc(max(stats["checkouts"] - last["checkouts"], 0))
+		previous[pool] = stats
+
+
+async def _sample_pools_forever(pools: dict[str, Callable[[], dict]]) -> None:
+	previous: dict[str, dict] = {}
+	while True:
+		try:
+			_sample_pools(pools, previous)
+		except Exception as e:
+			logger.error("Не удалось снять показатели пулов соединений: %s", e)
+		await asyncio.sleep(METRICS_POOL_INTERVAL)
+
+
+def start_pool_sampler(pools: dict[str, Callable[[], dict]]) -> None:
+	"""
+	Запускает фоновый опрос пулов воркера раз в METRICS_POOL_INTERVAL секунд.
+	:param pools: Имя пула -> функция статистики в формате connect.pg_pool_stats().
+	"""
+	global _sampler_task
+	if METRICS_AVAILABLE and _sampler_task is None:
+		_sampler_task = asyncio.create_task(_sample_pools_forever(pools))
+
+
+async def stop_pool_sampler() -> None:
+	"""Останавливает опрос пулов."""
+	global _sampler_task
+	if _sampler_task is not None:
+		_sampler_task.cancel()
+		try:
+			await _sampler_task
+		except asyncio.CancelledError:
+			pass
+		_sampler_task = None
+
+
+def mark_worker_dead(pid: Optional[int] = None) -> None:
+	"""Убирает показатели пулов остановленного воркера из суммы по воркерам."""
+	if MULTIPROCESS:
+		multiprocess.mark_process_dead(pid or os.getpid())
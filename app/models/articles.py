@@ -1,6 +1,9 @@
+from typing import NamedTuple, Optional
+
 from pydantic import BaseModel
 
-__all__: list[str] = ["ArticleAnnouncement", "ArticleData", "ArticleFull", "ArticleAdd", "ImagesAdd"]
+__all__: list[str] = ["ArticleAnnouncement", "ArticleData", "ArticleFull", "ArticleAdd", "ImagesAdd", "ImageResult",
+					  "ArticleAnnouncementRow", "ArticleDataRow", "ArticleFullRow"]
 
 
 class ArticleAnnouncement(BaseModel):
@@ -34,3 +37,36 @@ class ArticleAdd(BaseModel):
 class ImagesAdd(BaseModel):
 	article_id: int
 	images: list[str]
+
+
+class ImageResult(BaseModel):
+	index: int
+	image_id: Optional[str] = None
+	success: bool
+	error: Optional[str] = None
+
+
+# Строки, которые возвращают функции выборки статей. Это кортежи без __dict__: в JSON они остаются массивами,
+# как прежние строки psycopg2, а поля доступны по именам соответствующих моделей
+
+
+class ArticleAnnouncementRow(NamedTuple):
+	id: int
+	title: str
+	user_name: str
+	announcement: str
+
+
+class ArticleDataRow(NamedTuple):
+	id: int
+	title: str
+	user_name: str
+	article_body: str
+
+
+class ArticleFullRow(NamedTuple):
+	id: int
+	title: str
+	user_name: str
+	announcement: str
+	article_body: str
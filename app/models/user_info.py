@@ -1,6 +1,8 @@
+from typing import NamedTuple
+
 from pydantic import BaseModel
 
-__all__: list[str] = ["AuthorInfo", "DescriptionUpdate"]
+__all__: list[str] = ["AuthorInfo", "DescriptionUpdate", "AuthorInfoRow"]
 
 
 class AuthorInfo(BaseModel):
@@ -11,3 +13,10 @@ class AuthorInfo(BaseModel):
 
 class DescriptionUpdate(BaseModel):
 	description: str
+
+
+class AuthorInfoRow(NamedTuple):
+	"""Строка select_user_info; в JSON остаётся массивом [id, login, description]."""
+	id: int
+	author_name: str
+	description: str
@@ -0,0 +1,53 @@
+"""
+Хэширование и проверка паролей.
+
+Хэши считаются в ограниченном пуле потоков PASSWORD_HASH_WORKERS, а не в цикле событий: при переходе на
+намеренно медленную функцию формирования ключа (scrypt, PBKDF2 - они отпускают GIL) вход пользователей
+не будет останавливать обработку остальных запросов, а число одновременно считаемых хэшей ограничено.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import hmac
+
+from .static import PASSWORD_HASH_WORKERS
+
+__all__: list[str] = ["hash_password", "verify_password", "hash_password_async", "verify_password_async",
+					  "shutdown_password_executor"]
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def hash_password(password: str) -> str:
+	"""Хэш пароля в формате, который хранится в столбце users.users.password."""
+	return hashlib.sha256(password.encode('utf-8'), usedforsecurity=True).hexdigest()
+
+
+def verify_password(password: str, stored_hash: str) -> bool:
+	"""Сравнивает хэш пароля с сохранённым за постоянное время."""
+	return hmac.compare_digest(hash_password(password), stored_hash)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+	global _executor
+	if _executor is None:
+		_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+	return _executor
+
+
+async def hash_password_async(password: str) -> str:
+	"""hash_password в пуле потоков хэширования."""
+	return await asyncio.get_running_loop().run_in_executor(_get_executor(), hash_password, password)
+
+
+async def verify_password_async(password: str, stored_hash: str) -> bool:
+	"""verify_password в пуле потоков хэширования."""
+	return await asyncio.get_running_loop().run_in_executor(_get_executor(), verify_password, password, stored_hash)
+
+
+def shutdown_password_executor() -> None:
+	"""Останавливает пул потоков хэширования."""
+	global _executor
+	if _executor is not None:
+		_executor.shutdown(wait=False, cancel_futures=True)
+		_executor = None
@@ -1,10 +1,18 @@
 from . import authorization
 from . import users
 from . import feed
+from . import images
+from . import service
+from . import admin
+from . import metrics
 
 __all__: list[str] = authorization.__all__
 __all__.extend(users.__all__)
 __all__.extend(feed.__all__)
+__all__.extend(images.__all__)
+__all__.extend(service.__all__)
+__all__.extend(admin.__all__)
+__all__.extend(metrics.__all__)
 __version__: str = "0.2.0"
 __author__: str = "honfi555"
 __email__: str = "kasanindaniil@gmail.com"
@@ -0,0 +1,82 @@
+from collections.abc import AsyncIterator
+from logging import Logger
+from typing import Optional
+import asyncio
+import io
+
+from fastapi import APIRouter, Depends, Query, Request, status, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..logger import configure_logs
+from ..responses import FastJSONResponse
+from ..utils import admin_login
+from ..static import BULK_BATCH_SIZE
+from ..database.bulk import BULK_FORMATS, import_articles, iter_export_articles
+
+__all__: list[str] = ["admin_router"]
+admin_router: APIRouter = APIRouter(
+	prefix="/admin",
+	tags=["Маршруты администратора"],
+	dependencies=[Depends(admin_login)],
+	default_response_class=FastJSONResponse
+)
+logger: Logger = configure_logs(__name__)
+
+BULK_FORMAT_PATTERN: str = "^(" + "|".join(BULK_FORMATS) + ")$"
+
+
+class _RequestBodyReader(io.RawIOBase):
+	"""
+	Синхронное чтение тела запроса из рабочего потока: каждый следующий фрагмент запрашивается у цикла событий.
+	Тело не накапливается в памяти - импорт читает его с той скоростью, с которой загружает пачки в базу.
+	"""
+
+	def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop) -> None:
+		super().__init__()
+		self._chunks = chunks
+		self._loop = loop
+		self._pending = memoryview(b"")
+
+	def readable(self) -> bool:
+		return True
+
+	def readinto(self, buffer) -> int:
+		while not self._pending:
+			try:
+				chunk = asyncio.run_coroutine_threadsafe(self._chunks.__anext__(), self._loop).result()
+			except StopAsyncIteration:
+				return 0
+			self._pending = memoryview(chunk)
+		size = min(len(buffer), len(self._pending))
+		buffer[:size] = self._pending[:size]
+		self._pending = self._pending[size:]
+		return size
+
+
+@admin_router.post("/articles/import")
+async def import_articles_route(request: Request,
+								fmt: str = Query("ndjson", pattern=BULK_FORMAT_PATTERN),
+								batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=100_000)):
+	"""
+	Массовый импорт статей из тела запроса в формате NDJSON или CSV (см. app.database.bulk).
+	Тело читается потоком, пачки по batch_size статей загружаются через COPY отдельными транзакциями.
+	"""
+	reader = io.TextIOWrapper(io.BufferedReader(_RequestBodyReader(request.stream(), asyncio.get_running_loop())),
+							  encoding="utf-8", newline="")
+	try:
+		stats = await run_in_threadpool(import_articles, reader, fmt, batch_size)
+		return FastJSONResponse(status_code=status.HTTP_200_OK, content={"success": True, **stats})
+	except UnicodeDecodeError as e:
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Тело запроса не в UTF-8: {e}")
+	except Exception as e:
+		logger.error("An error excepted in import_articles route, error: %s", str(e))
+		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@admin_router.get("/articles/export")
+async def export_articles_route(fmt: str = Query("ndjson", pattern=BULK_FORMAT_PATTERN),
+								login: Optional[str] = None):
+	"""Потоковый экспорт всех статей (или статей автора login) в формате NDJSON или CSV."""
+	return StreamingResponse(iter_export_articles(fmt, login), media_type=BULK_FORMATS[fmt],
+							 headers={"Content-Disposition": f'attachment; filename="articles.{fmt}"'})
@@ -1,44 +1,51 @@
 from logging import Logger
 
-from fastapi import APIRouter, HTTPException, Header, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, status
 from psycopg2 import errors
 from psycopg2.errorcodes import UNIQUE_VIOLATION
+import asyncpg
 
 from ..logger import configure_logs
-from ..utils import create_jwt, verify_jwt
+from ..responses import FastJSONResponse
+from ..utils import create_jwt, jwt_claims
 from ..models.authorization import SignInData, ChangePasswordData
-from ..database.users import process_user, check_credentials, check_login, change_password
+from ..passwords import verify_password_async
+from ..database.aio.users import process_user, select_password_hash, change_password
 from ..database.exceptions.change_password import *
 
 __all__: list[str] = ["authorization_router"]
 authorization_router: APIRouter = APIRouter(
 	prefix="/auth",
-	tags=["Маршруты для действий с аккаунтом пользователя."]
+	tags=["Маршруты для действий с аккаунтом пользователя."],
+	default_response_class=FastJSONResponse
 )
 logger: Logger = configure_logs(__name__)
 
 
 @authorization_router.post("/sign_in")
 async def sign_in_route(data: SignInData):
+	"""
+	Вход по логину и паролю: хэш пароля читается одним запросом, а проверяется в пуле потоков хэширования.
+	"""
 	logger.info(data.login)
-	if not check_login(data.login):
+	stored_hash: str | None = await select_password_hash(data.login)
+	if stored_hash is None:
 		raise HTTPException(status.HTTP_404_NOT_FOUND, "Пользователь с таким логином не найден")
-	if not check_credentials(data.login, data.password):
+	if not await verify_password_async(data.password, stored_hash):
 		raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Введён неверный пароль")
-	return JSONResponse(content={"success": True, "message": "Аутентификация пользователя прошла успешно",
-								 "token": create_jwt(data.login)},
-						status_code=status.HTTP_200_OK)
+	return FastJSONResponse(content={"success": True, "message": "Аутентификация пользователя прошла успешно",
+									 "token": create_jwt(data.login)},
+							status_code=status.HTTP_200_OK)
 
 
 @authorization_router.post("/sign_up")
 async def sign_up_route(data: SignInData):
 	try:
-		process_user(user={"login": data.login, "password": data.password, "description": ""})
-		return JSONResponse(content={"success": True, "message": "Пользователь успешно зарегистрирован",
-									 "token": create_jwt(data.login)},
-							status_code=status.HTTP_201_CREATED)
-	except errors.lookup(UNIQUE_VIOLATION):
+		await process_user(user={"login": data.login, "password": data.password, "description": ""})
+		return FastJSONResponse(content={"success": True, "message": "Пользователь успешно зарегистрирован",
+										 "token": create_jwt(data.login)},
+								status_code=status.HTTP_201_CREATED)
+	except (errors.lookup(UNIQUE_VIOLATION), asyncpg.UniqueViolationError):
 		raise HTTPException(status.HTTP_409_CONFLICT, "Пользователь с таким логином уже существует")
 	except Exception as e:
 		logger.exception("Возникла непредвиденная ошибка при регистрации пользователя с логином %s. Ошибка: %s",
@@ -47,12 +54,11 @@ async def sign_up_route(data: SignInData):
 							"Возникла непредвиденная ошибка на стороне сервера")
 
 
-@authorization_router.post("/change_password")
-@verify_jwt
-async def change_password_route(data: ChangePasswordData, authorization: str = Header(...)):
+@authorization_router.post("/change_password", dependencies=[Depends(jwt_claims)])
+async def change_password_route(data: ChangePasswordData):
 	try:
-		if change_password(data.login, data.old_password, data.new_password):
-			return JSONResponse(content={"success": True, "message": "Пароль успешно сменён"}, status_code=status.HTTP_200_OK)
+		if await change_password(data.login, data.old_password, data.new_password):
+			return FastJSONResponse(content={"success": True, "message": "Пароль успешно сменён"}, status_code=status.HTTP_200_OK)
 		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
 							detail="Непредвиденная ошибка, на стороне сервера")
 	except (IncorrectLoginException, OldPasswordMismatchException) as e:
@@ -1,74 +1,165 @@
+from collections.abc import Awaitable, Callable
 from typing import Optional
 from logging import Logger
+import asyncio
 
-from fastapi import APIRouter, Body, Header, Query, status, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, Depends, Header, Query, Request, Response, status, HTTPException
 
 from ..logger import configure_logs
-from ..utils import verify_jwt, get_jwt_login
-from ..models.articles import ArticleAnnouncement, ArticleData, ArticleFull, ImagesAdd, ArticleAdd
-from ..database.utils import check_article_owner
-from ..database.articles import (select_articles_announcement, select_article, select_article_full, insert_article,
-								 update_article, delete_article, select_articles_by_search)
-from ..database.images import delete_images, insert_images
+from ..utils import jwt_claims, jwt_login, encode_cursor, decode_cursor
+from ..uploads import stream_image_uploads
+from ..static import COMPRESSION_ENABLED, ARTICLES_BATCH_MAX
+from ..responses import FastJSONResponse, NDJSONResponse, dumps_json
+from ..compression import negotiate_encoding
+from ..models.articles import ArticleAnnouncementRow, ArticleFull, ImagesAdd, ArticleAdd, ImageResult
+from ..database.aio.utils import check_article_owner
+from ..database.aio.articles import (select_articles_announcement, select_article, select_article_full,
+									 insert_article, update_article, delete_article, select_articles_by_search, select_articles_batch,
+									 iter_articles_announcement, iter_articles_by_search)
+from ..database.aio.images import delete_images_batch, insert_images_batch, select_images_batch
+from ..database.aio.article_cache import cached_encoded_article
+from ..database.aio.feed_cache import cached_feed_page
+from ..database.aio.search_cache import search_page
+from ..database.search_cache import normalize_query
+from ..database.suggest import suggest_index
+from ..database.exceptions.images import ImageTooLargeException, InvalidUploadException
+from ..database.exceptions.pagination import InvalidCursorException
 
 __all__: list[str] = ["feed_router"]
 feed_router: APIRouter = APIRouter(
 	prefix="/feed",
-	tags=["Маршруты для получения статей пользователей"]
+	tags=["Маршруты для получения статей пользователей"],
+	default_response_class=FastJSONResponse
 )
 logger: Logger = configure_logs(__name__)
 
 
-@feed_router.get("/articles")
-@verify_jwt
-async def get_articles_route(authorization: str = Header(...),
-							 amount: Optional[int] = 10,
+@feed_router.get("/articles", dependencies=[Depends(jwt_claims)])
+async def get_articles_route(amount: Optional[int] = 10,
 							 chunk: Optional[int] = 1,
-							 login: Optional[str] = None):
+							 login: Optional[str] = None,
+							 cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+							 stream: bool = Query(False, description="Вся лента потоком NDJSON, без страниц"),
+							 covers: bool = Query(False, description="Добавить к анонсам id обложек")):
+	"""
+	Лента анонсов статей от новых к старым.
+
+	Страница выбирается по cursor (значение next_cursor из предыдущего ответа), а без него - по номеру chunk.
+	next_cursor равен null, когда статей больше нет. Страницы кэшируются в Redis и сбрасываются при записи статей.
+	С stream=true amount и chunk не учитываются: все статьи после cursor (или статьи автора login) отдаются
+	потоком NDJSON по объекту на строку, прочитанные из базы серверным курсором.
+	С covers=true к каждому анонсу страницы пятым элементом добавляется id обложки (первого изображения статьи)
+	или null. Обложки всей страницы читаются одним конвейером Redis уже после кэша страниц, поэтому изменение
+	изображений не требует сброса кэша ленты.
+	"""
 	try:
-		articles_data: list[ArticleAnnouncement] = select_articles_announcement(amount, chunk, login)
-		return JSONResponse(status_code=status.HTTP_200_OK, content={"success": True, "articles": articles_data})
+		after_id = decode_cursor(cursor) if cursor is not None else None
+		if stream:
+			return NDJSONResponse(iter_articles_announcement(login, after_id))
+
+		async def load_page() -> dict:
+			if after_id is not None:
+				rows = await select_articles_announcement(amount + 1 if amount else None, login=login,
+														  after_id=after_id)
+				articles_data: list[ArticleAnnouncementRow] = rows[:amount] if amount else rows
+				has_more = bool(amount) and len(rows) > amount
+			else:
+				articles_data = await select_articles_announcement(amount, chunk, login)
+				has_more = bool(amount and chunk) and len(articles_data) == amount
+			next_cursor = encode_cursor(articles_data[-1][0]) if has_more else None
+			return {"articles": [list(row) for row in articles_data], "next_cursor": next_cursor}
+
+		page = f"after:{after_id}" if after_id is not None else f"chunk:{chunk}"
+		feed_page = await cached_feed_page(login, page, amount, load_page)
+		if covers:
+			cover_ids = await select_images_batch([row[0] for row in feed_page["articles"]], announce=True)
+			# Страница может быть общей для одновременных запросов, поэтому собирается новый список, а не меняется её
+			articles = [row + [cover_ids[row[0]][0] if cover_ids[row[0]] else None] for row in feed_page["articles"]]
+			return FastJSONResponse(status_code=status.HTTP_200_OK,
+									content={"success": True, **feed_page, "articles": articles})
+		return FastJSONResponse(status_code=status.HTTP_200_OK, content={"success": True, **feed_page})
+	except InvalidCursorException as e:
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 	except Exception as e:
 		logger.error("An error excepted in articles route, error: %s", str(e))
 		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-@feed_router.get("/article")
-@verify_jwt
-async def get_article_route(article_id: int, authorization: str = Header(...)):
+def _render_article(article_data: Optional[tuple]) -> bytes:
+	return dumps_json({"success": True, "article": article_data})
+
+
+async def _article_response(kind: str, article_id: int, accept_encoding: Optional[str],
+							load: Callable[[int], Awaitable[Optional[tuple]]]) -> Response:
+	"""Ответ со статьёй; если клиент принимает сжатие, тело сжимается один раз на версию статьи и берётся из кэша."""
+	encoding = negotiate_encoding(accept_encoding) if COMPRESSION_ENABLED else None
+	if encoding is None:
+		return Response(_render_article(await load(article_id)), media_type="application/json")
+	body, applied = await cached_encoded_article(kind, article_id, encoding, load, _render_article)
+	headers = {"Vary": "Accept-Encoding"}
+	if applied is not None:
+		headers["Content-Encoding"] = applied
+	return Response(body, media_type="application/json", headers=headers)
+
+
+@feed_router.get("/article", dependencies=[Depends(jwt_claims)])
+async def get_article_route(article_id: int, accept_encoding: Optional[str] = Header(None)):
 	try:
-		article_data: ArticleData = select_article(article_id)
-		return JSONResponse(status_code=status.HTTP_200_OK, content={"success": True, "article": article_data})
+		return await _article_response("data", article_id, accept_encoding, select_article)
 	except Exception as e:
 		logger.error("An error excepted in arctile route, error: %s", str(e))
 		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-@feed_router.get("/article_full")
-@verify_jwt
-async def get_article_route(article_id: int, authorization: str = Header(...)):
+@feed_router.get("/article_full", dependencies=[Depends(jwt_claims)])
+async def get_article_route(article_id: int, accept_encoding: Optional[str] = Header(None)):
 	try:
-		article_data: ArticleFull = select_article_full(article_id)
-		return JSONResponse(status_code=status.HTTP_200_OK, content={"success": True, "article": article_data})
+		return await _article_response("full", article_id, accept_encoding, select_article_full)
 	except Exception as e:
 		logger.error("An error excepted in article_full route, error: %s", str(e))
 		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@feed_router.get("/articles_batch", dependencies=[Depends(jwt_claims)])
+async def get_articles_batch_route(
+		article_ids: list[int] = Query(..., description="ID статей, не больше ARTICLES_BATCH_MAX")
+):
+	"""
+	Несколько статей вместе со списками их изображений: статьи выбираются одним запросом к базе, а списки
+	изображений - одним конвейером Redis. Статьи возвращаются в порядке запроса (повторные id - один раз),
+	id несуществующих статей перечисляются в missing.
+	"""
+	article_ids = list(dict.fromkeys(article_ids))
+	if len(article_ids) > ARTICLES_BATCH_MAX:
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+							detail=f"Можно запросить не больше {ARTICLES_BATCH_MAX} статей")
+	try:
+		found, images = await asyncio.gather(select_articles_batch(article_ids), select_images_batch(article_ids))
+		return FastJSONResponse(status_code=status.HTTP_200_OK, content={
+			"success": True,
+			"articles": [{"article": found[article_id], "image_ids": images[article_id]}
+						 for article_id in article_ids if article_id in found],
+			"missing": [article_id for article_id in article_ids if article_id not in found],
+		})
+	except Exception as e:
+		logger.error("An error excepted in articles_batch route, error: %s", str(e))
+		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @feed_router.delete("/remove_images")
-@verify_jwt
 async def remove_article_images_route(
 		article_id: int = Query(..., description="ID статьи"),
 		image_ids: list[str] = Body(..., description="Список ID изображений для удаления"),
-		authorization: str = Header(...)
+		current_login: str = Depends(jwt_login)
 ):
 	try:
-		check_article_owner(article_id, get_jwt_login(authorization))
-		deleted = delete_images(article_id, image_ids)
-		return JSONResponse(
+		await check_article_owner(article_id, current_login)
+		results: list[ImageResult] = await delete_images_batch(article_id, image_ids)
+		return FastJSONResponse(
 			status_code=status.HTTP_200_OK,
-			content={"success": True, "deleted_image_ids": deleted}
+			content={"success": True,
+					 "deleted_image_ids": [result.image_id for result in results if result.success],
+					 "results": [result.model_dump() for result in results]}
 		)
 	except Exception as e:
 		logger.error("An error excepted in remove_images route, error: %s", str(e))
@@ -79,18 +170,19 @@ async def remove_article_images_route(
 
 
 @feed_router.put("/add_images")
-@verify_jwt
 async def add_article_images_route(
 		article_id: int = Query(..., description="ID статьи"),
 		images: list[str] = Body(..., description="Список base64-строк или URL файлов для вставки"),
-		authorization: str = Header(...)
+		current_login: str = Depends(jwt_login)
 ):
 	try:
-		check_article_owner(article_id, get_jwt_login(authorization))
-		created: list[str] = insert_images(ImagesAdd(article_id=article_id, images=images))
-		return JSONResponse(
+		await check_article_owner(article_id, current_login)
+		results: list[ImageResult] = await insert_images_batch(ImagesAdd(article_id=article_id, images=images))
+		return FastJSONResponse(
 			status_code=status.HTTP_201_CREATED,
-			content={"success": True, "created_image_ids": created}
+			content={"success": True,
+					 "created_image_ids": [result.image_id for result in results if result.success],
+					 "results": [result.model_dump() for result in results]}
 		)
 	except Exception as e:
 		logger.error("An error excepted in add_images route, error: %s", str(e))
@@ -100,54 +192,101 @@ async def add_article_images_route(
 		)
 
 
+@feed_router.put("/upload_images")
+async def upload_article_images_route(
+		request: Request,
+		article_id: int = Query(..., description="ID статьи"),
+		current_login: str = Depends(jwt_login)
+):
+	"""
+	Потоковая загрузка изображений: multipart/form-data (по изображению на каждую часть с filename)
+	или сырые байты одного изображения в теле запроса.
+	"""
+	try:
+		await check_article_owner(article_id, current_login)
+		created: list[str] = await stream_image_uploads(request, article_id)
+		return FastJSONResponse(
+			status_code=status.HTTP_201_CREATED,
+			content={"success": True, "created_image_ids": created}
+		)
+	except ImageTooLargeException as e:
+		raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+	except InvalidUploadException as e:
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+	except Exception as e:
+		logger.error("An error excepted in upload_images route, error: %s", str(e))
+		raise HTTPException(
+			status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			detail=str(e)
+		)
+
+
 @feed_router.post("/add_article")
-@verify_jwt
-async def add_article_route(article_data: ArticleAdd, authorization: str = Header(...)):
+async def add_article_route(article_data: ArticleAdd, current_login: str = Depends(jwt_login)):
 	try:
-		article_id: int = insert_article(
+		article_id: int = await insert_article(
 			ArticleFull(id=0,
 						title=article_data.title,
-						user_name=get_jwt_login(authorization),
+						user_name=current_login,
 						announcement=article_data.announcement,
 						article_body=article_data.article_body)
 		)
-		return JSONResponse(status_code=status.HTTP_200_OK, content={"success": True, "article_id": article_id})
+		return FastJSONResponse(status_code=status.HTTP_200_OK, content={"success": True, "article_id": article_id})
 	except Exception as e:
 		logger.error("An error excepted in add_article route, error: %s", str(e))
 		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
 @feed_router.put("/update_article")
-@verify_jwt
-async def update_article_route(article_data: ArticleFull, authorization: str = Header(...)):
+async def update_article_route(article_data: ArticleFull, current_login: str = Depends(jwt_login)):
 	try:
-		check_article_owner(article_data.id, get_jwt_login(authorization))
-		update_article(article_data)
-		return JSONResponse(status_code=status.HTTP_200_OK, content={"success": True})
+		await check_article_owner(article_data.id, current_login)
+		await update_article(article_data)
+		return FastJSONResponse(status_code=status.HTTP_200_OK, content={"success": True})
 	except Exception as e:
 		logger.error("An error excepted in update_article route, error: %s", str(e))
 		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
 @feed_router.delete("/remove_article")
-@verify_jwt
-async def remove_article_route(article_id: int, authorization: str = Header(...)):
+async def remove_article_route(article_id: int, current_login: str = Depends(jwt_login)):
 	try:
-		check_article_owner(article_id, get_jwt_login(authorization))
-		delete_article(article_id)
-		return JSONResponse(status_code=status.HTTP_200_OK, content={"success": True})
+		await check_article_owner(article_id, current_login)
+		await delete_article(article_id)
+		return FastJSONResponse(status_code=status.HTTP_200_OK, content={"success": True})
 	except Exception as e:
 		logger.error("An error excepted in remove_article route, error: %s", str(e))
 		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-@feed_router.get("/search_articles")
-@verify_jwt
+@feed_router.get("/search_articles", dependencies=[Depends(jwt_claims)])
 async def search_articles_route(query: str, amount: Optional[int] = 5, chunk: Optional[int] = 1,
-								login: Optional[int] = None, authorization: str = Header(...)):
+								login: Optional[str] = None,
+								stream: bool = Query(False, description="Вся выдача потоком NDJSON, без страниц")):
+	"""
+	Поиск статей по заголовку, анонсу и тексту. Возвращает страницу выдачи и общее число найденных статей.
+	С stream=true вся выдача (не больше SEARCH_TOP_K статей) отдаётся потоком NDJSON в порядке ранга.
+	"""
 	try:
-		result: list[dict] = select_articles_by_search(query_str=query, amount=amount, chunk=chunk, login=login)
-		return JSONResponse(status_code=status.HTTP_200_OK, content={"success": True, "results": result})
+		if stream:
+			return NDJSONResponse(iter_articles_by_search(normalize_query(query), login))
+		result, total = await search_page(query, amount, chunk, login,
+										  lambda query_str, author: select_articles_by_search(query_str, login=author))
+		return FastJSONResponse(status_code=status.HTTP_200_OK, content={"success": True, "results": result, "total": total})
 	except Exception as e:
 		logger.error("An error excepted in search_articles route, error: %s", str(e))
 		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@feed_router.get("/suggest", dependencies=[Depends(jwt_claims)])
+async def suggest_route(prefix: str = Query(..., min_length=1, max_length=100), limit: int = Query(10, ge=1, le=50)):
+	"""
+	Подсказки для строки поиска: статьи, в заголовке которых есть слово с префиксом prefix, и логины авторов,
+	начинающиеся с prefix. Отвечает из индекса в памяти воркера, без обращения к базе.
+	"""
+	try:
+		return FastJSONResponse(status_code=status.HTTP_200_OK,
+							content={"success": True, **suggest_index.suggest(prefix, limit)})
+	except Exception as e:
+		logger.error("An error excepted in suggest route, error: %s", str(e))
+		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
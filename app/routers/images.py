@@ -0,0 +1,149 @@
+from typing import Optional
+from logging import Logger
+
+from fastapi import APIRouter, Header, Query, Response, status, HTTPException
+
+from ..logger import configure_logs
+from ..static import IMAGE_CACHE_MAX_AGE
+from ..imaging import IMAGE_VARIANTS
+from ..database.images import sniff_image_type, IMAGE_SIGNATURE_BYTES
+from ..database.aio.images import get_image_bytes, get_image_head, get_image_range, image_path
+from ..responses import SendfileResponse
+
+__all__: list[str] = ["images_router"]
+images_router: APIRouter = APIRouter(
+	prefix="/images",
+	tags=["Маршруты для получения изображений статей"]
+)
+logger: Logger = configure_logs(__name__)
+
+# Время кэширования оригинала, отданного вместо ещё не созданного варианта
+VARIANT_FALLBACK_MAX_AGE: int = 60
+
+
+def _etag(image_id: str, variant: Optional[str] = None) -> str:
+	# Изображение с данным image_id никогда не меняется, поэтому сам идентификатор - сильный ETag
+	return f'"{image_id}:{variant}"' if variant else f'"{image_id}"'
+
+
+def _cache_headers(etag: str, fallback: bool = False) -> dict[str, str]:
+	return {
+		"ETag": etag,
+		"Cache-Control": f"public, max-age={VARIANT_FALLBACK_MAX_AGE}" if fallback
+		else f"public, max-age={IMAGE_CACHE_MAX_AGE}, immutable",
+		"Accept-Ranges": "bytes",
+		"X-Content-Type-Options": "nosniff",
+	}
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+	if not header:
+		return False
+	candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+	return "*" in candidates or etag in candidates
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+	"""
+	Разбирает заголовок Range с одним диапазоном байтов.
+
+	:return: Пара (start, end) включительно, либо None если заголовок нужно проигнорировать
+		(другая единица измерения, несколько диапазонов или синтаксическая ошибка).
+	:raises ValueError: Если диапазон не пересекается с изображением (ответ 416).
+	"""
+	unit, _, ranges = header.partition("=")
+	if unit.strip().lower() != "bytes" or "," in ranges:
+		return None
+	first, sep, last = ranges.strip().partition("-")
+	if not sep or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+		return None
+	if not first:
+		# Суффиксный диапазон: последние N байтов
+		length = int(last)
+		if length == 0:
+			raise ValueError("Пустой суффиксный диапазон")
+		return max(size - length, 0), size - 1
+	start = int(first)
+	end = min(int(last), size - 1) if last else size - 1
+	if start >= size or start > end:
+		raise ValueError("Диапазон вне изображения")
+	return start, end
+
+
+@images_router.api_route("/{article_id}/{image_id}", methods=["GET", "HEAD"])
+async def get_image_route(article_id: int, image_id: str,
+						  variant: Optional[str] = Query(None, description=f"Вариант: {', '.join(IMAGE_VARIANTS)}"),
+						  if_none_match: Optional[str] = Header(None),
+						  range_header: Optional[str] = Header(None, alias="range"),
+						  if_range: Optional[str] = Header(None)):
+	"""
+	Отдаёт изображение статьи или его вариант с заголовками долговременного кэширования.
+
+	Поддерживает условные запросы (If-None-Match -> 304) и запросы одного диапазона байтов (Range -> 206).
+	Если вариант ещё не создан, отдаётся оригинал с коротким временем кэширования.
+	Изображения из файлового хранилища отдаются без копирования через процесс (sendfile или mmap).
+	Маршрут не требует авторизации, чтобы изображения можно было загружать тегом img и кэшировать на CDN.
+	"""
+	if variant is not None and variant not in IMAGE_VARIANTS:
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+							detail=f"Неизвестный вариант изображения: {variant}")
+	etag = _etag(image_id, variant)
+	headers = _cache_headers(etag)
+
+	try:
+		if if_none_match:
+			# 304 (в том числе на If-None-Match: *) отдаётся только для существующего изображения, иначе 404
+			image_head = await get_image_head(article_id, image_id, variant)
+			if image_head is None and variant is not None:
+				variant, headers = None, _cache_headers(_etag(image_id), fallback=True)
+				image_head = await get_image_head(article_id, image_id)
+			if image_head is None:
+				raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Изображение не найдено")
+			if _etag_matches(if_none_match, headers["ETag"]):
+				return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+		if range_header and (if_range is None or if_range.strip() == headers["ETag"]):
+			image_head = await get_image_head(article_id, image_id, variant)
+			if image_head is None and variant is not None:
+				variant, headers = None, _cache_headers(_etag(image_id), fallback=True)
+				image_head = await get_image_head(article_id, image_id)
+			if image_head is None:
+				raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Изображение не найдено")
+			size, head = image_head
+			try:
+				byte_range = _parse_range(range_header, size)
+			except ValueError:
+				return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+								headers={**headers, "Content-Range": f"bytes */{size}"})
+			if byte_range is not None:
+				start, end = byte_range
+				headers = {**headers, "Content-Range": f"bytes {start}-{end}/{size}"}
+				path = await image_path(article_id, image_id, variant)
+				if path is not None:
+					return SendfileResponse(path, start, end - start + 1, status.HTTP_206_PARTIAL_CONTENT,
+											headers=headers, media_type=sniff_image_type(head))
+				data = await get_image_range(article_id, image_id, start, end, variant)
+				return Response(content=data, status_code=status.HTTP_206_PARTIAL_CONTENT,
+								media_type=sniff_image_type(head), headers=headers)
+
+		path = await image_path(article_id, image_id, variant)
+		if path is None and variant is not None and (fallback_path := await image_path(article_id, image_id)):
+			path, variant, headers = fallback_path, None, _cache_headers(_etag(image_id), fallback=True)
+		if path is not None and (image_head := await get_image_head(article_id, image_id, variant)) is not None:
+			size, head = image_head
+			return SendfileResponse(path, 0, size, status.HTTP_200_OK, headers=headers,
+									media_type=sniff_image_type(head))
+
+		data = await get_image_bytes(article_id, image_id, variant)
+		if data is None and variant is not None:
+			headers = _cache_headers(_etag(image_id), fallback=True)
+			data = await get_image_bytes(article_id, image_id)
+		if data is None:
+			raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Изображение не найдено")
+		return Response(content=data, status_code=status.HTTP_200_OK,
+						media_type=sniff_image_type(data[:IMAGE_SIGNATURE_BYTES]), headers=headers)
+	except HTTPException:
+		raise
+	except Exception as e:
+		logger.error("An error excepted in image route, error: %s", str(e))
+		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
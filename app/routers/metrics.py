@@ -0,0 +1,28 @@
+from logging import Logger
+
+from fastapi import APIRouter, Response, status, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from ..logger import configure_logs
+from ..metrics import METRICS_AVAILABLE, render_metrics
+
+__all__: list[str] = ["metrics_router"]
+metrics_router: APIRouter = APIRouter(
+	tags=["Метрики"]
+)
+logger: Logger = configure_logs(__name__)
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics_route():
+	"""Метрики в текстовом формате Prometheus, в режиме multiprocess - по всем воркерам (см. app.metrics)."""
+	if not METRICS_AVAILABLE:
+		raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+							detail="Метрики отключены или prometheus_client не установлен")
+	try:
+		# В режиме multiprocess метрики читаются из файлов всех воркеров
+		body, content_type = await run_in_threadpool(render_metrics)
+		return Response(content=body, media_type=content_type)
+	except Exception as e:
+		logger.error("An error excepted in metrics route, error: %s", str(e))
+		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -0,0 +1,35 @@
+from logging import Logger
+
+from fastapi import APIRouter, Depends, status, HTTPException
+
+from ..logger import configure_logs
+from ..responses import FastJSONResponse
+from ..utils import jwt_claims
+from ..database.aio.feed_cache import feed_cache_stats
+from ..database.aio.article_cache import article_cache_stats
+from ..database.aio.search_cache import search_cache_stats
+from ..database.suggest import suggest_index
+
+__all__: list[str] = ["service_router"]
+service_router: APIRouter = APIRouter(
+	prefix="/service",
+	tags=["Служебные маршруты"],
+	default_response_class=FastJSONResponse
+)
+logger: Logger = configure_logs(__name__)
+
+
+@service_router.get("/cache_stats", dependencies=[Depends(jwt_claims)])
+async def get_cache_stats_route():
+	"""
+	Счётчики кэшей: кэш ленты и снимки поиска общие для всех воркеров, кэш статей и индекс подсказок - в памяти
+	воркера, обработавшего запрос.
+	"""
+	try:
+		return FastJSONResponse(status_code=status.HTTP_200_OK,
+							content={"success": True, "feed": await feed_cache_stats(),
+									 "articles": article_cache_stats(), "search": await search_cache_stats(),
+									 "suggest": suggest_index.stats()})
+	except Exception as e:
+		logger.error("An error excepted in cache_stats route, error: %s", str(e))
+		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
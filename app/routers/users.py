@@ -1,37 +1,53 @@
 from logging import Logger
 
-from fastapi import APIRouter, Header, status, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Query, status, HTTPException
 
 from ..logger import configure_logs
-from ..utils import verify_jwt, get_jwt_login
+from ..responses import FastJSONResponse
+from ..utils import jwt_claims, jwt_login
 from ..models.user_info import AuthorInfo, DescriptionUpdate
-from ..database.users import select_user_info, change_description
+from ..database.aio.users import select_user_info, change_description
+from ..database.aio.authors import cached_author_profile
+from ..database.exceptions.users import AuthorNotFoundException
 
 __all__: list[str] = ["users_router"]
 users_router: APIRouter = APIRouter(
 	prefix="/users",
-	tags=["Маршруты для получения информации о пользователях"]
+	tags=["Маршруты для получения информации о пользователях"],
+	default_response_class=FastJSONResponse
 )
 logger: Logger = configure_logs(__name__)
 
 
-@users_router.get("/author")
-@verify_jwt
-async def get_author_route(author_name: str, authorization: str = Header(...)):
+@users_router.get("/author", dependencies=[Depends(jwt_claims)])
+async def get_author_route(author_name: str):
 	try:
-		author_info: AuthorInfo = select_user_info(username=author_name)
-		return JSONResponse(status_code=status.HTTP_200_OK, content={"success": True, "author_info": author_info})
+		author_info: AuthorInfo = await select_user_info(username=author_name)
+		return FastJSONResponse(status_code=status.HTTP_200_OK, content={"success": True, "author_info": author_info})
 	except Exception as e:
 		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@users_router.get("/profile", dependencies=[Depends(jwt_claims)])
+async def get_author_profile_route(author_name: str, latest: int = Query(5, ge=1, le=50)):
+	"""
+	Страница автора одним запросом: данные автора, число его статей и latest последних анонсов.
+	Ответ кэшируется вместе с лентой автора и сбрасывается при записи его статей или изменении описания.
+	"""
+	try:
+		profile = await cached_author_profile(author_name, latest)
+		return FastJSONResponse(status_code=status.HTTP_200_OK, content={"success": True, **profile})
+	except AuthorNotFoundException as e:
+		raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+	except Exception as e:
+		logger.error("An error excepted in profile route, error: %s", str(e))
+		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @users_router.post("/update_description")
-@verify_jwt
-async def update_description_route(data: DescriptionUpdate, authorization: str = Header(...)):
+async def update_description_route(data: DescriptionUpdate, login: str = Depends(jwt_login)):
 	try:
-		login: str = get_jwt_login(authorization)
-		change_description(login, data.description)
-		return JSONResponse(status_code=status.HTTP_200_OK, content={"success": True})
+		await change_description(login, data.description)
+		return FastJSONResponse(status_code=status.HTTP_200_OK, content={"success": True})
 	except Exception as e:
 		raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
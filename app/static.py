@@ -12,3 +12,56 @@ REDIS_DB: int = int(os.getenv("REDIS_DB")) if isinstance(os.getenv("REDIS_DB"),
 REDIS_PASSWORD: str = os.getenv("REDIS_PASSWORD")
 IMAGE_BASE_URL: str = os.getenv("IMAGE_BASE_URL", '')
 REDIS_USER: str = os.getenv("REDIS_USER")
+PG_POOL_MIN_CONN: int = int(os.getenv("PG_POOL_MIN_CONN", 1))
+PG_POOL_MAX_CONN: int = int(os.getenv("PG_POOL_MAX_CONN", 10))
+PG_POOL_TIMEOUT: float = float(os.getenv("PG_POOL_TIMEOUT", 10))
+PG_POOL_HEALTHCHECK_INTERVAL: float = float(os.getenv("PG_POOL_HEALTHCHECK_INTERVAL", 30))
+PG_CONNECT_TIMEOUT: int = int(os.getenv("PG_CONNECT_TIMEOUT", 10))
+ASYNC_DB_ENABLED: bool = os.getenv("ASYNC_DB_ENABLED", "true").lower() in ("1", "true", "yes")
+ASYNC_PG_POOL_MIN_CONN: int = int(os.getenv("ASYNC_PG_POOL_MIN_CONN", 2))
+ASYNC_PG_POOL_MAX_CONN: int = int(os.getenv("ASYNC_PG_POOL_MAX_CONN", 10))
+ASYNC_PG_POOL_MAX_IDLE: float = float(os.getenv("ASYNC_PG_POOL_MAX_IDLE", 300))
+REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", 20))
+REDIS_POOL_TIMEOUT: float = float(os.getenv("REDIS_POOL_TIMEOUT", 5))
+REDIS_HEALTH_CHECK_INTERVAL: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+IMAGE_DECODE_OFFLOAD_BYTES: int = int(os.getenv("IMAGE_DECODE_OFFLOAD_BYTES", 256 * 1024))
+MAX_IMAGE_BYTES: int = int(os.getenv("MAX_IMAGE_BYTES", 10 * 1024 * 1024))
+MAX_UPLOAD_FILES: int = int(os.getenv("MAX_UPLOAD_FILES", 20))
+IMAGE_UPLOAD_CHUNK_BYTES: int = int(os.getenv("IMAGE_UPLOAD_CHUNK_BYTES", 256 * 1024))
+IMAGE_UPLOAD_TTL: int = int(os.getenv("IMAGE_UPLOAD_TTL", 3600))
+IMAGE_CACHE_MAX_AGE: int = int(os.getenv("IMAGE_CACHE_MAX_AGE", 365 * 24 * 3600))
+IMAGE_DERIVATIVES_ENABLED: bool = os.getenv("IMAGE_DERIVATIVES_ENABLED", "true").lower() in ("1", "true", "yes")
+IMAGE_DERIVATIVE_WORKERS: int = int(os.getenv("IMAGE_DERIVATIVE_WORKERS", 2))
+IMAGE_DERIVATIVE_QUALITY: int = int(os.getenv("IMAGE_DERIVATIVE_QUALITY", 80))
+IMAGE_STORAGE_BACKEND: str = os.getenv("IMAGE_STORAGE_BACKEND", "redis").lower()
+IMAGE_STORAGE_DIR: str = os.getenv("IMAGE_STORAGE_DIR", "data/images")
+IMAGE_STORAGE_FSYNC: bool = os.getenv("IMAGE_STORAGE_FSYNC", "true").lower() in ("1", "true", "yes")
+FEED_CACHE_ENABLED: bool = os.getenv("FEED_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+FEED_CACHE_TTL: int = int(os.getenv("FEED_CACHE_TTL", 30))
+FEED_CACHE_LOCK_TTL: float = float(os.getenv("FEED_CACHE_LOCK_TTL", 5))
+FEED_CACHE_LOCK_WAIT: float = float(os.getenv("FEED_CACHE_LOCK_WAIT", 2))
+ARTICLE_CACHE_ENABLED: bool = os.getenv("ARTICLE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ARTICLE_CACHE_MAX_BYTES: int = int(os.getenv("ARTICLE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+ARTICLE_CACHE_TTL: float = float(os.getenv("ARTICLE_CACHE_TTL", 300))
+ARTICLE_CACHE_CHANNEL: str = os.getenv("ARTICLE_CACHE_CHANNEL", "articles:invalidate")
+JWT_CACHE_SIZE: int = int(os.getenv("JWT_CACHE_SIZE", 10000))
+PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+SEARCH_TOP_K: int = int(os.getenv("SEARCH_TOP_K", 200))
+SEARCH_BACKFILL_BATCH: int = int(os.getenv("SEARCH_BACKFILL_BATCH", 1000))
+SEARCH_CACHE_ENABLED: bool = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEARCH_CACHE_TTL: int = int(os.getenv("SEARCH_CACHE_TTL", 60))
+SUGGEST_ENABLED: bool = os.getenv("SUGGEST_ENABLED", "true").lower() in ("1", "true", "yes")
+SUGGEST_CHANNEL: str = os.getenv("SUGGEST_CHANNEL", "suggest:updates")
+SCHEMA_CHECK_ON_STARTUP: bool = os.getenv("SCHEMA_CHECK_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+ADMIN_LOGINS: frozenset[str] = frozenset(login.strip() for login in os.getenv("ADMIN_LOGINS", "").split(",") if login.strip())
+BULK_BATCH_SIZE: int = int(os.getenv("BULK_BATCH_SIZE", 5000))
+STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", 500))
+COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+COMPRESSION_ZSTD_LEVEL: int = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+ARTICLES_BATCH_MAX: int = int(os.getenv("ARTICLES_BATCH_MAX", 100))
+METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_POOL_INTERVAL: float = float(os.getenv("METRICS_POOL_INTERVAL", 5))
@@ -0,0 +1,150 @@
+"""
+Потоковый приём изображений из тела запроса.
+
+Поддерживаются тела multipart/form-data (каждая часть с filename - отдельное изображение) и сырые бинарные тела
+(image/*, application/octet-stream - одно изображение). Тело читается частями по мере поступления и сразу
+передаётся в хранилище, поэтому пиковая память на загрузку не зависит от размера изображения.
+"""
+from collections.abc import AsyncIterator
+from logging import Logger
+
+from fastapi import Request
+
+try:
+	from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+	from multipart.multipart import MultipartParser, parse_options_header
+
+from .logger import configure_logs
+from .static import MAX_UPLOAD_FILES, MAX_IMAGE_BYTES
+from .database.aio.images import ImageUpload, delete_images_batch
+from .database.exceptions.images import ImageTooLargeException, InvalidUploadException
+
+__all__: list[str] = ["stream_image_uploads"]
+logger: Logger = configure_logs(__name__)
+
+
+class _MultipartEvents:
+	"""
+	Собирает события синхронного парсера python-multipart, чтобы обработать их асинхронно
+	после каждого прочитанного фрагмента тела.
+	"""
+
+	def __init__(self) -> None:
+		self.events: list[tuple[str, bytes | bool | None]] = []
+		self._header_name = b""
+		self._header_value = b""
+		self._disposition = b""
+
+	def callbacks(self) -> dict:
+		return {
+			"on_part_begin": self.on_part_begin,
+			"on_part_data": self.on_part_data,
+			"on_part_end": self.on_part_end,
+			"on_header_field": self.on_header_field,
+			"on_header_value": self.on_header_value,
+			"on_header_end": self.on_header_end,
+			"on_headers_finished": self.on_headers_finished,
+		}
+
+	def on_part_begin(self) -> None:
+		self._disposition = b""
+
+	def on_part_data(self, data: bytes, start: int, end: int) -> None:
+		self.events.append(("data", data[start:end]))
+
+	def on_part_end(self) -> None:
+		self.events.append(("end", None))
+
+	def on_header_field(self, data: bytes, start: int, end: int) -> None:
+		self._header_name += data[start:end]
+
+	def on_header_value(self, data: bytes, start: int, end: int) -> None:
+		self._header_value += data[start:end]
+
+	def on_header_end(self) -> None:
+		if self._header_name.lower() == b"content-disposition":
+			self._disposition = self._header_value
+		self._header_name = b""
+		self._header_value = b""
+
+	def on_headers_finished(self) -> None:
+		_, options = parse_options_header(self._disposition)
+		# Только части с filename считаются изображениями, обычные поля формы пропускаются
+		self.events.append(("begin", b"filename" in options))
+
+
+async def _store_multipart(stream: AsyncIterator[bytes], boundary: bytes, article_id: int,
+						   created: list[str]) -> None:
+	collector = _MultipartEvents()
+	parser = MultipartParser(boundary, collector.callbacks())
+	upload: ImageUpload | None = None
+	try:
+		async for chunk in stream:
+			try:
+				parser.write(chunk)
+			except ValueError as e:
+				raise InvalidUploadException(f"Некорректное тело multipart: {e}")
+			events, collector.events = collector.events, []
+			for event, payload in events:
+				if event == "begin" and payload:
+					if len(created) >= MAX_UPLOAD_FILES:
+						raise InvalidUploadException(f"Можно загрузить не больше {MAX_UPLOAD_FILES} изображений")
+					upload = ImageUpload(article_id)
+				elif event == "data" and upload is not None:
+					await upload.write(payload)
+				elif event == "end" and upload is not None:
+					created.append(await upload.commit())
+					upload = None
+		parser.finalize()
+	except Exception:
+		if upload is not None:
+			await upload.abort()
+		raise
+
+
+async def _store_raw(stream: AsyncIterator[bytes], article_id: int, created: list[str]) -> None:
+	upload = ImageUpload(article_id)
+	try:
+		async for chunk in stream:
+			await upload.write(chunk)
+		created.append(await upload.commit())
+	except Exception:
+		await upload.abort()
+		raise
+
+
+async def stream_image_uploads(request: Request, article_id: int) -> list[str]:
+	"""
+	Читает изображения из тела запроса частями и записывает их в хранилище статьи.
+
+	Загрузка выполняется по принципу «всё или ничего»: при ошибке уже сохранённые из этого запроса
+	изображения удаляются.
+
+	:param request: Запрос с телом multipart/form-data или сырыми байтами изображения.
+	:param article_id: Идентификатор статьи.
+	:return: Список сгенерированных image_id.
+	:raises ImageTooLargeException: Если одно из изображений больше MAX_IMAGE_BYTES.
+	:raises InvalidUploadException: Если тело запроса имеет некорректный формат.
+	"""
+	content_type, options = parse_options_header(request.headers.get("content-type", ""))
+	created: list[str] = []
+	try:
+		if content_type == b"multipart/form-data":
+			if b"boundary" not in options:
+				raise InvalidUploadException("В заголовке Content-Type отсутствует boundary")
+			await _store_multipart(request.stream(), options[b"boundary"], article_id, created)
+		elif content_type.startswith(b"image/") or content_type in (b"application/octet-stream", b""):
+			if int(request.headers.get("content-length") or 0) > MAX_IMAGE_BYTES:
+				raise ImageTooLargeException(f"Изображение превышает {MAX_IMAGE_BYTES} байт")
+			await _store_raw(request.stream(), article_id, created)
+		else:
+			raise InvalidUploadException(f"Неподдерживаемый Content-Type: {content_type.decode('latin-1')}")
+	except Exception:
+		if created:
+			await delete_images_batch(article_id, created)
+		raise
+	if not created:
+		raise InvalidUploadException("В запросе нет изображений")
+	logger.info("Потоково загружено %d изображений для статьи %s", len(created), article_id)
+	return created
@@ -1,18 +1,57 @@
 from datetime import datetime, timezone, timedelta
-from collections.abc import Callable
+from collections import OrderedDict
 from typing import Optional
-from functools import wraps
 from logging import Logger
+import threading
+import binascii
+import hashlib
+import base64
+import json
+import time
 
 from jwt import InvalidTokenError, ExpiredSignatureError
-from fastapi import HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 import jwt
 
-from .static import SECRET_KEY, ALGORITHM
+from .static import SECRET_KEY, ALGORITHM, JWT_CACHE_SIZE, ADMIN_LOGINS
 from .logger import configure_logs
+from .database.exceptions.pagination import InvalidCursorException
 
 logger: Logger = configure_logs(__name__)
 
+# Уже проверенные токены: SHA-256 токена -> (claims, момент истечения по time.time())
+_verified_tokens: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+_verified_tokens_lock: threading.Lock = threading.Lock()
+
+
+def decode_jwt(token: str) -> dict:
+    """
+    Проверяет подпись и срок действия JWT и возвращает его claims.
+
+    Проверенные токены запоминаются в LRU-кэше на JWT_CACHE_SIZE записей по хэшу токена, поэтому повторные
+    запросы с тем же токеном не проверяют HMAC заново. Запись живёт не дольше exp токена; токены без exp
+    не кэшируются.
+    :raises InvalidTokenError: Если токен недействителен (ExpiredSignatureError - если истёк).
+    """
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    now = time.time()
+    with _verified_tokens_lock:
+        entry = _verified_tokens.get(digest)
+        if entry is not None:
+            if entry[1] > now:
+                _verified_tokens.move_to_end(digest)
+                return entry[0]
+            del _verified_tokens[digest]
+    claims = jwt.decode(jwt=token, key=SECRET_KEY, algorithms=ALGORITHM)
+    expires = claims.get("exp")
+    if JWT_CACHE_SIZE > 0 and isinstance(expires, (int, float)):
+        with _verified_tokens_lock:
+            _verified_tokens[digest] = (claims, float(expires))
+            _verified_tokens.move_to_end(digest)
+            while len(_verified_tokens) > JWT_CACHE_SIZE:
+                _verified_tokens.popitem(last=False)
+    return claims
+
 
 def check_jwt_token(token: str) -> Optional[dict]:
     if not token:
@@ -27,25 +66,35 @@ def check_jwt_token(token: str) -> Optional[dict]:
             detail="Неверный формат заголовка авторизации",
         )
 
-    return jwt.decode(jwt=token, key=SECRET_KEY, algorithms=ALGORITHM)
+    return decode_jwt(token)
+
+
+async def jwt_claims(authorization: str = Header(...)) -> dict:
+    """
+    Зависимость FastAPI: проверяет JWT из заголовка Authorization ("Bearer <token>") один раз за запрос
+    и передаёт его claims обработчику.
+    """
+    try:
+        claims = check_jwt_token(authorization)
+    except ExpiredSignatureError:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Срок действия токена истек")
+    except InvalidTokenError:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Недействительный токен")
+    if not claims or "username" not in claims:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Неверный payload токена")
+    return claims
+
 
+async def jwt_login(claims: dict = Depends(jwt_claims)) -> str:
+    """Зависимость FastAPI: логин пользователя из проверенного JWT."""
+    return claims["username"]
 
-def verify_jwt(f: Callable) -> Optional[Callable]:
-    @wraps(f)
-    async def wrapper(*args, **kwargs) -> Optional[Callable]:
-        """
-        Функция-проверка JWT, передаваемого в заголовке Authorization.
-        Ожидается формат: "Bearer <token>"
-        """
-        try:
-            authorization = kwargs.get("authorization")
-            check_jwt_token(authorization)
-        except ExpiredSignatureError:
-            raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Срок действия токена истек")
-        except InvalidTokenError:
-            raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Недействительный токен")
-        return await f(*args, **kwargs)
-    return wrapper
+
+async def admin_login(login: str = Depends(jwt_login)) -> str:
+    """Зависимость FastAPI: логин администратора из ADMIN_LOGINS; остальным пользователям - 403."""
+    if login not in ADMIN_LOGINS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Недостаточно прав")
+    return login
 
 
 def create_jwt(login: str, lifetime=timedelta(days=1)) -> str:
@@ -61,10 +110,28 @@ def create_jwt(login: str, lifetime=timedelta(days=1)) -> str:
     }, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_jwt_login(authorization: str) -> str:
-    decoded_info: dict | None = check_jwt_token(authorization)
+def encode_cursor(article_id: int) -> str:
+    """
+    Кодирует позицию постраничной выборки в непрозрачный для клиента курсор.
+    :param article_id: Идентификатор последней статьи на странице.
+    :return: Курсор для параметра cursor следующего запроса.
+    """
+    payload = json.dumps({"after": article_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
 
-    if decoded_info is None or len(decoded_info) == 0:
-        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Неверный payload токена")
 
-    return decoded_info["username"]
+def decode_cursor(cursor: str) -> int:
+    """
+    Извлекает позицию постраничной выборки из курсора, полученного от encode_cursor.
+    :param cursor: Курсор из параметра запроса.
+    :return: Идентификатор статьи, после которой начинается страница.
+    :raises InvalidCursorException: Если курсор повреждён.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        article_id = payload["after"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorException(f"Некорректный курсор: {e}")
+    if not isinstance(article_id, int) or isinstance(article_id, bool):
+        raise InvalidCursorException("Некорректный курсор: позиция должна быть целым числом")
+    return article_id
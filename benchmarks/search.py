@@ -0,0 +1,157 @@
+"""
+Замер задержки поиска статей: прежний запрос (similarity по всем полям без индекса) против поиска по поисковому
+документу (app.database.search).
+
+Запуск против базы из POSTGRES_SOURCE, в которой применены миграции (python -m app.database.migrations upgrade):
+	python -m benchmarks.search --seed 100000 --repeat 20
+	python -m benchmarks.search --cleanup
+
+--seed добавляет синтетические статьи от пользователя search_bench, --cleanup удаляет их.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from psycopg2.extras import RealDictCursor, execute_values
+
+from app.database.articles import select_articles_by_search
+from app.database.connect import pg_connection
+from app.passwords import hash_password
+
+BENCH_LOGIN = "search_bench"
+
+WORDS = ("статья", "искусство", "живопись", "скульптура", "выставка", "галерея", "художник", "портрет", "пейзаж",
+		 "графика", "акварель", "масло", "холст", "музей", "реставрация", "композиция", "цвет", "свет", "тень",
+		 "авангард", "импрессионизм", "модерн", "фотография", "инсталляция", "перспектива", "эскиз", "набросок",
+		 "коллекция", "аукцион", "критика", "история", "техника", "мастерская", "ученик", "традиция", "икона",
+		 "фреска", "мозаика", "керамика", "гравюра", "литография", "орнамент", "архитектура", "собор", "дворец")
+
+# Точные слова, словоформы и опечатки: последние находит только нечёткий поиск
+QUERIES = ("живопись", "выставка художника", "акварельный пейзаж", "реставрация фрески", "импрессионизм",
+		   "живописъ", "скульптра", "галлерея", "портрет маслом", "история искусства")
+
+# Запрос поиска до перехода на поисковый документ
+LEGACY_SEARCH_SQL = """
+	WITH q AS (SELECT plainto_tsquery('russian', %s) AS tsq,
+					  %s::text                       AS rawq),
+		 fts AS (SELECT article_id,
+						ts_rank_cd(search_vector, q.tsq) AS rank_fts
+				 FROM articles.articles,
+					  q
+				 WHERE search_vector @@ q.tsq),
+		 trgm AS (SELECT article_id,
+						 greatest(
+								 similarity(title, q.rawq),
+								 similarity(announcement, q.rawq),
+								 similarity(article_body, q.rawq)
+						 ) AS rank_trgm
+				  FROM articles.articles,
+					   q
+				  WHERE (coalesce(title, '') || ' ' ||
+						 coalesce(announcement, '') || ' ' ||
+						 coalesce(article_body, ''))
+							%% q.rawq)
+	SELECT a.article_id,
+		   a.title                                 AS title,
+		   us.login                                AS login,
+		   coalesce(fts.rank_fts, 0) * 1.0
+			   + coalesce(trgm.rank_trgm, 0) * 0.5 AS score
+	FROM articles.articles a
+			 JOIN users.users us
+				  ON a.user_id = us.id
+			 LEFT JOIN fts ON fts.article_id = a.article_id
+			 LEFT JOIN trgm ON trgm.article_id = a.article_id
+	WHERE (coalesce(fts.rank_fts, 0) * 1.0 + coalesce(trgm.rank_trgm, 0) * 0.5) > 0
+	ORDER BY score DESC
+	OFFSET %s LIMIT %s
+"""
+
+
+def _text(rng: random.Random, words: int) -> str:
+	return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(articles: int, body_words: int, batch_size: int = 1000) -> None:
+	rng = random.Random(articles)
+	with pg_connection() as conn:
+		with conn.cursor() as cur:
+			cur.execute("""
+				INSERT INTO users.users (login, password, description) VALUES (%s, %s, %s)
+				ON CONFLICT (login) DO NOTHING
+			""", (BENCH_LOGIN, hash_password(str(rng.random())), "Пользователь для замеров поиска"))
+			cur.execute("SELECT id FROM users.users WHERE login = %s", (BENCH_LOGIN,))
+			user_id = cur.fetchone()[0]
+			for start in range(0, articles, batch_size):
+				rows = [(_text(rng, 5), user_id, _text(rng, 25), _text(rng, body_words))
+						for _ in range(min(batch_size, articles - start))]
+				execute_values(cur, "INSERT INTO articles.articles (title, user_id, announcement, article_body) "
+									"VALUES %s", rows)
+				conn.commit()
+				print(f"добавлено {start + len(rows)} из {articles}")
+			cur.execute("ANALYZE articles.articles")
+		conn.commit()
+
+
+def cleanup() -> None:
+	with pg_connection() as conn:
+		with conn.cursor() as cur:
+			cur.execute("""
+				DELETE FROM articles.articles WHERE user_id = (SELECT id FROM users.users WHERE login = %s)
+			""", (BENCH_LOGIN,))
+			print(f"удалено статей: {cur.rowcount}")
+			cur.execute("DELETE FROM users.users WHERE login = %s", (BENCH_LOGIN,))
+		conn.commit()
+
+
+def _legacy_search(query: str, amount: int, chunk: int) -> list[dict]:
+	with pg_connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+		cur.execute(LEGACY_SEARCH_SQL, (query, query, (chunk - 1) * amount, amount))
+		return cur.fetchall()
+
+
+def _measure(search, repeat: int, amount: int, chunk: int) -> dict:
+	latencies: list[float] = []
+	for _ in range(repeat):
+		for query in QUERIES:
+			started = time.perf_counter()
+			search(query, amount, chunk)
+			latencies.append(time.perf_counter() - started)
+	quantiles = statistics.quantiles(latencies, n=100)
+	return {"p50": round(quantiles[49] * 1000, 2), "p95": round(quantiles[94] * 1000, 2),
+			"max": round(max(latencies) * 1000, 2)}
+
+
+def run(repeat: int, amount: int, chunk: int) -> dict:
+	with pg_connection() as conn, conn.cursor() as cur:
+		cur.execute("SELECT count(*) FROM articles.articles")
+		articles = cur.fetchone()[0]
+	# Прогрев кэша страниц PostgreSQL
+	_measure(select_articles_by_search, 1, amount, chunk)
+	return {
+		"articles": articles,
+		"queries": len(QUERIES) * repeat,
+		"legacy_ms": _measure(_legacy_search, repeat, amount, chunk),
+		"indexed_ms": _measure(select_articles_by_search, repeat, amount, chunk),
+	}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Замер задержки поиска статей")
+	parser.add_argument("--seed", type=int, default=0, help="Добавить столько синтетических статей перед замером")
+	parser.add_argument("--body-words", type=int, default=300, help="Длина текста синтетической статьи в словах")
+	parser.add_argument("--cleanup", action="store_true", help="Удалить синтетические статьи и выйти")
+	parser.add_argument("--repeat", type=int, default=10)
+	parser.add_argument("--amount", type=int, default=10)
+	parser.add_argument("--chunk", type=int, default=1)
+	args = parser.parse_args()
+	if args.cleanup:
+		cleanup()
+		return
+	if args.seed:
+		seed(args.seed, args.body_words)
+	print(run(args.repeat, args.amount, args.chunk))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,73 @@
+"""
+Микрозамер сериализации страницы ленты: стандартный JSONResponse против FastJSONResponse (app.responses)
+и размер строки выборки в памяти для словаря, кортежа и ArticleAnnouncementRow.
+
+База и сервер не нужны, страница собирается из синтетических строк:
+	python -m benchmarks.serialization --amount 50 --repeat 2000
+"""
+import argparse
+import random
+import sys
+import timeit
+
+from starlette.responses import JSONResponse
+
+from app.models.articles import ArticleAnnouncementRow
+from app.responses import FastJSONResponse, orjson
+
+WORDS = ("статья", "искусство", "живопись", "скульптура", "выставка", "галерея", "художник", "портрет", "пейзаж",
+		 "графика", "акварель", "музей", "реставрация", "композиция", "авангард", "модерн", "фотография", "эскиз")
+
+
+def _text(rng: random.Random, words: int) -> str:
+	return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _rows(amount: int, announcement_words: int) -> list[ArticleAnnouncementRow]:
+	rng = random.Random(0)
+	return [ArticleAnnouncementRow(100_000 - i, _text(rng, 5), f"author{rng.randrange(1000)}",
+								   _text(rng, announcement_words))
+			for i in range(amount)]
+
+
+def _per_page_us(render, content: dict, repeat: int) -> float:
+	return round(timeit.timeit(lambda: render(content), number=repeat) / repeat * 1_000_000, 2)
+
+
+def run(amount: int, announcement_words: int, repeat: int) -> dict:
+	rows = _rows(amount, announcement_words)
+	page = {"success": True, "articles": rows, "next_cursor": "MTAwMDAw"}
+	legacy_page = {**page, "articles": [tuple(row) for row in rows]}
+	stdlib = JSONResponse(None)
+	fast = FastJSONResponse(None)
+	# Кодирование должно совпадать с точностью до пробелов
+	assert JSONResponse(legacy_page).body == fast.render(page)
+	row = rows[0]
+	return {
+		"amount": amount,
+		"orjson": orjson is not None,
+		"page_bytes": len(fast.render(page)),
+		"per_page_us": {
+			"json_tuples": _per_page_us(stdlib.render, legacy_page, repeat),
+			"json_dicts": _per_page_us(stdlib.render, {**page, "articles": [row._asdict() for row in rows]}, repeat),
+			"fast_rows": _per_page_us(fast.render, page, repeat),
+		},
+		"row_bytes": {
+			"dict": sys.getsizeof(row._asdict()),
+			"tuple": sys.getsizeof(tuple(row)),
+			"named_row": sys.getsizeof(row),
+		},
+	}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Замер сериализации страницы ленты")
+	parser.add_argument("--amount", type=int, default=50, help="Статей на странице")
+	parser.add_argument("--announcement-words", type=int, default=40)
+	parser.add_argument("--repeat", type=int, default=2000)
+	args = parser.parse_args()
+	print(run(args.amount, args.announcement_words, args.repeat))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,67 @@
+"""
+Нагрузочный замер входа пользователей: пропускная способность и задержки POST /auth/sign_in.
+
+Запуск против работающего сервера (пользователь должен существовать):
+	python -m benchmarks.sign_in --url http://localhost:8087 --login bench --password secret \
+		--requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _worker(client: httpx.AsyncClient, payload: dict, queue: asyncio.Queue, latencies: list[float],
+				  statuses: dict[int, int]) -> None:
+	while True:
+		try:
+			queue.get_nowait()
+		except asyncio.QueueEmpty:
+			return
+		started = time.perf_counter()
+		response = await client.post("/auth/sign_in", json=payload)
+		latencies.append(time.perf_counter() - started)
+		statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run(url: str, login: str, password: str, requests: int, concurrency: int) -> dict:
+	queue: asyncio.Queue = asyncio.Queue()
+	for _ in range(requests):
+		queue.put_nowait(None)
+	latencies: list[float] = []
+	statuses: dict[int, int] = {}
+	limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+	async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+		# Прогрев соединений и пулов сервера
+		await client.post("/auth/sign_in", json={"login": login, "password": password})
+		started = time.perf_counter()
+		await asyncio.gather(*(_worker(client, {"login": login, "password": password}, queue, latencies, statuses)
+							   for _ in range(concurrency)))
+		elapsed = time.perf_counter() - started
+	quantiles = statistics.quantiles(latencies, n=100)
+	return {
+		"requests": requests,
+		"concurrency": concurrency,
+		"seconds": round(elapsed, 3),
+		"requests_per_second": round(requests / elapsed, 1),
+		"latency_ms": {"p50": round(quantiles[49] * 1000, 2), "p95": round(quantiles[94] * 1000, 2),
+					   "p99": round(quantiles[98] * 1000, 2), "max": round(max(latencies) * 1000, 2)},
+		"statuses": statuses,
+	}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Замер пропускной способности POST /auth/sign_in")
+	parser.add_argument("--url", default="http://localhost:8087")
+	parser.add_argument("--login", required=True)
+	parser.add_argument("--password", required=True)
+	parser.add_argument("--requests", type=int, default=2000)
+	parser.add_argument("--concurrency", type=int, default=50)
+	args = parser.parse_args()
+	print(asyncio.run(run(args.url, args.login, args.password, args.requests, args.concurrency)))
+
+
+if __name__ == "__main__":
+	main()